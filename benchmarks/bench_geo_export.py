@@ -0,0 +1,40 @@
+import sys
+import tempfile
+import time
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger  # noqa: E402
+
+from polarsteps_data_parser import geo_export, model  # noqa: E402
+
+POINT_COUNT = 1_000_000
+
+
+def make_track() -> model.Track:
+    """Return a track going north-east with a point every 10 seconds and about 14 m."""
+    return model.Track(
+        array("d", (48.0 + i * 1e-4 for i in range(POINT_COUNT))),
+        array("d", (9.0 + i * 1e-4 for i in range(POINT_COUNT))),
+        array("d", (1.7e9 + i * 10.0 for i in range(POINT_COUNT))),
+    )
+
+
+def main() -> None:  # noqa: D103
+    logger.remove()
+    track = make_track()
+    print(f"Export throughput, measured over {POINT_COUNT} track points:")
+    print(f"{'file':<14}{'simplify':>10}{'points':>10}{'points/s':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        for filename in ("trip.gpx", "trip.geojson"):
+            for tolerance_m in (0.0, 50.0):
+                started = time.perf_counter()
+                count = geo_export.export_trip(Path(folder) / filename, "bench", track, [], tolerance_m=tolerance_m)
+                seconds = time.perf_counter() - started
+                print(f"{filename:<14}{tolerance_m:>9.0f}m{count:>10}{POINT_COUNT / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import dataclasses
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from polarsteps_data_parser import model  # noqa: E402
+
+OBJECT_COUNT = 100_000
+
+
+def without_slots(cls: type) -> type:
+    """Return a plain dataclass with the same fields, i.e. the model class as it was before slots."""
+    return dataclasses.make_dataclass(
+        f"{cls.__name__}WithDict",
+        [(f.name, f.type, dataclasses.field(default=f.default)) for f in dataclasses.fields(cls)],
+    )
+
+
+def bytes_per_object(factory: Callable[[int], object]) -> float:
+    """Return the memory allocated per object when creating OBJECT_COUNT objects."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(i) for i in range(OBJECT_COUNT)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / OBJECT_COUNT
+
+
+def main() -> None:  # noqa: D103
+    now = datetime.now(tz=timezone.utc)
+    location = model.StepLocation(lat=48.8, lon=9.3, name="Weinstadt", country="Germany")
+    factories = {
+        model.Location: lambda cls: lambda i: cls(lat=i * 1e-6, lon=i * 1e-6, time=now),
+        model.StepLocation: lambda cls: lambda i: cls(lat=i * 1e-6, lon=i * 1e-6, name="n", country="c"),
+        model.Step: lambda cls: lambda i: cls(
+            step_id=str(i), name="n", description="d", location=location, date=now.date()
+        ),
+        model.Trip: lambda cls: lambda i: cls(
+            name="n", start_date=now, end_date=now, cover_photo_path="p", steps=[]
+        ),
+    }
+    print(f"Bytes per object, measured over {OBJECT_COUNT} objects (attribute values shared):")
+    print(f"{'class':<14}{'__dict__':>10}{'slots':>10}{'saved':>8}")
+    for cls, factory in factories.items():
+        with_dict = bytes_per_object(factory(without_slots(cls)))
+        slotted = bytes_per_object(factory(cls))
+        print(f"{cls.__name__:<14}{with_dict:>10.0f}{slotted:>10.0f}{1 - slotted / with_dict:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import json
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from polarsteps_data_parser import model, utils  # noqa: E402
+
+STEP_COUNT = 2_000
+COMMENTS_PER_STEP = 50
+
+
+def make_trip_json(path: Path) -> None:
+    """Write a 'trip.json' whose steps carry comments and media metadata like a real export."""
+    steps = [
+        {
+            "id": i,
+            "name": f"Step {i}",
+            "display_name": f"Step {i}",
+            "description": "A day of travelling. " * 20,
+            "start_time": 1752616800 + i * 3600,
+            "timezone_id": "Europe/Berlin",
+            "location": {"lat": 48.8, "lon": 9.3, "name": "Weinstadt", "detail": "Germany", "uuid": str(i)},
+            "comments": [{"id": c, "text": f"comment {c}", "follower": {"id": c}} for c in range(COMMENTS_PER_STEP)],
+            "media": [{"id": m, "path": f"https://example.com/{m}.jpg", "width": 4032} for m in range(20)],
+        }
+        for i in range(STEP_COUNT)
+    ]
+    trip = {"id": 1, "name": "Trip", "start_date": 1752616800, "end_date": 1760565599, "cover_photo_path": ""}
+    path.write_text(json.dumps(trip | {"all_steps": steps}))
+
+
+def peak_memory(function: Callable[[], object]) -> int:
+    """Return the peak memory allocated while calling 'function'."""
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:  # noqa: D103
+    if model.TRIP_JSON_SCHEMA is None:
+        sys.exit("msgspec is not installed, 'trip.json' is always decoded with all fields.")
+    with tempfile.TemporaryDirectory() as folder:
+        trip_json = Path(folder) / "trip.json"
+        make_trip_json(trip_json)
+        all_fields = peak_memory(lambda: model.Trip.from_json(utils.load_json_from_file(trip_json)))
+        used_fields = peak_memory(lambda: model.load_trip_from_file(trip_json))
+        size = trip_json.stat().st_size
+    print(f"Peak memory loading a trip.json of {size / 2**20:.1f} MB with {STEP_COUNT} steps:")
+    print(f"{'all fields decoded':<22}{all_fields / 2**20:>8.1f} MB")
+    print(f"{'used fields decoded':<22}{used_fields / 2**20:>8.1f} MB{1 - used_fields / all_fields:>8.0%} saved")
+
+
+if __name__ == "__main__":
+    main()
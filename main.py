@@ -1,15 +1,39 @@
 import os
 import sys
+import time
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 import click
+import staticmaps
 from loguru import logger
 
+import polarsteps_data_parser.columnar_export as columnar_export
+import polarsteps_data_parser.geo_export as geo_export
 import polarsteps_data_parser.model as model
+import polarsteps_data_parser.reverse_geocoder as reverse_geocoder
 import polarsteps_data_parser.utils as utils
-from polarsteps_data_parser.map_generator import MapGenerator
+from polarsteps_data_parser.base_map import SharedBaseMapRenderer
+from polarsteps_data_parser.export_source import fingerprint as file_fingerprint
+from polarsteps_data_parser.export_source import is_in_archive, open_export, trip_folders
+from polarsteps_data_parser.ingest import Ingest, IngestDelta
+from polarsteps_data_parser.job_journal import JobJournal, inputs_fingerprint
+from polarsteps_data_parser.map_encoder import MapEncoder
+from polarsteps_data_parser.map_generator import MapGenerator, MapVariant, scale_surface
+from polarsteps_data_parser.metadata_cache import MetadataCache, set_shared_cache
 from polarsteps_data_parser.pdf_generator import PDFGenerator
+from polarsteps_data_parser.reverse_geocoder import Gazetteer
+from polarsteps_data_parser.scheduler import Budget, Job, JobProgress, Scheduler
+from polarsteps_data_parser.stay_points import MIN_DURATION as MIN_STAY_DURATION
+from polarsteps_data_parser.stay_points import RADIUS_M as STAY_RADIUS_M
+from polarsteps_data_parser.stay_points import Stay, detect_stays, total_duration
+from polarsteps_data_parser.step_filter import parse_step_filter, select_steps
+from polarsteps_data_parser.tile_fetcher import TileFetcher
+from polarsteps_data_parser.tile_pack import seed_tile_pack
+from polarsteps_data_parser.track_file import SUFFIX as TRACK_FILE_SUFFIX
+from polarsteps_data_parser.track_file import convert_locations_json, load_track
+from polarsteps_data_parser.video_metadata import video_infos
 
 
 class Const:
@@ -21,19 +45,53 @@ class Const:
     ZOOM_LEVEL_SINGLE_STEP_VIEW_MAX = 19
     IMAGE_SIZE_X_DEFAULT = 800
     IMAGE_SIZE_Y_DEFAULT = 600
+    ENCODER_THREADS = min(4, os.cpu_count() or 1)
+    INGEST_FOLDER = ".polarsteps-ingest"
+    EXPORT_TIME_FORMATS = ["%Y-%m-%d", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S"]
+    # CPUs and memory (MB) an output is expected to need while it is rendered, see '--cpu-budget'
+    JOB_RESOURCES = {
+        "statistics": (1, 256),
+        # videos are inspected by a pool of up to 4 processes
+        "video statistics": (4, 512),
+        "photo statistics": (1, 256),
+        "stay statistics": (1, 512),
+        "pdf": (2, 1024),
+        "step maps": (2, 512),
+        "trip map": (1, 512),
+        "export": (1, 256),
+        "analytics": (1, 512),
+    }
 
 
 class UserConfig:
     """User configuration constants."""
 
-    def __init__(self, input_folder: str, output_folder: str, zoom_factor: str, image_pixel_size: str, step_numbers_to_process: list[int]) -> None:
+    def __init__(
+        self,
+        input_folder: str,
+        output_folder: str,
+        zoom_factor: str,
+        image_pixel_size: str,
+        step_numbers_to_process: list[int],
+        tile_pack: str | None = None,
+        thumbnail_width: int | None = None,
+        image_format: str = "png",
+    ) -> None:
         self._input_folder = input_folder
         self._output_folder = output_folder
         self._zoom_factor = int(zoom_factor)
         self._image_pixel_width, self._image_pixel_height = utils.decode_image_size(image_pixel_size)
-        self._trip_map_filename_pattern = "trip_map.png"
-        self._step_map_filename_pattern = "step_{step_number}_map.png"
+        self._image_format = image_format
+        extension = MapEncoder.FORMATS[image_format]
+        self._trip_map_filename_pattern = f"trip_map{extension}"
+        self._step_map_filename_pattern = "step_{step_number}_map" + extension
+        self._trip_map_thumbnail_filename_pattern = f"trip_map_thumb{extension}"
+        self._step_map_thumbnail_filename_pattern = "step_{step_number}_map_thumb" + extension
+        self._thumbnail_width = thumbnail_width
         self._step_numbers_to_process = step_numbers_to_process
+        self._step_map_numbers = step_numbers_to_process
+        self._tile_pack = tile_pack
+        self._tile_pack_provider = None
 
     @property
     def input_folder(self) -> str:  # noqa: D102
@@ -70,10 +128,46 @@ class UserConfig:
     def step_map_filename_pattern(self) -> str:  # noqa: D102
         return self._step_map_filename_pattern
 
+    @property
+    def trip_map_thumbnail_filename_pattern(self) -> str:  # noqa: D102
+        return self._trip_map_thumbnail_filename_pattern
+
+    @property
+    def step_map_thumbnail_filename_pattern(self) -> str:  # noqa: D102
+        return self._step_map_thumbnail_filename_pattern
+
+    @property
+    def image_format(self) -> str:  # noqa: D102
+        return self._image_format
+
+    @property
+    def thumbnail_width(self) -> int | None:  # noqa: D102
+        return self._thumbnail_width
+
     @property
     def step_numbers_to_process(self) -> list[int]: # noqa: D102
         return self._step_numbers_to_process
 
+    @property
+    def step_map_numbers(self) -> list[int]:
+        """Steps to generate a map for, all steps to process unless maps of unchanged steps are kept."""
+        return self._step_map_numbers
+
+    @step_map_numbers.setter
+    def step_map_numbers(self, step_numbers: list[int]) -> None:
+        self._step_map_numbers = step_numbers
+
+    @property
+    def tile_pack(self) -> str | None:  # noqa: D102
+        return self._tile_pack
+
+    @property
+    def tile_pack_provider(self) -> staticmaps.TileProvider | None:
+        """Provider for the offline tile pack if one is configured. It is shared by all maps."""
+        if self._tile_pack is not None and self._tile_pack_provider is None:
+            self._tile_pack_provider = MapGenerator.tile_pack_provider(Path(self._tile_pack))
+        return self._tile_pack_provider
+
 
 def validate_zoom_factor(ctx, param, value) -> Optional[str]:
     """Validate zoom token where N is a number between ZOOM_LEVEL_SINGLE_STEP_VIEW_[MIN/MAX]."""
@@ -100,13 +194,22 @@ def validate_image_size(ctx, param, value) -> Optional[str]:
     return value
 
 
+def validate_zoom_range(ctx, param, value) -> Optional[str]:
+    """Validate zoom range in format 'MIN-MAX'."""
+    try:
+        _ = utils.decode_zoom_range(value)
+    except ValueError as e:
+        raise click.BadParameter(e)
+    return value
+
+
 def validate_option_filter(ctx, param, value) -> Optional[str]:
     """Validate the step_map option value."""
     try:
         value = value.strip().lower()
         if value == Const.ALL_STEPS_KEYWORD:
             return value
-        _ = utils.decode_step_filter(value)
+        _ = parse_step_filter(value)
     except ValueError as e:
         raise click.BadParameter(e)
     return value
@@ -121,10 +224,11 @@ def validate_option_map(ctx, param, value) -> Optional[str]:
      --map trip,wl: Same as 'trip' but additional add a line to marker of preceding step
      --map step: Create a map for each step (with respect to filter) with a marker for this step only
                  May be combine with '--zoom'.
+     --map trip,stays: Same as 'trip' but additionally mark the places where the traveller stayed
     """
     if value is None:
         return value
-    allowed_values = ["step", "trip", "wl"]
+    allowed_values = ["step", "trip", "wl", "stays"]
     value = value.strip().lower()
     for token in value.split(","):
         if token not in allowed_values:
@@ -132,6 +236,25 @@ def validate_option_map(ctx, param, value) -> Optional[str]:
     return value
 
 
+def validate_export_filenames(ctx, param, value) -> tuple[str, ...]:
+    """Validate that the format of each file of the export option is known by its suffix."""
+    for filename in value:
+        try:
+            file_format = geo_export.export_format(Path(filename))
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        if file_format == "flatgeobuf" and geo_export.fiona is None:
+            raise click.BadParameter("FlatGeobuf export needs the package 'fiona'.")
+    return value
+
+
+def validate_analytics_folder(ctx, param, value) -> Optional[str]:
+    """Validate that the analytics export can be written."""
+    if value is not None and columnar_export.pyarrow is None:
+        raise click.BadParameter("Parquet and Arrow export needs the package 'pyarrow'.")
+    return value
+
+
 @click.command()
 @click.option(
     "--input-folder",
@@ -139,7 +262,16 @@ def validate_option_map(ctx, param, value) -> Optional[str]:
     type=click.Path(exists=True),
     required=True,
     help="""The folder which contains 'trip.json' and 'locations.json'.
-    It's inside the Polarsteps data export of a single trip.""",
+    It's inside the Polarsteps data export of a single trip.
+    Alternatively the ZIP file of the data export, which is read without unpacking it.""",
+)
+@click.option(
+    "--trip",
+    "trip_selector",
+    is_flag=False,
+    default=None,
+    help="Part of the folder name of the trip to read, if the ZIP file given by '--input-folder' contains "
+    "several trips.",
 )
 @click.option(
     "--output-folder",
@@ -155,6 +287,14 @@ def validate_option_map(ctx, param, value) -> Optional[str]:
     default=None,
     help="Whether to generate a PDF. Specify name of PDF file to create.",
 )
+@click.option(
+    "--pdf-photos-per-row",
+    "pdf_photos_per_row",
+    default=1,
+    help="Number of photos side by side in the PDF, e.g. 2 for a two-up grid.",
+    type=click.IntRange(1, 3),
+    show_default=True,
+)
 @click.option(
     "--map",
     "generate_maps",
@@ -163,7 +303,8 @@ def validate_option_map(ctx, param, value) -> Optional[str]:
     help="""Generate maps for selected steps. Possible values are a comma-separated list of:
      'step' to generate a map for each step.
      'trip' to generate a single map for the entire trip.
-     'wl' to add walking line between steps. In combination with 'trip' only""",
+     'wl' to add walking line between steps. In combination with 'trip' only
+     'stays' to mark places where the traveller stayed, from the GPS track. In combination with 'trip' only""",
     callback=validate_option_map,
 )
 @click.option(
@@ -185,13 +326,151 @@ def validate_option_map(ctx, param, value) -> Optional[str]:
     callback=validate_image_size,
     show_default=True,
 )
+@click.option(
+    "--image-format",
+    "image_format",
+    type=click.Choice(list(MapEncoder.FORMATS)),
+    default="png",
+    help="Encoding of generated maps. 'png-fast' and 'jpeg' encode fastest, 'png-palette' and 'webp' are smallest.",
+    show_default=True,
+)
+@click.option(
+    "--thumbnail-width",
+    "thumbnail_width",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Additionally write a thumbnail of each map with this width in pixel. It is downscaled from the map.",
+)
+@click.option(
+    "--tile-pack",
+    "tile_pack",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Read map tiles from this MBTiles file instead of downloading them. No network access is needed.",
+)
+@click.option(
+    "--seed-tile-pack",
+    "seed_tile_pack_file",
+    is_flag=False,
+    default=None,
+    help="Download the OSM tiles around the selected steps into this MBTiles file for offline use with '--tile-pack'.",
+)
+@click.option(
+    "--seed-zoom",
+    "seed_zoom_range",
+    is_flag=False,
+    default=f"0-{Const.ZOOM_LEVEL_SINGLE_STEP_VIEW_DEFAULT}",
+    help="Zoom levels to download with '--seed-tile-pack' in format MIN-MAX.",
+    callback=validate_zoom_range,
+    show_default=True,
+)
+@click.option(
+    "--convert-track",
+    "convert_track",
+    is_flag=True,
+    default=False,
+    help=f"Convert 'locations.json' into the binary 'locations{TRACK_FILE_SUFFIX}' next to it, which loads instantly.",
+    type=bool,
+)
+@click.option(
+    "--export",
+    "export_filenames",
+    multiple=True,
+    help="Export the GPS track and the selected steps for GIS tools into this file. The format is chosen by suffix: "
+    "'.gpx', '.geojson' or '.fgb' (FlatGeobuf, needs 'fiona'). Can be given several times.",
+    callback=validate_export_filenames,
+)
+@click.option(
+    "--export-simplify",
+    "export_simplify",
+    type=click.FloatRange(min=0.0),
+    default=0.0,
+    help="Drop track points closer than this distance in meters to the previously exported point.",
+)
+@click.option(
+    "--export-from",
+    "export_from",
+    type=click.DateTime(formats=Const.EXPORT_TIME_FORMATS),
+    default=None,
+    help="Export only track points and steps from this local time on, e.g. '2024-05-01' or '2024-05-01 14:30'.",
+)
+@click.option(
+    "--export-until",
+    "export_until",
+    type=click.DateTime(formats=Const.EXPORT_TIME_FORMATS),
+    default=None,
+    help="Export only track points and steps up to this local time.",
+)
+@click.option(
+    "--analytics",
+    "analytics_folder",
+    is_flag=False,
+    default=None,
+    help="Export steps and GPS track as typed columnar datasets 'steps' and 'locations' into this folder, "
+    "one partition per trip, e.g. for DuckDB. Needs 'pyarrow'.",
+    callback=validate_analytics_folder,
+)
+@click.option(
+    "--analytics-format",
+    "analytics_format",
+    type=click.Choice(list(columnar_export.FORMATS)),
+    default="parquet",
+    help="File format of '--analytics'.",
+    show_default=True,
+)
+@click.option(
+    "--analytics-all-trips",
+    "analytics_all_trips",
+    is_flag=True,
+    default=False,
+    help="Export all trips found in '--input-folder' with '--analytics' instead of the selected one. "
+    "No other action is done.",
+    type=bool,
+)
+@click.option(
+    "--incremental",
+    "incremental",
+    is_flag=True,
+    default=False,
+    help="Ingest only what is new in the export since the last incremental run into the output folder and render "
+    "only the outputs affected by it. Outputs of unchanged steps are kept.",
+    type=bool,
+)
+@click.option(
+    "--gazetteer",
+    "gazetteer_file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Place names for offline reverse geocoding of the GPS track, a GeoNames dump (e.g. 'cities1000.txt') or a CSV "
+    "file with the columns name, lat, lon and country. '--stat' then prints days and distance per country.",
+)
+@click.option(
+    "--cpu-budget",
+    "cpu_budget",
+    type=click.IntRange(min=0),
+    default=0,
+    help="CPUs which the outputs (statistics, PDF, maps, exports) rendered at the same time may use together. "
+    "0 uses all CPUs.",
+    show_default=True,
+)
+@click.option(
+    "--memory-budget",
+    "memory_budget",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Memory in MB which the outputs rendered at the same time may use together. 0 uses half of the available "
+    "memory.",
+    show_default=True,
+)
 @click.option("--stat", "statistics", is_flag=True, default=False, help="Print statistic of input files.", type=bool)
 @click.option(
     "--filter",
     "step_filter",
     is_flag=False,
     default=Const.ALL_STEPS_KEYWORD,
-    help="Specify which steps to process as list (e.g. '2,6') or range (e.g. '5-7') or combinations thereof. "
+    help="Specify which steps to process as list (e.g. '2,6') or range (e.g. '5-7') or combinations thereof, or by "
+    "clauses 'date:2025-03-01..2025-03-20', 'country:japan,korea', 'name:kyoto' and "
+    "'bbox:LAT_MIN,LON_MIN,LAT_MAX,LON_MAX'. Clauses separated by ';' select the steps matching all of them. "
     "Otherwise all existing steps are processed.",
     callback=validate_option_filter,
     show_default=True,
@@ -206,117 +485,543 @@ def validate_option_map(ctx, param, value) -> Optional[str]:
 )
 def cli(
     input_folder: str,
+    trip_selector: str,
     output_folder: str,
     pdf_filename: str,
+    pdf_photos_per_row: int,
     loglevel: str,
     statistics: bool,
     step_filter: str,
     generate_maps: bool,
     zoom_factor: int,
     image_size_x_y: str,
+    image_format: str,
+    thumbnail_width: int,
+    tile_pack: str,
+    seed_tile_pack_file: str,
+    seed_zoom_range: str,
+    convert_track: bool,
+    export_filenames: tuple[str, ...],
+    export_simplify: float,
+    export_from: datetime | None,
+    export_until: datetime | None,
+    analytics_folder: str | None,
+    analytics_format: str,
+    analytics_all_trips: bool,
+    incremental: bool,
+    gazetteer_file: str | None,
+    cpu_budget: int,
+    memory_budget: int,
 ) -> None:
     """Entry point for the application."""
     # note: its ensured that both folders <input_folder> and <output_folder> exist by click options
 
     configure_logger(loglevel)
+    metadata_cache = MetadataCache(MetadataCache.DEFAULT_PATH)
+    set_shared_cache(metadata_cache)
 
-    trip = model.load_trip_from_file(Path(os.path.join(input_folder, "trip.json")))
-    locations = model.load_locations_from_file(Path(os.path.join(input_folder, "locations.json")))
+    if analytics_all_trips:
+        # the trips are read one by one, none needs to be selected
+        export_analytics_of_all_trips(Path(input_folder), output_folder, analytics_folder, analytics_format)
+        metadata_cache.save()
+        return
 
-    config = UserConfig(input_folder, output_folder, zoom_factor, image_size_x_y, calulate_steps_to_process(step_filter, trip))
+    export = open_export(Path(input_folder), trip_selector)
+    trip = model.load_trip_from_file(export / "trip.json")
+    ingest = Ingest(Path(output_folder) / Const.INGEST_FOLDER) if incremental else None
+    locations, delta = load_locations(export, trip, convert_track, ingest)
 
-    if statistics:
-        generate_statistics(trip, locations)
+    config = UserConfig(
+        input_folder,
+        output_folder,
+        zoom_factor,
+        image_size_x_y,
+        calulate_steps_to_process(step_filter, trip),
+        tile_pack,
+        thumbnail_width,
+        image_format,
+    )
+
+    actions = [
+        statistics,
+        pdf_filename,
+        generate_maps,
+        seed_tile_pack_file,
+        convert_track,
+        export_filenames,
+        analytics_folder,
+    ]
+    pdf_filename, generate_maps, export_filenames, analytics_folder = skip_unaffected_outputs(
+        config, delta, pdf_filename, generate_maps, export_filenames, analytics_folder
+    )
+
+    if seed_tile_pack_file is not None:
+        seed_tile_pack_for_selected_steps(config, trip, seed_tile_pack_file, seed_zoom_range)
 
+    jobs = [
+        *statistics_and_pdf_jobs(config, trip, locations, statistics, gazetteer_file, pdf_filename, pdf_photos_per_row),
+        *export_jobs(
+            config,
+            trip,
+            locations,
+            export_filenames,
+            (export_simplify, export_from, export_until),
+            analytics_folder,
+            analytics_format,
+        ),
+        *map_jobs(config, trip_selector, locations, generate_maps),
+    ]
+    if jobs:
+        run_jobs(jobs, Budget.of_machine(cpu_budget, memory_budget), loglevel)
+
+    if ingest is not None:
+        ingest.commit()
+
+    if not any([*actions, incremental]):
+        click.echo(
+            "No action specified. See --stat, --pdf, --map, --export, --analytics, --seed-tile-pack or --convert-track"
+        )
+
+    metadata_cache.save()
+
+
+def load_locations(  # noqa: D103
+    export: Path, trip: model.Trip, convert_track: bool, ingest: Ingest | None
+) -> tuple[model.Track, IngestDelta | None]:
+    if convert_track:
+        convert_track_of_export(export)
+    if ingest is None:
+        return load_track(export), None
+    locations, delta = ingest.ingest(export, trip)
+    click.echo(delta.summary())
+    return locations, delta
+
+
+def skip_unaffected_outputs(
+    config: UserConfig,
+    delta: IngestDelta | None,
+    pdf_filename: str | None,
+    generate_maps: str | None,
+    export_filenames: tuple[str, ...],
+    analytics_folder: str | None,
+) -> tuple[str | None, str | None, tuple[str, ...], str | None]:
+    """Drop the outputs which exist and are not affected by the new steps and GPS points of an incremental run.
+
+    The PDF and maps show steps, only exports and stays on the trip map depend on the GPS track.
+    """
+    if delta is None or delta.first_run:
+        return pdf_filename, generate_maps, export_filenames, analytics_folder
+
+    def missing(filename: str) -> bool:
+        return not os.path.exists(os.path.join(config.output_folder, filename))
+
+    new_steps = [number for number in config.step_numbers_to_process if number in delta.new_step_numbers]
+    if pdf_filename is not None and not new_steps and not missing(pdf_filename):
+        pdf_filename = None
+    if generate_maps:
+        config.step_map_numbers = [
+            number
+            for number in config.step_numbers_to_process
+            if number in new_steps or missing(config.step_map_filename_pattern.format(step_number=number))
+        ]
+        track_changed = "stays" in generate_maps and delta.new_point_count > 0
+        if not new_steps and not track_changed and not missing(config.trip_map_filename_pattern):
+            generate_maps = ",".join(token for token in generate_maps.split(",") if token != "trip")
+    if not new_steps and delta.new_point_count == 0:
+        export_filenames = tuple(filename for filename in export_filenames if missing(filename))
+        analytics_folder = analytics_folder if analytics_folder is not None and missing(analytics_folder) else None
+    logger.info(
+        f"Outputs to render again: PDF {pdf_filename}, maps {generate_maps} of steps {config.step_map_numbers}, "
+        f"exports {export_filenames}, analytics {analytics_folder}"
+    )
+    return pdf_filename, generate_maps, export_filenames, analytics_folder
+
+
+def run_jobs(jobs: list[Job], budget: Budget, loglevel: str) -> None:
+    """Render all outputs at the same time, they only read the trip and the track.
+
+    Jobs which return a text, like the statistics, have it printed once all jobs finished. Printing from a job would
+    tear the progress bar.
+    """
+    scheduler = Scheduler(budget, configure_logger, (loglevel,))
+    results = scheduler.run(jobs, label=f"Rendering {', '.join(job.name for job in jobs)}")
+    for job in jobs:
+        if isinstance(results.get(job.name), str):
+            click.echo(results[job.name])
+
+
+def statistics_and_pdf_jobs(  # noqa: D103
+    config: UserConfig,
+    trip: model.Trip,
+    locations: model.Track,
+    statistics: bool,
+    gazetteer_file: str | None,
+    pdf_filename: str | None,
+    pdf_photos_per_row: int,
+) -> list[Job]:
+    jobs = []
+    if statistics:
+        # figures which read media files or scan the track are jobs of their own, so they share the budget
+        jobs += [
+            Job("statistics", generate_statistics, (trip, locations), 1, *job_resources("statistics")),
+            Job("video statistics", video_statistics, (trip,), 1, *job_resources("video statistics")),
+            Job("photo statistics", photo_statistics, (trip, locations), 1, *job_resources("photo statistics")),
+            Job("stay statistics", stay_statistics, (locations, gazetteer_file), 1, *job_resources("stay statistics")),
+        ]
     if pdf_filename is not None:
-        generate_pdf(config, trip, pdf_filename)
+        jobs.append(
+            Job(
+                "pdf",
+                generate_pdf,
+                (config, trip, pdf_filename, JobProgress("pdf"), pdf_photos_per_row),
+                len(config.step_numbers_to_process),
+                *job_resources("pdf"),
+            )
+        )
+    return jobs
+
+
+def export_jobs(  # noqa: D103
+    config: UserConfig,
+    trip: model.Trip,
+    locations: model.Track,
+    export_filenames: tuple[str, ...],
+    export_options: tuple[float, datetime | None, datetime | None],
+    analytics_folder: str | None,
+    analytics_format: str,
+) -> list[Job]:
+    jobs = [
+        Job(
+            f"export {filename}",
+            export_track_and_steps,
+            (config, trip, locations, (filename,), *export_options),
+            1,
+            *job_resources("export"),
+        )
+        for filename in export_filenames
+    ]
+    if analytics_folder is not None:
+        output_path = Path(os.path.join(config.output_folder, analytics_folder))
+        args = (trip, locations, output_path, analytics_format)
+        jobs.append(Job("analytics", export_analytics, args, 1, *job_resources("analytics")))
+    return jobs
 
-    if generate_maps and "step" in generate_maps:
-        generate_distinct_map_for_selected_steps(config, trip)
 
-    if generate_maps and "trip" in generate_maps:
-        generate_single_map_for_selected_steps(config, trip, generate_maps)
+def map_jobs(  # noqa: D103
+    config: UserConfig, trip_selector: str | None, locations: model.Track, generate_maps: str | None
+) -> list[Job]:
+    jobs = []
+    tokens = generate_maps.split(",") if generate_maps else []
+    # maps are rendered in processes of their own, rendering holds the GIL
+    if "step" in tokens and config.step_map_numbers:
+        progress = JobProgress("step maps")
+        args = (config, trip_selector, None, "step", progress)
+        resources = job_resources("step maps")
+        jobs.append(Job("step maps", render_maps_in_process, args, len(config.step_map_numbers), *resources, True))
+    if "trip" in tokens:
+        trip_maps = ",".join(token for token in tokens if token != "step")
+        args = (config, trip_selector, locations if "stays" in tokens else None, trip_maps, JobProgress("trip map"))
+        jobs.append(Job("trip map", render_maps_in_process, args, 1, *job_resources("trip map"), True))
+    return jobs
 
-    if not any([statistics, pdf_filename, generate_maps]):
-        click.echo("No action specified. See --stat, --pdf or --map")
 
+def job_resources(name: str) -> tuple[int, int]:
+    """Return CPUs and memory (MB) expected for an output, as given by 'Const.JOB_RESOURCES'."""
+    return Const.JOB_RESOURCES[name]
 
-def generate_statistics(trip: model.Trip, locations: list[MapGenerator.GPSPoint]) -> None:  # noqa: D103
-    """Generate and print statistics about the trip and location data."""
-    click.echo(f"Trip name: {trip.name}")
-    click.echo(f"Number of steps: {len(trip.steps)}")
+
+def convert_track_of_export(export: Path) -> None:  # noqa: D103
+    if is_in_archive(export):
+        raise click.UsageError("'--convert-track' needs an extracted trip folder as '--input-folder'.")
+    track_path = export / f"locations{TRACK_FILE_SUFFIX}"
+    count = convert_locations_json(export / "locations.json", track_path)
+    click.echo(f"Converted {count} GPS points into {track_path}")
+
+
+def generate_statistics(trip: model.Trip, locations: model.Track) -> str:
+    """Return the numbers of steps, photos, videos and GPS points as text to print."""
     total_photos = sum(len(step.photos) for step in trip.steps)
     total_videos = sum(len(step.videos) for step in trip.steps)
-    click.echo(f"Total photos: {total_photos}")
-    click.echo(f"Total videos: {total_videos}")
-    click.echo(f"Number of GPS points in locations file: {len(locations)}")
+    return "\n".join(
+        [
+            f"Trip name: {trip.name}",
+            f"Number of steps: {len(trip.steps)}",
+            f"Total photos: {total_photos}",
+            f"Total videos: {total_videos}",
+            f"Number of GPS points in locations file: {len(locations)}",
+        ]
+    )
 
 
-def generate_pdf(config: UserConfig, trip: model.Trip, filename: str) -> None:  # noqa: D103
+def video_statistics(trip: model.Trip) -> str:
+    """Return the total duration of all videos as text to print, videos missing in the metadata cache are inspected."""
+    videos = [video for step in trip.steps for video in step.videos]
+    total_seconds = sum(info.duration_seconds or 0.0 for info in video_infos(videos))
+    return f"Total video duration: {total_seconds / 60:.1f} min"
+
+
+def photo_statistics(trip: model.Trip, locations: model.Track) -> str:
+    """Return the number of photos located on the track as text to print, which reads the EXIF header of each."""
+    return f"Photos located on the track by capture time: {trip.geotag_photos(locations)}"
+
+
+def stay_statistics(locations: model.Track, gazetteer_file: str | None) -> str:
+    """Return the stays on the track and, with a gazetteer, the days and distance per country as text to print."""
+    stays = detect_stays(locations)
+    hours = total_duration(stays).total_seconds() / 3600
+    minutes = MIN_STAY_DURATION.total_seconds() / 60
+    lines = [
+        f"Stays of at least {minutes:.0f} min within {STAY_RADIUS_M:.0f} m: {len(stays)}",
+        f"Total time of stays: {hours:.1f} h",
+    ]
+    if gazetteer_file is None:
+        return "\n".join(lines)
+    gazetteer = Gazetteer.load(Path(gazetteer_file))
+    if stays:
+        longest = max(stays, key=lambda stay: stay.duration)
+        place = gazetteer.lookup(longest.lat, longest.lon)
+        where = f"near {place.name} ({place.country})" if place is not None else "far from any known place"
+        lines.append(f"Longest stay: {longest.duration.total_seconds() / 3600:.1f} h {where}")
+    for country, country_statistics in reverse_geocoder.country_statistics(locations, gazetteer).items():
+        lines.append(
+            f"Country {country}: {country_statistics.days} days, {country_statistics.distance_km:.0f} km on the track"
+        )
+    return "\n".join(lines)
+
+
+def generate_pdf(  # noqa: D103
+    config: UserConfig, trip: model.Trip, filename: str, progress: JobProgress, photos_per_row: int = 1
+) -> None:
     output_path = Path(os.path.join(config.output_folder, filename))
-    progress_bar = click.progressbar(
-        length=len(config.step_numbers_to_process),
-        label=f"Generating PDF for {len(config.step_numbers_to_process)} steps into {output_path}",
-    )
-    pdf_generator = PDFGenerator(output_path.as_posix())
-    pdf_generator.generate_pdf(trip, progress_bar, config.step_numbers_to_process)
+    journal = JobJournal.of_output_folder(config.output_folder, "pdf")
+    inputs = pdf_inputs(trip, config.step_numbers_to_process, photos_per_row)
+    if journal.is_done(filename, inputs):
+        logger.info(f"Keeping PDF {output_path}, it is complete and its steps, photos and videos are unchanged")
+        return
+    # photos are placed in order of capture time, read their EXIF headers for all steps at once
+    trip.read_photo_metadata(config.step_numbers_to_process)
+    # inspect the videos of all steps in one process pool, pages then use the cached results
+    videos = [video for step_number in config.step_numbers_to_process for video in trip.get_step(step_number).videos]
+    video_infos(videos, with_posters=True)
+    pdf_generator = PDFGenerator(output_path.as_posix(), photos_per_row)
+    plan = pdf_generator.plan(trip, config.step_numbers_to_process)
+    step_count = len(config.step_numbers_to_process)
+    logger.info(f"Generating PDF with {plan.page_count} pages for {step_count} steps into {output_path}")
+    progress.set_length(plan.page_count)
+    pdf_generator.render(plan, progress)
+    journal.record(filename, inputs, [output_path])
 
 
-def generate_distinct_map_for_selected_steps(config: UserConfig, trip: model.Trip) -> None:  # noqa: D103
-    progress_bar = click.progressbar(
-        length=len(config.step_numbers_to_process),
-        label=f"Generating maps for {len(config.step_numbers_to_process)} steps into folder {config.output_folder}",
+def pdf_inputs(trip: model.Trip, step_numbers: list[int], photos_per_row: int) -> str:
+    """Return the fingerprint of everything shown in the PDF of the given steps."""
+    steps = [trip.get_step(step_number) for step_number in step_numbers]
+    return inputs_fingerprint(
+        trip.name,
+        trip.start_date,
+        trip.end_date,
+        trip.cover_photo_path,
+        photos_per_row,
+        [
+            (step.step_id, step.name, step.description, step.location.name, step.location.country, step.date)
+            for step in steps
+        ],
+        [file_fingerprint(media) for step in steps for media in [*step.photos, *step.videos]],
     )
-    with progress_bar as visible_bar:
-        for zero_based_index, step_number in enumerate(config.step_numbers_to_process):
-            step = trip.get_step(step_number)
-            generate_distinct_map_for_selected_step(config, step_number, step)
-            visible_bar.update(zero_based_index + 1)
 
 
-def generate_distinct_map_for_selected_step(config: UserConfig, step_number: int, step: model.Step) -> None:  # noqa: D103
-    filename = config.step_map_filename_pattern.format(step_number=step_number)
-    output_path = Path(os.path.join(config.output_folder, filename))
-    logger.debug(f"Generating map for step {step_number} into {output_path}")
+def export_track_and_steps(  # noqa: D103
+    config: UserConfig,
+    trip: model.Trip,
+    locations: model.Track,
+    filenames: tuple[str, ...],
+    simplify_m: float,
+    start: datetime | None,
+    end: datetime | None,
+) -> None:
+    steps = [trip.get_step(step_number) for step_number in config.step_numbers_to_process]
+    for filename in filenames:
+        output_path = Path(os.path.join(config.output_folder, filename))
+        started = time.perf_counter()
+        count = geo_export.export_trip(output_path, trip.name, locations, steps, start, end, simplify_m)
+        seconds = time.perf_counter() - started
+        logger.info(
+            f"Exported {count} of {len(locations)} GPS points and {len(steps)} steps into {output_path} "
+            f"in {seconds:.2f} s ({count / max(seconds, 1e-9):,.0f} points/s)"
+        )
+
+
+def export_analytics(  # noqa: D103
+    trip: model.Trip, locations: model.Track, output_path: Path, file_format: str
+) -> None:
+    steps_file, locations_file = columnar_export.export_trip(output_path, trip, locations, file_format)
+    logger.info(f"Exported {len(trip.steps)} steps into {steps_file}")
+    logger.info(f"Exported {len(locations)} GPS points into {locations_file}")
+
+
+def export_analytics_of_all_trips(  # noqa: D103
+    input_path: Path, output_folder: str, analytics_folder: str | None, file_format: str
+) -> None:
+    if analytics_folder is None:
+        raise click.UsageError("'--analytics-all-trips' needs the output folder given by '--analytics'.")
+    output_path = Path(os.path.join(output_folder, analytics_folder))
+    folders = trip_folders(input_path)
+    with click.progressbar(folders, label=f"Exporting {len(folders)} trips into {output_path}") as visible_folders:
+        for folder in visible_folders:
+            trip = model.load_trip_from_file(folder / "trip.json")
+            columnar_export.export_trip(output_path, trip, load_track(folder), file_format)
+
+
+def render_maps_in_process(  # noqa: D103
+    config: UserConfig,
+    trip_selector: str | None,
+    locations: model.Track | None,
+    generate_maps: str,
+    progress: JobProgress,
+) -> None:
+    # a trip read from an export ZIP cannot be sent to another process, the process reads the trip itself
+    trip = model.load_trip_from_file(open_export(Path(config.input_folder), trip_selector) / "trip.json")
+    generate_maps_for_selected_steps(config, trip, locations, generate_maps, progress)
+
+
+def generate_maps_for_selected_steps(  # noqa: D103
+    config: UserConfig, trip: model.Trip, locations: model.Track | None, generate_maps: str, progress: JobProgress
+) -> None:
+    if "step" in generate_maps and config.step_map_numbers:
+        generate_distinct_map_for_selected_steps(config, trip, progress)
+    if "trip" in generate_maps:
+        generate_single_map_for_selected_steps(config, trip, generate_maps, locations)
+
+
+def generate_distinct_map_for_selected_steps(  # noqa: D103
+    config: UserConfig, trip: model.Trip, progress: JobProgress
+) -> None:
+    journal = JobJournal.of_output_folder(config.output_folder, "step-maps")
+    locations = {step_number: trip.get_step(step_number).location for step_number in config.step_map_numbers}
+    inputs = {number: map_inputs(config, location.lat, location.lon) for number, location in locations.items()}
+    step_numbers = [n for n in config.step_map_numbers if not journal.is_done(f"step {n}", inputs[n])]
+    if len(step_numbers) < len(config.step_map_numbers):
+        kept_count = len(config.step_map_numbers) - len(step_numbers)
+        logger.info(f"Keeping {kept_count} step maps which are complete and unchanged")
+        progress.update(kept_count)
+    if not step_numbers:
+        return
+    map_generators = [
+        build_distinct_map_for_selected_step(config, trip.get_step(step_number)) for step_number in step_numbers
+    ]
+    logger.info(f"Generating maps for {len(step_numbers)} steps into folder {config.output_folder}")
+    encoder = MapEncoder(config.image_format, max_workers=Const.ENCODER_THREADS)
+    with TileFetcher() as tile_fetcher, encoder, progress as visible_bar:
+        MapGenerator.prefetch_tiles(map_generators, tile_fetcher)
+        # All step maps share zoom and size, so their base maps are rendered from shared tile mosaics.
+        for index, map_image in SharedBaseMapRenderer().render(map_generators):
+            step_number = step_numbers[index]
+            filename = config.step_map_filename_pattern.format(step_number=step_number)
+            output_path = Path(os.path.join(config.output_folder, filename))
+            logger.debug(f"Generating map for step {step_number} into {output_path}")
+            outputs = {output_path: encoder.submit(map_image, output_path)}
+            if config.thumbnail_width is not None:
+                filename = config.step_map_thumbnail_filename_pattern.format(step_number=step_number)
+                thumbnail_path = Path(os.path.join(config.output_folder, filename))
+                thumbnail = scale_surface(map_image, config.thumbnail_width)
+                outputs[thumbnail_path] = encoder.submit(thumbnail, thumbnail_path)
+            journal.record_when_done(f"step {step_number}", inputs[step_number], outputs, list(outputs.values()))
+            visible_bar.update(1)
+    logger.info(encoder.summary())
+
+
+def build_distinct_map_for_selected_step(config: UserConfig, step: model.Step) -> MapGenerator:  # noqa: D103
     map_generator: MapGenerator = build_map_generator(config, "SINGLE_STEP_VIEW")
     gps_point = MapGenerator.GPSPoint(lat=step.location.lat, lon=step.location.lon)
     map_generator.add_location_marker(gps_point, marker_size=12)
-    map_generator.write_to_png(output_path)
+    return map_generator
 
 
-def generate_single_map_for_selected_steps(config: UserConfig, trip: model.Trip, generate_maps: str) -> None:  # noqa: D103
+def generate_single_map_for_selected_steps(  # noqa: D103
+    config: UserConfig, trip: model.Trip, generate_maps: str, locations: model.Track | None = None
+) -> None:
     output_path = Path(os.path.join(config.output_folder, config.trip_map_filename_pattern))
+    gps_tuples = []
+    for step_number in config.step_numbers_to_process:
+        step_location = trip.get_step(step_number).location
+        gps_tuples.append((step_location.lat, step_location.lon))
+    show_stays = "stays" in generate_maps and locations is not None
+    stays = stays_of_selected_steps(config, trip, locations) if show_stays else []
+    journal = JobJournal.of_output_folder(config.output_folder, "trip-map")
+    symbols = sorted(token for token in generate_maps.split(",") if token in ("wl", "stays"))
+    inputs = map_inputs(config, gps_tuples, symbols, [(stay.lat, stay.lon) for stay in stays])
+    if journal.is_done(config.trip_map_filename_pattern, inputs):
+        logger.info(f"Keeping map {output_path}, it is complete and its steps are unchanged")
+        return
     logger.info(f"Generating map for selected steps into {output_path}")
+    map_generator: MapGenerator = build_map_generator(config, "SATELLITE_VIEW")
+    gps_points = MapGenerator.GPSPoint.from_tuples(gps_tuples)
+    if "wl" in generate_maps:
+        map_generator.set_symbol_color(MapGenerator.BLUE)
+        map_generator.add_multi_line(gps_points, width=4)
+    if stays:
+        map_generator.set_symbol_color(MapGenerator.PURPLE)
+        map_generator.add_stay_markers(MapGenerator.GPSPoint.from_tuples([(s.lat, s.lon) for s in stays]), 8)
+    map_generator.add_location_markers(gps_points, marker_size=12)
+    variants = [MapVariant(output_path, config.image_pixel_width)]
+    if config.thumbnail_width is not None:
+        thumbnail_path = Path(os.path.join(config.output_folder, config.trip_map_thumbnail_filename_pattern))
+        variants.append(MapVariant(thumbnail_path, config.thumbnail_width))
+    with TileFetcher() as tile_fetcher, MapEncoder(config.image_format) as encoder:
+        MapGenerator.prefetch_tiles([map_generator], tile_fetcher)
+        map_generator.write_variants(variants, encoder)
+    journal.record(config.trip_map_filename_pattern, inputs, [variant.output_filepath for variant in variants])
+    logger.info(encoder.summary())
+
 
-    progress_bar = click.progressbar(
-        length=1,
-        label=f"Generating map for selected steps into {output_path}",
+def map_inputs(config: UserConfig, *inputs: object) -> str:
+    """Return the fingerprint of the inputs of a map together with the map settings of the configuration."""
+    tiles = file_fingerprint(config.tile_pack) if config.tile_pack is not None else None
+    return inputs_fingerprint(
+        config.zoom_factor,
+        config.image_pixel_width,
+        config.image_pixel_height,
+        config.image_format,
+        config.thumbnail_width,
+        tiles,
+        *inputs,
     )
-    with progress_bar as visible_bar:
-        map_generator: MapGenerator = build_map_generator(config, "SATELLITE_VIEW")
-        gps_tuples = []
-        for step_number in config.step_numbers_to_process:
-            step_location = trip.get_step(step_number).location
-            gps_tuples.append((step_location.lat, step_location.lon))
-        gps_points = MapGenerator.GPSPoint.from_tuples(gps_tuples)
-        if "wl" in generate_maps:
-            map_generator.set_symbol_color(MapGenerator.BLUE)
-            map_generator.add_multi_line(gps_points, width=4)
-        map_generator.add_location_markers(gps_points, marker_size=12)
-        map_generator.write_to_png(output_path)
-        visible_bar.update(1)
+
+
+def stays_of_selected_steps(config: UserConfig, trip: model.Trip, locations: model.Track) -> list[Stay]:
+    """Return the stays from the start of the first selected step up to the start of the step after the last one."""
+    start = trip.get_step(min(config.step_numbers_to_process)).date
+    next_step_number = max(config.step_numbers_to_process) + 1
+    end = trip.get_step(next_step_number).date if next_step_number <= len(trip.steps) else None
+    return [stay for stay in detect_stays(locations) if start <= stay.arrival and (end is None or stay.arrival < end)]
+
+
+def seed_tile_pack_for_selected_steps(config: UserConfig, trip: model.Trip, filename: str, zoom_range: str) -> None:  # noqa: D103
+    locations = [trip.get_step(step_number).location for step_number in config.step_numbers_to_process]
+    bounds = (
+        min(location.lat for location in locations),
+        min(location.lon for location in locations),
+        max(location.lat for location in locations),
+        max(location.lon for location in locations),
+    )
+    output_path = Path(os.path.join(config.output_folder, filename))
+    click.echo(f"Seeding tile pack {output_path} for zoom levels {zoom_range}")
+    with TileFetcher() as tile_fetcher:
+        written = seed_tile_pack(
+            output_path, MapGenerator.PROVIDER_OSM, bounds, utils.decode_zoom_range(zoom_range), tile_fetcher
+        )
+    click.echo(f"Added {written} tiles to {output_path}")
 
 
 def build_map_generator(config: UserConfig, style: str) -> MapGenerator:  # noqa: D103
     map_generator = None
     match style:
         case "SINGLE_STEP_VIEW":
-            map_generator = MapGenerator(MapGenerator.PROVIDER_OSM)
+            map_generator = MapGenerator(config.tile_pack_provider or MapGenerator.PROVIDER_OSM)
             map_generator.set_zoom(config.zoom_factor)
             map_generator.set_image_properties(config.image_pixel_width, config.ratio_x_over_y)
 
         case "SATELLITE_VIEW":
-            map_generator = MapGenerator(MapGenerator.PROVIDER_ARCGISWORLDIMAGERY)
+            map_generator = MapGenerator(config.tile_pack_provider or MapGenerator.PROVIDER_ARCGISWORLDIMAGERY)
             # Don't specify zoom factor. Generator will select a suitable one.
             map_generator.set_image_properties(config.image_pixel_width, config.ratio_x_over_y)
 
@@ -338,7 +1043,9 @@ def calulate_steps_to_process(step_filter: str, trip: model.Trip) -> list[int]:
     if step_filter == Const.ALL_STEPS_KEYWORD:
         steps_to_process = range(1, len(trip.steps) + 1)
     else:
-        steps_to_process = utils.decode_step_filter(step_filter)
+        steps_to_process = select_steps(step_filter, trip)
+    if not steps_to_process:
+        raise ValueError(f"Filter '{step_filter}' matches none of the {len(trip.steps)} steps.")
     min_step_to_process = steps_to_process[0]
     max_step_to_process = steps_to_process[-1]
     if min_step_to_process < 1:
@@ -24,10 +24,17 @@ from PIL import Image
 import cairo
 import staticmaps
 
+from polarsteps_data_parser.map_generator import MapGenerator, MapVariant
+from polarsteps_data_parser.media_index import MediaIndex, link_or_copy
+from polarsteps_data_parser.photo_metadata import sort_by_capture_time
+from polarsteps_data_parser.tile_fetcher import TileFetcher
+
 
 # other global parameters
 def_width = 800 # default width for images
 extract_dir = "zzz_extracts"
+media_index = MediaIndex()
+extracted_media = {} # first extracted copy of each distinct media file
 
 
 SINGLE_STEP_MAP_ZOOM_FACTORS = [6,7,8]
@@ -74,7 +81,8 @@ def parse_data(data, original_path, extract_dir):
     # create .txt file
     file_out = f"{extract_dir}{os.sep}{trip_name}_{trip_start_date}.txt"
 
-    with open(file_out,'w', encoding="utf-8") as f_out:
+    # the tiles of the step maps are fetched over shared connections
+    with open(file_out,'w', encoding="utf-8") as f_out, TileFetcher() as tile_fetcher:
 
         text = f"Trip Name: {trip_name}\n{trip_summary}\n"
         text += f"Start Date: {trip_start_date}\nEnd Date: {trip_end_date}\n"
@@ -139,7 +147,7 @@ def parse_data(data, original_path, extract_dir):
             # get the list of photos and sort them to try to retrieve PS order
             sorted_photos = []
             path = build_ps_path_to_picture(original_path, step_id, step_slug)
-            photos_nbr, sorted_photos = get_sorted_files_from_directory(path)
+            photos_nbr, sorted_photos = get_photos_sorted_by_capture_time(path)
 
             # get the list of videos and sort them to try to retrieve PS order
             sorted_videos = []
@@ -155,11 +163,15 @@ def parse_data(data, original_path, extract_dir):
             media_output_path = build_step_output_dir_with_prefix(extract_dir, step_num, step_slug, step_start_time)
             create_dir(media_output_path)
 
-            # generate map with a single marker this step location
+            # generate maps with a single marker this step location, all zoom levels in one session
+            variants = []
             for index, zoom in enumerate(SINGLE_STEP_MAP_ZOOM_FACTORS):
-                step_map = make_step_map(location_lat, location_lon, zoom, SINGLE_STEP_MAP_MARKER_SIZE)
-                map_output_filename = build_output_media_filename(step_num, step_slug, step_start_time, index=index, basename="location_map")  
-                render_and_write_map(step_map, f"{media_output_path}{os.sep}{map_output_filename}")
+                map_output_filename = build_output_media_filename(step_num, step_slug, step_start_time, index=index, basename="location_map")
+                variants.append(MapVariant(Path(f"{media_output_path}{os.sep}{map_output_filename}.png"), def_width, zoom))
+            step_map = make_step_map_generator(location_lat, location_lon, SINGLE_STEP_MAP_MARKER_SIZE, tile_fetcher)
+            step_map.write_variants(variants)
+            # tiles in memory are only shared by the zoom levels of a step, later steps read them from the disk cache
+            tile_fetcher.evict(step_map.provider)
 
             all_steps_map.add_object(staticmaps.Marker(staticmaps.create_latlng(location_lat, location_lon), size=10))
 
@@ -167,14 +179,14 @@ def parse_data(data, original_path, extract_dir):
             for index, basename in enumerate(sorted_photos):
                 source = f"{build_ps_path_to_picture(original_path, step_id, step_slug)}{os.sep}{basename}"
                 destination = build_output_path_to_media(extract_dir, step_num, step_slug, step_start_time, index, basename)
-                copy2(source,destination)
+                extract_media_file(source, destination)
                 print(f"copy to {destination}")
 
             # create a renamed copy of the file
             for index, basename in enumerate(sorted_videos):
                 source = f"{build_ps_path_to_video(original_path, step_id, step_slug)}{os.sep}{basename}"
                 destination = build_output_path_to_media(extract_dir, step_num, step_slug, step_start_time, index, basename)
-                copy2(source,destination)
+                extract_media_file(source, destination)
 
 
             f_out.write(f"{text}\n")
@@ -211,10 +223,14 @@ def make_all_steps_map():
     global_map = make_map(staticmaps.tile_provider_ArcGISWorldImagery)
     return global_map
 
-def make_step_map(location_lat, location_lon, zoom, marker_size):
-    step_map = make_map(staticmaps.tile_provider_OSM)
-    step_map.set_zoom(zoom) # define static zoom level
-    step_map.add_object(staticmaps.Marker(staticmaps.create_latlng(location_lat, location_lon), size=marker_size))
+def make_step_map_generator(
+    location_lat: float, location_lon: float, marker_size: int, tile_fetcher: TileFetcher
+) -> MapGenerator:
+    """Return the generator of a map with a marker at the step location which fetches tiles through 'tile_fetcher'."""
+    step_map = MapGenerator(MapGenerator.PROVIDER_OSM)
+    step_map.set_image_properties(def_width, 3/2)
+    step_map.set_tile_fetcher(tile_fetcher)
+    step_map.add_location_marker(MapGenerator.GPSPoint(location_lat, location_lon), marker_size=marker_size)
     return step_map
 
 
@@ -223,11 +239,17 @@ def render_and_write_all_steps_map(extract_dir, all_steps_map):
     global_map_image = all_steps_map.render_cairo(def_width*2, int(def_width/2*3))
     global_map_image.write_to_png(f"{extract_dir}{os.sep}steps_map.png")
 
-def render_and_write_map(step_map, map_name):
-    map_image = step_map.render_cairo(def_width, int(def_width/3*2))
-    filename = f"{map_name}.png"
-    print(f"wirte image to {filename}")
-    map_image.write_to_png(f"{map_name}.png")
+
+
+
+def extract_media_file(source: str, destination: str) -> None:
+    """Copy a media file, files with identical content are hard-linked to their first copy."""
+    canonical = media_index.add(Path(source))
+    if canonical in extracted_media:
+        link_or_copy(extracted_media[canonical], Path(destination))
+    else:
+        copy2(source,destination)
+        extracted_media[canonical] = Path(destination)
 
 
 
@@ -247,6 +269,21 @@ def get_sorted_files_from_directory(path):
 
 
 
+def get_photos_sorted_by_capture_time(path: str) -> tuple[int, list[str]]:
+    """Return number and names of the photos in a folder sorted by EXIF capture time.
+
+    The modification time which 'get_sorted_files_from_directory' sorts by is lost when exports are copied.
+    """
+    number = 0
+    sorted_names = []
+    if os.path.isdir(path):
+        photos = [Path(entry.path) for entry in os.scandir(path) if entry.is_file()]
+        sorted_names = [photo.name for photo in sort_by_capture_time(photos)]
+        number = len(sorted_names)
+    return number,sorted_names
+
+
+
 def build_step_output_dir_with_prefix(extract_dir, step_num, step_slug, time):
     destination = f"{extract_dir}{os.sep}{time.strftime('%Y%m%d_%H%M%S')}_{step_num:04d}_{step_slug}"
     return destination
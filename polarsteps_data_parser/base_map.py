@@ -0,0 +1,175 @@
+import math
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import staticmaps
+from loguru import logger
+
+from polarsteps_data_parser.map_generator import MapGenerator
+
+try:
+    import cairo
+except ImportError:
+    cairo = None
+
+
+@dataclass(frozen=True)
+class PixelWindow:
+    """Area of a map in world pixel coordinates of its zoom level."""
+
+    left: float
+    top: float
+    width: int
+    height: int
+
+    @classmethod
+    def from_transformer(cls, trans: staticmaps.Transformer) -> "PixelWindow":
+        """Return the window exactly as staticmaps places the tiles of a map."""
+        return cls(
+            left=trans.first_tile_x() * trans.tile_size() - trans.tile_offset_x(),
+            top=trans.first_tile_y() * trans.tile_size() - trans.tile_offset_y(),
+            width=trans.image_width(),
+            height=trans.image_height(),
+        )
+
+    @property
+    def right(self) -> float:  # noqa: D102
+        return self.left + self.width
+
+    @property
+    def bottom(self) -> float:  # noqa: D102
+        return self.top + self.height
+
+
+@dataclass(frozen=True)
+class Mosaic:
+    """Range of tiles which is stitched once and shared by all maps of a region."""
+
+    first_tile_x: int
+    first_tile_y: int
+    tiles_x: int
+    tiles_y: int
+    tile_size: int
+
+    @classmethod
+    def covering(cls, windows: list[PixelWindow], tile_size: int) -> "Mosaic":
+        """Return the smallest tile range which covers all windows."""
+        first_tile_x = math.floor(min(window.left for window in windows) / tile_size)
+        first_tile_y = math.floor(min(window.top for window in windows) / tile_size)
+        last_tile_x = math.ceil(max(window.right for window in windows) / tile_size) - 1
+        last_tile_y = math.ceil(max(window.bottom for window in windows) / tile_size) - 1
+        return cls(
+            first_tile_x, first_tile_y, last_tile_x - first_tile_x + 1, last_tile_y - first_tile_y + 1, tile_size
+        )
+
+    def offset_of(self, window: PixelWindow) -> tuple[float, float]:
+        """Return where the mosaic has to be painted on a map to show the given window."""
+        return self.first_tile_x * self.tile_size - window.left, self.first_tile_y * self.tile_size - window.top
+
+
+def group_windows(windows: list[PixelWindow], max_mosaic_size: int, tile_size: int = 256) -> list[list[int]]:
+    """Group windows into regions whose mosaic is at most 'max_mosaic_size' pixels wide and high.
+
+    Windows are swept from left to right and added to the first open region they fit into. A region is closed
+    as soon as the sweep has moved too far right for any further window to fit.
+
+    Returns:
+        list[list[int]]: indices into 'windows' per region
+    """
+    # The mosaic snaps to tile borders which may add up to one tile on each side.
+    limit = max_mosaic_size - 2 * tile_size
+    regions: list[list[int]] = []
+    open_regions: list[tuple[list[float], list[int]]] = []
+    for index in sorted(range(len(windows)), key=lambda i: (windows[i].left, windows[i].top)):
+        window = windows[index]
+        open_regions = [(bounds, region) for bounds, region in open_regions if window.right - bounds[0] <= limit]
+        for bounds, region in open_regions:
+            top = min(bounds[1], window.top)
+            right = max(bounds[2], window.right)
+            bottom = max(bounds[3], window.bottom)
+            if right - bounds[0] <= limit and bottom - top <= limit:
+                bounds[1:] = [top, right, bottom]
+                region.append(index)
+                break
+        else:
+            region = [index]
+            regions.append(region)
+            open_regions.append(([window.left, window.top, window.right, window.bottom], region))
+    return regions
+
+
+class SharedBaseMapRenderer:
+    """Renders batches of maps which share zoom, size and provider from shared base map mosaics.
+
+    Neighbouring maps need mostly the same tiles. Instead of stitching every map from its tiles, the tiles of a
+    region are decoded and stitched into one mosaic, and each map is cropped from it before its markers are drawn.
+    """
+
+    DEFAULT_MAX_MOSAIC_SIZE = 4096
+
+    def __init__(self, max_mosaic_size: int = DEFAULT_MAX_MOSAIC_SIZE) -> None:
+        if not staticmaps.cairo_is_supported():
+            raise RuntimeError('You need to install the "cairo" module to render maps.')
+        self._max_mosaic_size = max_mosaic_size
+
+    def render(self, generators: list[MapGenerator]) -> Iterator[tuple[int, "cairo.ImageSurface"]]:
+        """Render all maps and yield (index into 'generators', image) in order of completion."""
+        batches: dict[tuple, list[int]] = {}
+        transformers = [generator.transformer() for generator in generators]
+        for index, (generator, trans) in enumerate(zip(generators, transformers)):
+            if trans is None:
+                raise RuntimeError("Cannot render map without center/zoom.")
+            key = (generator.provider.name(), trans.zoom(), generator.image_size)
+            batches.setdefault(key, []).append(index)
+
+        for indices in batches.values():
+            windows = [PixelWindow.from_transformer(transformers[index]) for index in indices]
+            tile_size = transformers[indices[0]].tile_size()
+            for region in group_windows(windows, self._max_mosaic_size, tile_size):
+                region_indices = [indices[i] for i in region]
+                mosaic = Mosaic.covering([windows[i] for i in region], tile_size)
+                mosaic_surface = self._stitch(generators[region_indices[0]], transformers[region_indices[0]], mosaic)
+                logger.debug(
+                    f"Rendering {len(region_indices)} maps from a mosaic of {mosaic.tiles_x}x{mosaic.tiles_y} tiles"
+                )
+                for i, index in zip(region, region_indices):
+                    yield index, self._crop(generators[index], transformers[index], mosaic, windows[i], mosaic_surface)
+
+    @staticmethod
+    def _stitch(generator: MapGenerator, trans: staticmaps.Transformer, mosaic: Mosaic) -> "cairo.ImageSurface":
+        surface = cairo.ImageSurface(
+            cairo.FORMAT_ARGB32, mosaic.tiles_x * mosaic.tile_size, mosaic.tiles_y * mosaic.tile_size
+        )
+        context = cairo.Context(surface)
+        for yy in range(mosaic.tiles_y):
+            y = mosaic.first_tile_y + yy
+            if y < 0 or y >= trans.number_of_tiles():
+                continue
+            for xx in range(mosaic.tiles_x):
+                x = (mosaic.first_tile_x + xx) % trans.number_of_tiles()
+                try:
+                    tile_data = generator.fetch_tile(trans.zoom(), x, y)
+                except RuntimeError:
+                    continue
+                if tile_data is None:
+                    continue
+                context.set_source_surface(
+                    staticmaps.CairoRenderer.create_image(tile_data), xx * mosaic.tile_size, yy * mosaic.tile_size
+                )
+                context.paint()
+        return surface
+
+    @staticmethod
+    def _crop(
+        generator: MapGenerator,
+        trans: staticmaps.Transformer,
+        mosaic: Mosaic,
+        window: PixelWindow,
+        mosaic_surface: "cairo.ImageSurface",
+    ) -> "cairo.ImageSurface":
+        renderer = staticmaps.CairoRenderer(trans)
+        generator.render_background(renderer)
+        renderer.context().set_source_surface(mosaic_surface, *mosaic.offset_of(window))
+        renderer.context().paint()
+        generator.render_overlay(renderer)
+        return renderer.image_surface()
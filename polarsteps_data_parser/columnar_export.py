@@ -0,0 +1,156 @@
+import re
+from array import array
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+
+from loguru import logger
+
+from polarsteps_data_parser.model import Step, Track, Trip
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# export format -> file suffix
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+BATCH_SIZE = 65536
+
+
+def step_columns(steps: Sequence[Step], first_step_number: int, trip_id: str) -> dict[str, list]:
+    """Return the columns of a batch of steps, times as microseconds since the epoch (UTC)."""
+    return {
+        "trip_id": [trip_id] * len(steps),
+        "step_number": list(range(first_step_number, first_step_number + len(steps))),
+        "step_id": [str(step.step_id) for step in steps],
+        "name": [step.name for step in steps],
+        # naive times of the model are local times
+        "date": [round(step.date.timestamp() * 1_000_000) for step in steps],
+        "lat": [step.location.lat for step in steps],
+        "lon": [step.location.lon for step in steps],
+        "location": [step.location.name for step in steps],
+        "country": [step.location.country for step in steps],
+        "photo_count": [len(step.photos) for step in steps],
+        "video_count": [len(step.videos) for step in steps],
+    }
+
+
+def location_columns(track: Track, start: int, stop: int, trip_id: str) -> dict[str, Sequence]:
+    """Return the columns of the track points [start, stop), times as microseconds since the epoch (UTC).
+
+    Coordinates of a memory-mapped track are returned as views without a copy.
+    """
+    return {
+        "trip_id": [trip_id] * (stop - start),
+        "lat": _float_column(track.lats[start:stop]),
+        "lon": _float_column(track.lons[start:stop]),
+        "time": array("q", (round(time * 1_000_000) for time in track.times[start:stop])),
+    }
+
+
+def step_batches(trip: Trip, trip_id: str, batch_size: int = BATCH_SIZE) -> Iterator[dict[str, list]]:
+    """Yield the columns of all steps of a trip in batches."""
+    for start in range(0, len(trip.steps), batch_size):
+        yield step_columns(trip.steps[start : start + batch_size], start + 1, trip_id)
+
+
+def location_batches(track: Track, trip_id: str, batch_size: int = BATCH_SIZE) -> Iterator[dict[str, Sequence]]:
+    """Yield the columns of all track points in batches."""
+    for start in range(0, len(track), batch_size):
+        yield location_columns(track, start, min(start + batch_size, len(track)), trip_id)
+
+
+def export_trip(
+    output_folder: Path, trip: Trip, track: Track, file_format: str = "parquet", batch_size: int = BATCH_SIZE
+) -> tuple[Path, Path]:
+    """Write steps and track points of a trip as partition 'trip=<id>' of the datasets 'steps' and 'locations'.
+
+    Batches are written one at a time as row groups (Parquet) or record batches (Arrow IPC), so memory stays bounded
+    by the batch size. Partitions of other trips are kept, the trip's own partition is replaced. The datasets can be
+    read as a whole, e.g. by DuckDB: SELECT * FROM 'steps/*/*.parquet'. Each row has the column 'trip_id'.
+
+    Returns:
+        tuple: files written for steps and locations
+    """
+    if pyarrow is None:
+        raise RuntimeError("Parquet and Arrow export needs the package 'pyarrow'.")
+    trip_id = trip.trip_id or re.sub(r"[^\w.-]", "_", trip.name)
+    steps_file = _write_dataset(
+        output_folder / "steps", trip_id, file_format, _steps_schema(), step_batches(trip, trip_id, batch_size)
+    )
+    locations_file = _write_dataset(
+        output_folder / "locations",
+        trip_id,
+        file_format,
+        _locations_schema(),
+        location_batches(track, trip_id, batch_size),
+    )
+    logger.debug(f"Exported {len(trip.steps)} steps and {len(track)} track points of trip {trip_id}")
+    return steps_file, locations_file
+
+
+def _write_dataset(
+    dataset: Path, trip_id: str, file_format: str, schema: "pyarrow.Schema", batches: Iterator[dict]
+) -> Path:
+    partition = dataset / f"trip={trip_id}"
+    partition.mkdir(parents=True, exist_ok=True)
+    output = partition / f"part-0{FORMATS[file_format]}"
+    temporary = output.with_suffix(".tmp")
+    if file_format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(str(temporary), schema)
+    else:
+        writer = pyarrow.ipc.new_file(str(temporary), schema)
+    with writer:
+        for columns in batches:
+            writer.write_batch(pyarrow.record_batch(_arrays(columns, schema), schema=schema))
+    temporary.replace(output)
+    return output
+
+
+def _arrays(columns: dict[str, Sequence], schema: "pyarrow.Schema") -> list["pyarrow.Array"]:
+    arrays = []
+    for field in schema:
+        values = columns[field.name]
+        if isinstance(values, (array, memoryview)):
+            # fixed width columns are wrapped without a copy
+            arrays.append(pyarrow.Array.from_buffers(field.type, len(values), [None, pyarrow.py_buffer(values)]))
+        else:
+            arrays.append(pyarrow.array(values, type=field.type))
+    return arrays
+
+
+def _steps_schema() -> "pyarrow.Schema":
+    return pyarrow.schema(
+        [
+            ("trip_id", pyarrow.string()),
+            ("step_number", pyarrow.int32()),
+            ("step_id", pyarrow.string()),
+            ("name", pyarrow.string()),
+            ("date", pyarrow.timestamp("us", tz="UTC")),
+            ("lat", pyarrow.float64()),
+            ("lon", pyarrow.float64()),
+            ("location", pyarrow.string()),
+            ("country", pyarrow.string()),
+            ("photo_count", pyarrow.int32()),
+            ("video_count", pyarrow.int32()),
+        ]
+    )
+
+
+def _locations_schema() -> "pyarrow.Schema":
+    return pyarrow.schema(
+        [
+            ("trip_id", pyarrow.string()),
+            ("lat", pyarrow.float64()),
+            ("lon", pyarrow.float64()),
+            ("time", pyarrow.timestamp("us", tz="UTC")),
+        ]
+    )
+
+
+def _float_column(values: Sequence[float]) -> array | memoryview:
+    if isinstance(values, memoryview) or (isinstance(values, array) and values.typecode == "d"):
+        return values
+    return array("d", values)
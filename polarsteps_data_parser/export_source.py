@@ -0,0 +1,83 @@
+import os
+import zipfile
+from pathlib import Path
+from typing import BinaryIO
+
+from loguru import logger
+
+# A file or folder of a trip export, either extracted on disk or inside the export's ZIP file.
+ExportPath = Path | zipfile.Path
+
+
+def open_export(path: Path, trip: str | None = None) -> ExportPath:
+    """Return the folder of a trip, either an extracted folder or a folder inside a Polarsteps export ZIP.
+
+    A ZIP file is read through its central directory, members are only read when they are accessed.
+
+    Args:
+        path: folder which contains 'trip.json' or ZIP file of a data export
+        trip: part of the folder name of the trip to select, if the ZIP contains several trips
+    """
+    if path.is_dir():
+        return path
+    archive = _open_archive(path)
+    folders = _trip_folder_names(archive)
+    if trip is not None:
+        folders = [folder for folder in folders if trip in folder]
+    if len(folders) != 1:
+        raise ValueError(
+            f"'{path}' contains {len(folders)} matching trips ({', '.join(folders) or 'none'}). "
+            "Select one by a part of its folder name."
+        )
+    logger.debug(f"Reading trip '{folders[0]}' from '{path}'")
+    return zipfile.Path(archive, folders[0])
+
+
+def trip_folders(path: Path) -> list[ExportPath]:
+    """Return the folders of all trips of a data export, which is an extracted folder or its ZIP file."""
+    if path.is_dir():
+        return sorted(file.parent for file in path.rglob("trip.json"))
+    archive = _open_archive(path)
+    return [zipfile.Path(archive, folder) for folder in _trip_folder_names(archive)]
+
+
+def is_in_archive(path: ExportPath | str) -> bool:
+    """Return whether 'path' is a member of a ZIP file."""
+    return isinstance(path, zipfile.Path)
+
+
+def open_binary(path: ExportPath | str) -> BinaryIO:
+    """Open a file for reading bytes. Files inside a ZIP file support seeking."""
+    if is_in_archive(path):
+        return path.open("rb")
+    return open(path, "rb")
+
+
+def file_size(path: ExportPath | str) -> int:
+    """Return the (uncompressed) size of a file."""
+    if is_in_archive(path):
+        return path.root.getinfo(path.at).file_size
+    return os.path.getsize(path)
+
+
+def fingerprint(path: ExportPath | str) -> str:
+    """Return a key which changes whenever the file is modified."""
+    if is_in_archive(path):
+        info = path.root.getinfo(path.at)
+        return f"{Path(path.root.filename).resolve().as_posix()}!{path.at}|{info.file_size}|{info.CRC:08x}"
+    stat = os.stat(path)
+    return f"{Path(path).resolve().as_posix()}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _open_archive(path: Path) -> zipfile.ZipFile:
+    if not zipfile.is_zipfile(path):
+        raise ValueError(f"'{path}' is neither a folder nor a ZIP file.")
+    return zipfile.ZipFile(path)
+
+
+def _trip_folder_names(archive: zipfile.ZipFile) -> list[str]:
+    return sorted(
+        name.removesuffix("trip.json")
+        for name in archive.namelist()
+        if name == "trip.json" or name.endswith("/trip.json")
+    )
@@ -0,0 +1,200 @@
+import json
+import math
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TextIO
+from xml.sax.saxutils import escape
+
+from loguru import logger
+
+from polarsteps_data_parser.model import Step, Track
+
+try:
+    import fiona
+except ImportError:
+    fiona = None
+
+# file suffix -> export format
+FORMATS = {".gpx": "gpx", ".geojson": "geojson", ".json": "geojson", ".fgb": "flatgeobuf"}
+EARTH_RADIUS_M = 6_371_000.0
+# size of the write buffer, points are written one by one into it
+BUFFER_SIZE = 1024 * 1024
+
+TrackPoint = tuple[float, float, float]
+
+
+def export_format(path: Path) -> str:
+    """Return the export format of a file by its suffix, see 'FORMATS'."""
+    try:
+        return FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown export format of '{path}'. Use one of: {', '.join(FORMATS)}") from None
+
+
+def track_points(
+    track: Track, start: datetime | None = None, end: datetime | None = None, tolerance_m: float = 0.0
+) -> Iterator[TrackPoint]:
+    """Yield (lat, lon, unix time) of the track points between 'start' and 'end'.
+
+    With a tolerance, points closer than 'tolerance_m' to the last yielded point are dropped (radial distance
+    simplification). Unlike Douglas-Peucker it needs a single pass and no buffer, so it works on tracks of any length.
+    The last point within the time range is always kept.
+    """
+    start_time = start.timestamp() if start is not None else -math.inf
+    end_time = end.timestamp() if end is not None else math.inf
+    last: TrackPoint | None = None
+    dropped: TrackPoint | None = None
+    for point in track.points():
+        if not start_time <= point[2] <= end_time:
+            continue
+        if last is not None and tolerance_m > 0.0 and distance_m(last, point) < tolerance_m:
+            dropped = point
+            continue
+        yield point
+        last, dropped = point, None
+    if dropped is not None:
+        yield dropped
+
+
+def distance_m(a: TrackPoint, b: TrackPoint) -> float:
+    """Return the distance of two points in meters, by equirectangular approximation which is exact enough nearby."""
+    delta_lon = (b[1] - a[1] + 180.0) % 360.0 - 180.0
+    x = math.radians(delta_lon) * math.cos(math.radians((a[0] + b[0]) / 2))
+    y = math.radians(b[0] - a[0])
+    return EARTH_RADIUS_M * math.hypot(x, y)
+
+
+def steps_in_range(steps: Iterable[Step], start: datetime | None = None, end: datetime | None = None) -> list[Step]:
+    """Return the steps which start between 'start' and 'end'."""
+    return [step for step in steps if (start is None or step.date >= start) and (end is None or step.date <= end)]
+
+
+def write_gpx(output: Path, name: str, points: Iterable[TrackPoint], steps: list[Step]) -> int:
+    """Write steps as waypoints and the points as track into a GPX 1.1 file.
+
+    Returns:
+        int: number of track points written
+    """
+    count = 0
+    with _open_for_writing(output) as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file.write('<gpx version="1.1" creator="polarsteps-data-parser" xmlns="http://www.topografix.com/GPX/1/1">\n')
+        file.write(f"<metadata><name>{escape(name)}</name></metadata>\n")
+        for step in steps:
+            file.write(
+                f'<wpt lat="{step.location.lat}" lon="{step.location.lon}"><time>{_iso_time(step.date)}</time>'
+                f"<name>{escape(step.name)}</name><desc>{escape(step.location.name)}</desc></wpt>\n"
+            )
+        file.write(f"<trk><name>{escape(name)}</name><trkseg>\n")
+        for lat, lon, time in points:
+            file.write(f'<trkpt lat="{lat}" lon="{lon}"><time>{_iso_timestamp(time)}</time></trkpt>\n')
+            count += 1
+        file.write("</trkseg></trk>\n</gpx>\n")
+    return count
+
+
+def write_geojson(output: Path, name: str, points: Iterable[TrackPoint], steps: list[Step]) -> int:
+    """Write the points as LineString and the steps as Point features into a GeoJSON FeatureCollection.
+
+    The line's properties follow its coordinates, so its point count and time span are known when they are written.
+
+    Returns:
+        int: number of track points written
+    """
+    count = 0
+    first_time = last_time = None
+    with _open_for_writing(output) as file:
+        file.write('{"type": "FeatureCollection", "features": [\n')
+        file.write('{"type": "Feature", "geometry": {"type": "LineString", "coordinates": [')
+        for lat, lon, time in points:
+            file.write(f"{',' if count else ''}\n[{lon}, {lat}]")
+            count += 1
+            first_time = time if first_time is None else first_time
+            last_time = time
+        properties = {
+            "name": name,
+            "point_count": count,
+            "start_time": _iso_timestamp(first_time) if first_time is not None else None,
+            "end_time": _iso_timestamp(last_time) if last_time is not None else None,
+        }
+        file.write(f']}},\n"properties": {json.dumps(properties, ensure_ascii=False)}}}')
+        for step in steps:
+            feature = {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [step.location.lon, step.location.lat]},
+                "properties": {
+                    "name": step.name,
+                    "location": step.location.name,
+                    "country": step.location.country,
+                    "time": _iso_time(step.date),
+                },
+            }
+            file.write(f",\n{json.dumps(feature, ensure_ascii=False)}")
+        file.write("\n]}\n")
+    return count
+
+
+def write_flatgeobuf(output: Path, name: str, points: Iterable[TrackPoint], steps: list[Step]) -> int:
+    """Write the steps and the track points as Point features into a FlatGeobuf file, needs 'fiona'.
+
+    A layer has a single geometry type, so the track is written point by point with a 'kind' of 'track' rather
+    than as one line, which would have to be held in memory as a whole.
+
+    Returns:
+        int: number of track points written
+    """
+    if fiona is None:
+        raise RuntimeError("FlatGeobuf export needs the package 'fiona'.")
+    schema = {"geometry": "Point", "properties": {"kind": "str", "name": "str", "time": "str"}}
+    count = 0
+    with fiona.open(output, "w", driver="FlatGeobuf", schema=schema, crs="EPSG:4326") as layer:
+        for step in steps:
+            layer.write(_point_record(step.location.lat, step.location.lon, "step", step.name, _iso_time(step.date)))
+        for lat, lon, time in points:
+            layer.write(_point_record(lat, lon, "track", name, _iso_timestamp(time)))
+            count += 1
+    return count
+
+
+WRITERS = {"gpx": write_gpx, "geojson": write_geojson, "flatgeobuf": write_flatgeobuf}
+
+
+def export_trip(
+    output: Path,
+    name: str,
+    track: Track,
+    steps: list[Step],
+    start: datetime | None = None,
+    end: datetime | None = None,
+    tolerance_m: float = 0.0,
+) -> int:
+    """Export track and steps into a GPX, GeoJSON or FlatGeobuf file chosen by the suffix of 'output'.
+
+    Returns:
+        int: number of track points written
+    """
+    points = track_points(track, start, end, tolerance_m)
+    count = WRITERS[export_format(output)](output, name, points, steps_in_range(steps, start, end))
+    logger.debug(f"Exported {count} of {len(track)} track points into '{output}'")
+    return count
+
+
+def _open_for_writing(output: Path) -> TextIO:
+    return open(output, "w", encoding="utf-8", buffering=BUFFER_SIZE)
+
+
+def _point_record(lat: float, lon: float, kind: str, name: str, time: str) -> dict:
+    return {
+        "geometry": {"type": "Point", "coordinates": (lon, lat)},
+        "properties": {"kind": kind, "name": name, "time": time},
+    }
+
+
+def _iso_timestamp(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _iso_time(time: datetime) -> str:
+    # naive times of the model are local times
+    return time.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -0,0 +1,58 @@
+from bisect import bisect_right
+from collections.abc import Sequence
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from polarsteps_data_parser.model import Track
+
+MAX_GAP = timedelta(minutes=30)
+
+
+def geotag(
+    times: Sequence[float | None], track: "Track", max_gap: timedelta = MAX_GAP
+) -> list[tuple[float, float] | None]:
+    """Return the position (lat, lon) on the track at each of the given unix times.
+
+    The fixes before and after each time are found by bisection of the track's time column, which is read in place,
+    e.g. from a memory-mapped track file, so n times on a track of m points take O(n log m). Positions are interpolated
+    between these fixes. If they are more than 'max_gap' apart, the nearer fix is used if it is within 'max_gap'.
+
+    Returns:
+        list: position for each time, None if the time is None or too far away from any fix
+    """
+    track = track.sorted_by_time()
+    fix_times = track.times
+    max_gap_seconds = max_gap.total_seconds()
+    positions: list[tuple[float, float] | None] = [None] * len(times)
+    if not len(fix_times):
+        return positions
+    for i, time in enumerate(times):
+        if time is None:
+            continue
+        after = bisect_right(fix_times, time)
+        before = after - 1 if after > 0 else None
+        positions[i] = _position_at(track, time, before, after if after < len(fix_times) else None, max_gap_seconds)
+    return positions
+
+
+def _position_at(
+    track: "Track", time: float, before: int | None, after: int | None, max_gap: float
+) -> tuple[float, float] | None:
+    times, lats, lons = track.times, track.lats, track.lons
+    if before is not None and after is not None and times[after] - times[before] <= max_gap:
+        fraction = (time - times[before]) / (times[after] - times[before])
+        delta_lon = lons[after] - lons[before]
+        # take the short way across the antimeridian
+        if delta_lon > 180.0:
+            delta_lon -= 360.0
+        elif delta_lon < -180.0:
+            delta_lon += 360.0
+        lon = lons[before] + fraction * delta_lon
+        lon = (lon + 180.0) % 360.0 - 180.0
+        return lats[before] + fraction * (lats[after] - lats[before]), lon
+    candidates = [fix for fix in (before, after) if fix is not None and abs(times[fix] - time) <= max_gap]
+    if not candidates:
+        return None
+    nearest = min(candidates, key=lambda fix: abs(times[fix] - time))
+    return lats[nearest], lons[nearest]
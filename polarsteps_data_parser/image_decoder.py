@@ -0,0 +1,110 @@
+import hashlib
+import threading
+from pathlib import Path
+
+import appdirs
+from loguru import logger
+from PIL import Image
+
+from polarsteps_data_parser.export_source import ExportPath, open_binary
+from polarsteps_data_parser.image_probe import cached_image_size
+from polarsteps_data_parser.metadata_cache import MetadataCache
+
+try:
+    import pillow_heif
+
+    pillow_heif.register_heif_opener()
+except ImportError:
+    pillow_heif = None
+
+
+class MemoryBudget:
+    """Limits the memory of all bitmaps which are decoded at the same time, across threads."""
+
+    def __init__(self, limit_bytes: int) -> None:
+        self._limit_bytes = limit_bytes
+        self._used_bytes = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit_bytes(self) -> int:  # noqa: D102
+        return self._limit_bytes
+
+    def acquire(self, size_bytes: int) -> None:
+        """Block until 'size_bytes' fit into the budget."""
+        if size_bytes > self._limit_bytes:
+            raise MemoryError(f"Decoding needs {size_bytes} bytes, the limit is {self._limit_bytes} bytes")
+        with self._condition:
+            self._condition.wait_for(lambda: self._used_bytes + size_bytes <= self._limit_bytes)
+            self._used_bytes += size_bytes
+
+    def release(self, size_bytes: int) -> None:  # noqa: D102
+        with self._condition:
+            self._used_bytes -= size_bytes
+            self._condition.notify_all()
+
+
+class ImageDecoder:
+    """Prepares photos for embedding into a PDF without decoding them at full resolution.
+
+    JPEGs of moderate size are embedded as they are, reportlab copies their data without decoding. All other photos
+    (large JPEGs, HEIC, PNG, ...) are decoded at reduced scale and stored as JPEG in a cache directory. JPEGs are
+    decoded with DCT scaling and HEIC from its embedded thumbnail where possible (Pillow's 'draft'), so a 48 MP photo
+    never exists as a full-size bitmap. The memory of all bitmaps decoded at the same time is limited by a budget.
+    """
+
+    CACHE_DIR = Path(appdirs.user_cache_dir("polarsteps-data-parser")) / "pdf-images"
+    DEFAULT_MAX_EDGE = 1600
+    DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+    JPEG_QUALITY = 85
+    BYTES_PER_PIXEL = 4
+
+    def __init__(
+        self,
+        max_edge: int = DEFAULT_MAX_EDGE,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+        cache_dir: Path | None = None,
+    ) -> None:
+        self._max_edge = max_edge
+        self._budget = MemoryBudget(memory_limit)
+        self._cache_dir = cache_dir or self.CACHE_DIR
+
+    def embeddable(self, path: ExportPath) -> ExportPath:
+        """Return a file with the content of 'path' which reportlab can embed at reasonable size.
+
+        'path' may be inside an export ZIP, it is returned as it is or read from the ZIP without extracting it.
+        """
+        size = cached_image_size(path)
+        if size is not None and max(size) <= self._max_edge and self._is_jpeg(path):
+            return path
+        output = self._cache_dir / f"{self._cache_key(path)}.jpg"
+        if not output.exists():
+            self._decode_reduced(path, output)
+        return output
+
+    def _decode_reduced(self, path: ExportPath, output: Path) -> None:
+        with open_binary(path) as file, Image.open(file) as image:
+            scale = min(1.0, self._max_edge / max(image.size))
+            # 'draft' picks the smallest DCT scale or thumbnail which is at least the requested size
+            image.draft("RGB", (max(1, int(image.width * scale)), max(1, int(image.height * scale))))
+            width, height = image.size
+            size_bytes = width * height * self.BYTES_PER_PIXEL
+            self._budget.acquire(size_bytes)
+            try:
+                image.thumbnail((self._max_edge, self._max_edge))
+                output.parent.mkdir(parents=True, exist_ok=True)
+                temporary = output.with_suffix(".tmp")
+                image.convert("RGB").save(temporary, format="JPEG", quality=self.JPEG_QUALITY)
+                temporary.replace(output)
+            finally:
+                self._budget.release(size_bytes)
+        logger.debug(f"Decoded {path} at {width}x{height} and reduced it into {output}")
+
+    def _cache_key(self, path: ExportPath) -> str:
+        key = f"{MetadataCache.fingerprint(path)}|{self._max_edge}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _is_jpeg(path: ExportPath) -> bool:
+        with open_binary(path) as file:
+            return file.read(2) == b"\xff\xd8"
@@ -0,0 +1,109 @@
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+from loguru import logger
+
+from polarsteps_data_parser.export_source import open_binary
+from polarsteps_data_parser.metadata_cache import shared_cache
+
+# JPEG start of frame markers, which hold the image size. C4, C8 and CC are other segments in that range.
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# ISO base media boxes (HEIC/AVIF) on the way to the 'ispe' property boxes
+HEIF_CONTAINER_BOXES = {b"meta": 4, b"iprp": 0, b"ipco": 0}
+
+
+def probe_image_size(path: Path) -> tuple[int, int] | None:
+    """Return (width, height) of a JPEG, PNG, WebP or HEIC/AVIF image read from its header only.
+
+    The sizes are the stored pixel dimensions, as used when the image is embedded; EXIF orientation is not applied.
+
+    Returns:
+        tuple | None: image size or None if the format is unknown or the header is damaged
+    """
+    try:
+        with open_binary(path) as file:
+            head = file.read(32)
+            file.seek(0)
+            if head.startswith(b"\xff\xd8"):
+                return _probe_jpeg(file)
+            if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+                return _probe_webp(file.read(30))
+            if head[4:8] == b"ftyp":
+                return _probe_heif(file, _file_size(file))
+    except (OSError, struct.error, ValueError) as e:
+        logger.debug(f"Cannot probe image size of {path}: {e}")
+    return None
+
+
+def cached_image_size(path: Path) -> tuple[int, int] | None:
+    """Return the size of an image, probed once per file fingerprint and cached across runs."""
+    size = shared_cache().get_or_compute(path, "image_size", probe_image_size)
+    return tuple(size) if size is not None else None
+
+
+def _file_size(file: BinaryIO) -> int:
+    end = file.seek(0, 2)
+    file.seek(0)
+    return end
+
+
+def _probe_jpeg(file: BinaryIO) -> tuple[int, int] | None:
+    file.seek(2)
+    while True:
+        marker = file.read(2)
+        while len(marker) == 2 and marker[1] == 0xFF:
+            # fill bytes before a marker
+            marker = marker[1:] + file.read(1)
+        if len(marker) < 2 or marker[0] != 0xFF or marker[1] in (0xD9, 0xDA):
+            return None
+        (length,) = struct.unpack(">H", file.read(2))
+        if marker[1] in JPEG_SOF_MARKERS:
+            _, height, width = struct.unpack(">BHH", file.read(5))
+            return width, height
+        file.seek(length - 2, 1)
+
+
+def _probe_webp(chunk: bytes) -> tuple[int, int] | None:
+    chunk_type = chunk[12:16]
+    if chunk_type == b"VP8 ":
+        width, height = struct.unpack("<HH", chunk[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk_type == b"VP8L":
+        bits = int.from_bytes(chunk[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk_type == b"VP8X":
+        return int.from_bytes(chunk[24:27], "little") + 1, int.from_bytes(chunk[27:30], "little") + 1
+    return None
+
+
+def _probe_heif(file: BinaryIO, end: int) -> tuple[int, int] | None:
+    sizes = _read_ispe_boxes(file, end)
+    # the primary image is the largest, smaller ones are thumbnails or tiles of a grid
+    return max(sizes, key=lambda size: size[0] * size[1]) if sizes else None
+
+
+def _read_ispe_boxes(file: BinaryIO, end: int) -> list[tuple[int, int]]:
+    sizes = []
+    while file.tell() + 8 <= end:
+        start = file.tell()
+        size, box_type = struct.unpack(">I4s", file.read(8))
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", file.read(8))
+            header_size = 16
+        elif size == 0:
+            size = end - start
+        if size < header_size:
+            raise ValueError(f"invalid size of box '{box_type!r}'")
+        if box_type in HEIF_CONTAINER_BOXES:
+            file.seek(HEIF_CONTAINER_BOXES[box_type], 1)
+            sizes.extend(_read_ispe_boxes(file, start + size))
+        elif box_type == b"ispe":
+            sizes.append(struct.unpack(">II", file.read(12)[4:]))
+        file.seek(start + size)
+        if box_type == b"meta":
+            break
+    return sizes
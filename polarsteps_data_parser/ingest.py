@@ -0,0 +1,131 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from loguru import logger
+
+import polarsteps_data_parser.utils as utils
+from polarsteps_data_parser.export_source import ExportPath
+from polarsteps_data_parser.model import Track, Trip
+from polarsteps_data_parser.track_file import SUFFIX, load_track_file, write_track_file
+
+
+@dataclass(frozen=True)
+class IngestDelta:
+    """What is new in the export of a trip since it was ingested the last time."""
+
+    first_run: bool
+    new_point_count: int = 0
+    new_step_numbers: list[int] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether nothing changed, so no output needs to be rendered again."""
+        return not self.first_run and self.new_point_count == 0 and not self.new_step_numbers
+
+    def summary(self) -> str:
+        """Return a line describing the delta for the user."""
+        if self.first_run:
+            return f"First ingest of the trip: {self.new_point_count} GPS points, {len(self.new_step_numbers)} steps"
+        return f"New since last ingest: {self.new_point_count} GPS points, {len(self.new_step_numbers)} steps"
+
+
+class Ingest:
+    """Incremental ingest of newer exports of a trip into a cached binary track.
+
+    'locations.json' only grows between exports. The state of the last ingest remembers the byte offset behind its last
+    point and a hash of the content up to there. If a newer export starts with the same bytes, only the tail is
+    parsed and its points are appended to the cached track. Otherwise the whole file is parsed once again. Steps are
+    compared by their ids.
+
+    The new state and track are kept pending until 'commit', which is called once all outputs are rendered. A failed
+    run is thus repeated completely by the next one.
+    """
+
+    STATE_SUFFIX = ".ingest.json"
+
+    def __init__(self, folder: Path) -> None:
+        self._folder = folder
+        self._pending: list[tuple[Path, Path]] = []
+
+    def ingest(self, export: ExportPath, trip: Trip) -> tuple[Track, IngestDelta]:
+        """Ingest the track and the steps of a trip from its export folder.
+
+        Returns:
+            tuple: the complete track and what is new since the last committed ingest
+        """
+        key = trip.trip_id or re.sub(r"[^\w.-]", "_", trip.name)
+        state_file = self._folder / f"{key}{self.STATE_SUFFIX}"
+        track_file = self._folder / f"{key}{SUFFIX}"
+        state = self._load_state(state_file) if track_file.exists() else None
+        content = (export / "locations.json").read_bytes()
+        self._folder.mkdir(parents=True, exist_ok=True)
+        pending_track_file = track_file.with_name(f"{key}.pending{SUFFIX}")
+
+        tail = _parse_tail(content, state) if state is not None else None
+        if tail is not None:
+            count = len(tail)
+            write_track_file(pending_track_file, tail, base=load_track_file(track_file))
+            logger.debug(f"Appended {count} new points from the tail of '{export / 'locations.json'}'")
+        else:
+            locations = utils.parse_json(content)["locations"]
+            last_time = state["last_time"] if state is not None else None
+            count = sum(1 for location in locations if last_time is None or location["time"] > last_time)
+            write_track_file(pending_track_file, locations)
+        track = load_track_file(pending_track_file)
+
+        step_ids = [str(step.step_id) for step in trip.steps]
+        known_step_ids = set(state["step_ids"]) if state is not None else set()
+        new_step_numbers = [number for number, step_id in enumerate(step_ids, 1) if step_id not in known_step_ids]
+
+        offset = _end_of_last_point(content)
+        new_state = {
+            "size": len(content),
+            "offset": offset,
+            "prefix_hash": hashlib.blake2b(memoryview(content)[:offset]).hexdigest(),
+            "last_time": track.times[-1] if len(track) else None,
+            "step_ids": step_ids,
+        }
+        pending_state_file = state_file.with_suffix(".pending")
+        pending_state_file.write_text(json.dumps(new_state))
+        self._pending.append((pending_state_file, state_file))
+        self._pending.append((pending_track_file, track_file))
+        return track, IngestDelta(state is None, count, new_step_numbers)
+
+    def commit(self) -> None:
+        """Make the ingested state the base of the next ingest."""
+        for pending, final in self._pending:
+            pending.replace(final)
+        self._pending = []
+
+    @staticmethod
+    def _load_state(state_file: Path) -> dict | None:
+        try:
+            return json.loads(state_file.read_text())
+        except (OSError, ValueError) as e:
+            logger.info(f"Ingesting everything again, state '{state_file}' is not readable: {e}")
+            return None
+
+
+def _end_of_last_point(content: bytes) -> int:
+    """Return the offset behind the last point of the 'locations' list, or behind its '[' if it is empty."""
+    start = content.index(b"[")
+    end = content.rindex(b"]")
+    last = content.rfind(b"}", start, end)
+    return last + 1 if last >= 0 else start + 1
+
+
+def _parse_tail(content: bytes, state: dict) -> list[dict] | None:
+    """Return the points behind the ones of the last ingest, None if the content does not start with those."""
+    offset = state["offset"]
+    if len(content) < state["size"]:
+        return None
+    if hashlib.blake2b(memoryview(content)[:offset]).hexdigest() != state["prefix_hash"]:
+        return None
+    try:
+        tail = content[offset : content.rindex(b"]")].lstrip(b" \t\r\n,")
+        return utils.parse_json(b"[" + tail + b"]")
+    except utils.JSON_DECODE_ERRORS:
+        return None
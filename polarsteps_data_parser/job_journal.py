@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Iterable
+from concurrent.futures import Future
+from pathlib import Path
+
+from loguru import logger
+
+from polarsteps_data_parser.export_source import fingerprint as file_fingerprint
+
+FOLDER = ".polarsteps-journal"
+
+
+def inputs_fingerprint(*inputs: object) -> str:
+    """Return a key which changes whenever one of the inputs changes, inputs are JSON values or anything with a str."""
+    content = json.dumps(inputs, default=str, separators=(",", ":"))
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+class JobJournal:
+    """Journal of the completed units of a long-running job, e.g. the maps of single steps.
+
+    Each completed unit is appended as a line with the fingerprint of its inputs and of the output files it wrote. A
+    job which is started again skips the units completed from the same inputs whose outputs are unchanged since, so
+    it resumes where an earlier run stopped. A line cut off by a crash is ignored, the journal is compacted when it
+    holds many outdated lines.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        line_count = self._load()
+        if line_count > 2 * len(self._entries) + 100:
+            self._rewrite()
+
+    @classmethod
+    def of_output_folder(cls, output_folder: str | Path, job: str) -> "JobJournal":
+        """Return the journal of a job which writes into 'output_folder'."""
+        return cls(Path(output_folder) / FOLDER / f"{job}.jsonl")
+
+    def is_done(self, unit: str, inputs: str) -> bool:
+        """Whether a unit was completed from the same inputs and its outputs are unchanged since."""
+        with self._lock:
+            entry = self._entries.get(unit)
+        if entry is None or entry["inputs"] != inputs:
+            return False
+        try:
+            return all(file_fingerprint(output) == key for output, key in entry["outputs"].items())
+        except OSError:
+            return False
+
+    def record(self, unit: str, inputs: str, outputs: Iterable[Path]) -> None:
+        """Record a unit as completed once all its outputs are written."""
+        fingerprints = {str(output): file_fingerprint(output) for output in outputs}
+        entry = {"unit": unit, "inputs": inputs, "outputs": fingerprints}
+        with self._lock:
+            self._entries[unit] = entry
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry) + "\n")
+
+    def record_when_done(self, unit: str, inputs: str, outputs: Iterable[Path], futures: list[Future]) -> None:
+        """Record a unit once all futures writing its outputs completed without error."""
+        outputs = list(outputs)
+        pending = set(futures)
+
+        def done(future: Future) -> None:
+            with self._lock:
+                pending.discard(future)
+                complete = not pending
+            if complete and all(future.exception() is None for future in futures):
+                self.record(unit, inputs, outputs)
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def _load(self) -> int:
+        try:
+            lines = self._path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return 0
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                self._entries[entry["unit"]] = entry
+            except (ValueError, KeyError, TypeError):
+                logger.debug(f"Ignoring incomplete line of job journal '{self._path}'")
+        return len(lines)
+
+    def _rewrite(self) -> None:
+        temporary = self._path.with_suffix(".tmp")
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.writelines(json.dumps(entry) + "\n" for entry in self._entries.values())
+        os.replace(temporary, self._path)
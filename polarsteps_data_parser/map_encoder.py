@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from loguru import logger
+from PIL import Image
+
+if TYPE_CHECKING:
+    import cairo
+
+
+@dataclass(frozen=True)
+class EncodeResult:
+    """Outcome of encoding a single map image."""
+
+    output_filepath: Path
+    seconds: float
+    bytes: int
+
+
+class MapEncoder:
+    """Encodes rendered maps into image files, optionally on background threads.
+
+    Formats (from fastest to smallest where applicable):
+     png:           cairo's own PNG writer
+     png-fast:      PNG with lowest zlib compression, large files
+     png-small:     PNG with highest zlib compression, slow
+     png-palette:   PNG quantized to 256 colors, small files, fine for street maps
+     jpeg:          lossy, small and fast, good for satellite maps
+     webp:          lossy WebP, smallest files
+     webp-lossless: lossless WebP
+    """
+
+    FORMATS = {
+        "png": ".png",
+        "png-fast": ".png",
+        "png-small": ".png",
+        "png-palette": ".png",
+        "jpeg": ".jpg",
+        "webp": ".webp",
+        "webp-lossless": ".webp",
+    }
+    DEFAULT_QUALITY = 85
+    # rendered maps waiting for a background thread per thread, each holds a full-size bitmap
+    PENDING_PER_WORKER = 2
+
+    def __init__(self, image_format: str = "png", quality: int = DEFAULT_QUALITY, max_workers: int = 0) -> None:
+        """Create encoder.
+
+        Args:
+            image_format: one of FORMATS
+            quality: quality of lossy formats in range [1, 100]
+            max_workers: number of background threads used by 'submit', 0 encodes on the calling thread. 'submit'
+                blocks while 'PENDING_PER_WORKER' maps per thread are waiting, so rendering cannot outrun encoding.
+        """
+        if image_format not in self.FORMATS:
+            raise ValueError(f"Unknown image format '{image_format}'. Allowed are: {', '.join(self.FORMATS)}")
+        self._image_format = image_format
+        self._quality = quality
+        self._executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 0 else None
+        self._pending: list[Future] = []
+        self._free_slots = threading.BoundedSemaphore(max(1, max_workers) * self.PENDING_PER_WORKER)
+        self._results: list[EncodeResult] = []
+        self._lock = threading.Lock()
+
+    @property
+    def extension(self) -> str:
+        """File extension of the encoded images including the dot."""
+        return self.FORMATS[self._image_format]
+
+    def encode(self, surface: "cairo.ImageSurface", output_filepath: Path) -> EncodeResult:
+        """Encode a rendered map into a file and return time and size it took."""
+        start = time.perf_counter()
+        if self._image_format == "png":
+            surface.write_to_png(output_filepath.as_posix())
+        else:
+            self._encode_with_pillow(surface, output_filepath)
+        result = EncodeResult(output_filepath, time.perf_counter() - start, os.path.getsize(output_filepath))
+        logger.debug(f"Encoded {result.output_filepath} ({result.bytes} bytes) in {result.seconds:.3f}s")
+        with self._lock:
+            self._results.append(result)
+        return result
+
+    def submit(self, surface: "cairo.ImageSurface", output_filepath: Path) -> Future:
+        """Encode a rendered map on a background thread. The surface must not be drawn on afterwards.
+
+        Blocks until a slot for the map is free, see 'max_workers'.
+        """
+        if self._executor is None:
+            future = Future()
+            future.set_result(self.encode(surface, output_filepath))
+            return future
+        self._free_slots.acquire()
+        try:
+            future = self._executor.submit(self.encode, surface, output_filepath)
+        except BaseException:
+            self._free_slots.release()
+            raise
+        future.add_done_callback(lambda _: self._free_slots.release())
+        self._pending.append(future)
+        return future
+
+    def wait(self) -> list[EncodeResult]:
+        """Wait for all submitted images and return the results of all images encoded so far."""
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+        with self._lock:
+            return list(self._results)
+
+    def summary(self) -> str:
+        """Return total number, size and encoding time of all images encoded so far."""
+        results = self.wait()
+        total_bytes = sum(result.bytes for result in results)
+        total_seconds = sum(result.seconds for result in results)
+        return (
+            f"Encoded {len(results)} images as '{self._image_format}': "
+            f"{total_bytes / 1e6:.1f} MB in {total_seconds:.2f}s encoding time"
+        )
+
+    def close(self) -> None:  # noqa: D102
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def __enter__(self) -> "MapEncoder":  # noqa: D105
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:  # noqa: D105
+        self.close()
+
+    def _encode_with_pillow(self, surface: "cairo.ImageSurface", output_filepath: Path) -> None:
+        # cairo stores premultiplied ARGB in native byte order, which is 'BGRa' for Pillow on little endian hosts.
+        image = Image.frombuffer(
+            "RGBA",
+            (surface.get_width(), surface.get_height()),
+            bytes(surface.get_data()),
+            "raw",
+            "BGRa",
+            surface.get_stride(),
+        )
+        match self._image_format:
+            case "png-fast":
+                image.save(output_filepath, format="PNG", compress_level=1)
+            case "png-small":
+                image.save(output_filepath, format="PNG", compress_level=9, optimize=True)
+            case "png-palette":
+                image.quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(
+                    output_filepath, format="PNG", optimize=True
+                )
+            case "jpeg":
+                image.convert("RGB").save(output_filepath, format="JPEG", quality=self._quality, optimize=True)
+            case "webp":
+                image.save(output_filepath, format="WEBP", quality=self._quality, method=4)
+            case "webp-lossless":
+                image.save(output_filepath, format="WEBP", lossless=True, method=4)
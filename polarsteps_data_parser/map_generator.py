@@ -1,6 +1,19 @@
+import os
+import appdirs
 import staticmaps
+from dataclasses import dataclass
 from pathlib import Path
 import s2sphere
+from loguru import logger
+
+from polarsteps_data_parser.map_encoder import MapEncoder
+from polarsteps_data_parser.tile_fetcher import TileFetcher, TileKey
+from polarsteps_data_parser.tile_pack import TilePackProvider
+
+try:
+    import cairo
+except ImportError:
+    cairo = None
 
 
 class GPSPoint:
@@ -27,6 +40,29 @@ class GPSPoint:
         return self._latlng.lng
 
 
+@dataclass(frozen=True)
+class MapVariant:
+    """One output image of a map. Without zoom the zoom level of the map is used."""
+
+    output_filepath: Path
+    width_pixels: int
+    zoom: int | None = None
+
+
+def scale_surface(surface: "cairo.ImageSurface", width_pixels: int) -> "cairo.ImageSurface":
+    """Downscale a rendered map to the given width keeping its aspect ratio."""
+    if cairo is None:
+        raise ImportError('You need to install the "cairo" module to scale maps.')
+    factor = width_pixels / surface.get_width()
+    scaled = cairo.ImageSurface(cairo.FORMAT_ARGB32, width_pixels, max(1, round(surface.get_height() * factor)))
+    context = cairo.Context(scaled)
+    context.scale(factor, factor)
+    context.set_source_surface(surface, 0, 0)
+    context.get_source().set_filter(cairo.FILTER_GOOD)
+    context.paint()
+    return scaled
+
+
 class MapGenerator:
     """Generates static maps with markers and lines using the staticmaps library."""
     GPSPoint = GPSPoint
@@ -48,9 +84,22 @@ class MapGenerator:
     PROVIDER_CARTODARKNOLABELS = staticmaps.tile_provider_CartoDarkNoLabels
     PROVIDER_NONE = staticmaps.tile_provider_None
 
+    TILE_CACHE_DIR = os.path.join(appdirs.user_cache_dir(staticmaps.LIB_NAME), "tiles")
+
     def __init__(self, provider: staticmaps.TileProvider) -> None:
         self._context = staticmaps.Context()
         self._context.set_tile_provider(provider)
+        self._provider = provider
+        self._objects: list[staticmaps.Object] = []
+        self._zoom: int | None = None
+        self._background_color: staticmaps.Color | None = None
+        if isinstance(provider, TilePackProvider):
+            # Tiles are read from a local file, neither a disk cache nor a fetcher is needed.
+            self.set_cache_dir(None)
+            self._set_tile_downloader(provider.downloader())
+        else:
+            self.set_cache_dir(self.TILE_CACHE_DIR)
+            self._set_tile_downloader(staticmaps.TileDownloader())
         self._def_width = 800
         self._ratio = 1.0
         self._symbol_color = self.RED
@@ -60,35 +109,181 @@ class MapGenerator:
         self._def_width = width_pixels
         self._ratio = ratio_x_over_y
 
+    def set_cache_dir(self, directory: str | None) -> None:
+        """Set the directory of the tile cache on disk. None disables the cache."""
+        self._cache_dir = directory
+        self._context.set_cache_dir(directory)
+
+    @staticmethod
+    def tile_pack_provider(path: Path) -> TilePackProvider:
+        """Return a provider which reads tiles from a local MBTiles file instead of the network."""
+        return TilePackProvider(path)
+
+    @property
+    def uses_local_tiles(self) -> bool:  # noqa: D102
+        return isinstance(self._provider, TilePackProvider)
+
+    def set_tile_fetcher(self, fetcher: TileFetcher) -> None:
+        """Fetch tiles through the given fetcher which may be shared by several generators."""
+        if not self.uses_local_tiles:
+            self._set_tile_downloader(fetcher)
+
+    def _set_tile_downloader(self, downloader: staticmaps.TileDownloader) -> None:
+        self._tile_downloader = downloader
+        self._context.set_tile_downloader(downloader)
+
+    @property
+    def provider(self) -> staticmaps.TileProvider:  # noqa: D102
+        return self._provider
+
+    @property
+    def image_size(self) -> tuple[int, int]:  # noqa: D102
+        return self._def_width, int(self._def_width / self._ratio)
+
+    def transformer(self) -> staticmaps.Transformer | None:
+        """Return the transformation between coordinates and pixels of the map or None if it has no objects."""
+        width, height = self.image_size
+        center, zoom = self._context.determine_center_zoom(width, height)
+        if center is None or zoom is None:
+            return None
+        return staticmaps.Transformer(width, height, zoom, center, self._provider.tile_size())
+
+    def fetch_tile(self, zoom: int, x: int, y: int) -> bytes | None:
+        """Return a single tile as it would be used when rendering this map."""
+        return self._tile_downloader.get(self._provider, self._cache_dir, zoom, x, y)
+
+    def render_background(self, renderer: staticmaps.CairoRenderer) -> None:
+        """Render the background color of the map, which shows where tiles are missing."""
+        renderer.render_background(self._background_color)
+
+    def render_overlay(self, renderer: staticmaps.CairoRenderer) -> None:
+        """Render markers, lines and attribution on top of an already rendered base map."""
+        renderer.render_objects(self._objects)
+        renderer.render_attribution(self._provider.attribution())
+
+    def required_tiles(self) -> set[TileKey]:
+        """Return all (zoom, x, y) tiles which are needed to render the map with its current objects."""
+        trans = self.transformer()
+        if trans is None:
+            return set()
+        zoom = trans.zoom()
+        tiles = set()
+        for yy in range(trans.tiles_y()):
+            y = trans.first_tile_y() + yy
+            if y < 0 or y >= trans.number_of_tiles():
+                continue
+            for xx in range(trans.tiles_x()):
+                tiles.add((zoom, (trans.first_tile_x() + xx) % trans.number_of_tiles(), y))
+        return tiles
+
+    @staticmethod
+    def prefetch_tiles(generators: list["MapGenerator"], fetcher: TileFetcher) -> None:
+        """Download the tiles of all given generators up front and attach the fetcher to each of them."""
+        tiles_by_provider: dict[tuple[str, str | None], tuple[staticmaps.TileProvider, set[TileKey]]] = {}
+        for generator in generators:
+            if generator.uses_local_tiles:
+                continue
+            generator.set_tile_fetcher(fetcher)
+            key = (generator._provider.name(), generator._cache_dir)
+            _, tiles = tiles_by_provider.setdefault(key, (generator._provider, set()))
+            tiles.update(generator.required_tiles())
+        for (_, cache_dir), (provider, tiles) in tiles_by_provider.items():
+            failed = fetcher.prefetch(provider, cache_dir, tiles)
+            if failed:
+                logger.warning(f"{failed} of {len(tiles)} tiles of provider '{provider.name()}' could not be fetched")
+
     def set_zoom(self, zoom: int) -> None:  # noqa: D102
         self._context.set_zoom(zoom)
+        self._zoom = zoom
+
+    def _context_with_zoom(self, zoom: int | None) -> staticmaps.Context:
+        """Return a context of the map with another zoom, None for automatic zoom, the map's own if it is the same."""
+        if zoom == self._zoom:
+            return self._context
+        # staticmaps cannot return to automatic zoom once it was set, so the map's own context is left as it is
+        context = staticmaps.Context()
+        context.set_tile_provider(self._provider)
+        context.set_cache_dir(self._cache_dir)
+        context.set_tile_downloader(self._tile_downloader)
+        for obj in self._objects:
+            context.add_object(obj)
+        if self._background_color is not None:
+            context.set_background_color(self._background_color)
+        if zoom is not None:
+            context.set_zoom(zoom)
+        return context
+
+    def set_background_color(self, color: staticmaps.Color) -> None:  # noqa: D102
+        self._context.set_background_color(color)
+        self._background_color = color
 
     def set_symbol_color(self, color: staticmaps.Color) -> None:  # noqa: D102
         self._symbol_color = color
 
     def add_line(self, begin: GPSPoint, end: GPSPoint, width: int) -> None:  # noqa: D102
-        self._context.add_object(staticmaps.Line([begin, end], color=self._symbol_color, width=width))
+        self._add_object(staticmaps.Line([begin, end], color=self._symbol_color, width=width))
 
     def add_multi_line(self, locations: list[GPSPoint], width: int) -> None:  # noqa: D102
         if len(locations) < 2:
             raise ValueError("At least two points are required to add a line.")
-        self._context.add_object(
-            staticmaps.Line([loc.latlng for loc in locations], color=self._symbol_color, width=width)
-        )
+        self._add_object(staticmaps.Line([loc.latlng for loc in locations], color=self._symbol_color, width=width))
 
     def add_location_marker(self, location: GPSPoint, marker_size: int) -> None:  # noqa: D102
         marker = staticmaps.Marker(location.latlng, size=marker_size)
-        self._context.add_object(marker)
+        self._add_object(marker)
 
     def add_location_markers(self, locations: list[GPSPoint], marker_size: int) -> None:  # noqa: D102
         for location in locations:
             self.add_location_marker(location, marker_size)
 
+    def add_stay_markers(self, locations: list[GPSPoint], marker_size: int) -> None:
+        """Add markers for places where the traveller stayed, in the symbol color unlike the red step markers."""
+        for location in locations:
+            self._add_object(staticmaps.Marker(location.latlng, color=self._symbol_color, size=marker_size))
+
+    def _add_object(self, obj: staticmaps.Object) -> None:
+        self._objects.append(obj)
+        self._context.add_object(obj)
+
     def write_to_png(self, output_filepath: Path) -> None:  # noqa: D102
-        map_image = self._context.render_cairo(self._def_width, int(self._def_width / self._ratio))
+        map_image = self._context.render_cairo(*self.image_size)
         filename = output_filepath.as_posix()
         map_image.write_to_png(filename)
 
+    def write(self, output_filepath: Path, encoder: MapEncoder) -> None:
+        """Render the map and hand it to the encoder, which may write it on a background thread."""
+        encoder.submit(self._context.render_cairo(*self.image_size), output_filepath)
+
+    def write_variants(self, variants: list[MapVariant], encoder: MapEncoder | None = None) -> None:
+        """Write several sizes and zoom levels of the map in one session.
+
+        Each zoom level is rendered once at the largest requested width, smaller widths are downscaled from it.
+        All renderings share the fetched tiles.
+        """
+        encoder = encoder or MapEncoder()
+        owned_fetcher = None
+        if not self.uses_local_tiles and not isinstance(self._tile_downloader, TileFetcher):
+            owned_fetcher = TileFetcher()
+            self.set_tile_fetcher(owned_fetcher)
+        variants_by_zoom: dict[int | None, list[MapVariant]] = {}
+        for variant in variants:
+            zoom = variant.zoom if variant.zoom is not None else self._zoom
+            variants_by_zoom.setdefault(zoom, []).append(variant)
+        try:
+            for zoom, zoom_variants in variants_by_zoom.items():
+                largest = max(zoom_variants, key=lambda variant: variant.width_pixels)
+                context = self._context_with_zoom(zoom)
+                map_image = context.render_cairo(largest.width_pixels, int(largest.width_pixels / self._ratio))
+                for variant in zoom_variants:
+                    image = map_image
+                    if variant.width_pixels != largest.width_pixels:
+                        image = scale_surface(map_image, variant.width_pixels)
+                    logger.debug(f"Writing map variant with zoom {zoom} and width {variant.width_pixels}")
+                    encoder.submit(image, variant.output_filepath)
+        finally:
+            if owned_fetcher is not None:
+                owned_fetcher.close()
+
 
 def test_map_generation() -> None:  # noqa: D103
     SINGLE_STEP_MAP_MARKER_SIZE = 12
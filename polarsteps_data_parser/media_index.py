@@ -0,0 +1,91 @@
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from loguru import logger
+
+from polarsteps_data_parser.export_source import file_size, open_binary
+
+
+class MediaIndex:
+    """Index of media files by content, which finds identical files uploaded to several steps or trips.
+
+    Files are compared by size and a hash of their first and last bytes. Only if that partial hash collides,
+    the full content is hashed, so large photos and videos are usually read just partially. Files can be added from
+    several threads, the partial hashes are computed in parallel.
+    """
+
+    PARTIAL_HASH_BYTES = 64 * 1024
+
+    def __init__(self) -> None:
+        self._canonical: dict[Path, Path] = {}
+        self._by_partial_hash: dict[tuple[int, bytes], list[Path]] = {}
+        self._full_hashes: dict[Path, bytes] = {}
+        self._lock = threading.Lock()
+
+    def add(self, path: Path) -> Path:
+        """Add a file and return the first indexed file with identical content, which is 'path' for new content."""
+        with self._lock:
+            if path in self._canonical:
+                return self._canonical[path]
+        size = file_size(path)
+        partial_hash = self._partial_hash(path, size)
+        with self._lock:
+            if path in self._canonical:
+                return self._canonical[path]
+            candidates = self._by_partial_hash.setdefault((size, partial_hash), [])
+            canonical = path
+            if candidates:
+                full_hash = self._full_hash(path)
+                for candidate in candidates:
+                    if self._full_hash(candidate) == full_hash:
+                        canonical = candidate
+                        break
+            if canonical == path:
+                candidates.append(path)
+            else:
+                logger.debug(f"{path} is a duplicate of {canonical}")
+            self._canonical[path] = canonical
+        return canonical
+
+    def canonical(self, path: Path) -> Path:
+        """Return the first indexed file with identical content, the file needs to be added before."""
+        return self._canonical[path]
+
+    def duplicates(self) -> dict[Path, list[Path]]:
+        """Return all files which have duplicates, each with its list of duplicates."""
+        result: dict[Path, list[Path]] = {}
+        for path, canonical in self._canonical.items():
+            if path != canonical:
+                result.setdefault(canonical, []).append(path)
+        return result
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._canonical)
+
+    def _partial_hash(self, path: Path, size: int) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        with open_binary(path) as file:
+            digest.update(file.read(self.PARTIAL_HASH_BYTES))
+            if size > 2 * self.PARTIAL_HASH_BYTES:
+                file.seek(-self.PARTIAL_HASH_BYTES, os.SEEK_END)
+                digest.update(file.read(self.PARTIAL_HASH_BYTES))
+        return digest.digest()
+
+    def _full_hash(self, path: Path) -> bytes:
+        if path not in self._full_hashes:
+            with open_binary(path) as file:
+                self._full_hashes[path] = hashlib.file_digest(file, "blake2b").digest()
+        return self._full_hashes[path]
+
+
+def link_or_copy(source: Path, destination: Path) -> None:
+    """Hard-link 'destination' to 'source', or copy it if the file system does not support hard links."""
+    if destination.exists():
+        destination.unlink()
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
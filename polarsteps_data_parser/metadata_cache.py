@@ -0,0 +1,89 @@
+import json
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import appdirs
+from loguru import logger
+
+from polarsteps_data_parser.export_source import ExportPath
+from polarsteps_data_parser.export_source import fingerprint as file_fingerprint
+
+
+class MetadataCache:
+    """Cache of values derived from media files, keyed by the fingerprint (path, size, mtime) of each file.
+
+    A file which is modified or replaced gets a new fingerprint, so stale values are never returned. Values must be
+    JSON serializable. With a path the cache is loaded from and saved to a JSON file, otherwise it lives in memory.
+    """
+
+    DEFAULT_PATH = Path(appdirs.user_cache_dir("polarsteps-data-parser")) / "media_metadata.json"
+
+    def __init__(self, path: Path | None = None) -> None:
+        self._path = path
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._modified = False
+        self._lock = threading.Lock()
+        if path is not None and path.exists():
+            try:
+                self._entries = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable metadata cache '{path}': {e}")
+
+    @staticmethod
+    def fingerprint(file: ExportPath) -> str:
+        """Return a key which changes whenever the file is modified."""
+        return file_fingerprint(file)
+
+    def get(self, file: Path, namespace: str, default: Any = None) -> Any:  # noqa: ANN401
+        """Return the cached value of 'namespace' for a file or 'default' if there is none."""
+        key = self.fingerprint(file)
+        with self._lock:
+            return self._entries.get(key, {}).get(namespace, default)
+
+    def put(self, file: Path, namespace: str, value: Any) -> None:  # noqa: ANN401
+        """Store the value of 'namespace' for a file."""
+        key = self.fingerprint(file)
+        with self._lock:
+            self._entries.setdefault(key, {})[namespace] = value
+            self._modified = True
+
+    def get_or_compute(self, file: Path, namespace: str, compute: Callable[[Path], Any]) -> Any:  # noqa: ANN401
+        """Return the cached value of 'namespace' for a file, computing and storing it if there is none."""
+        missing = object()
+        value = self.get(file, namespace, missing)
+        if value is missing:
+            value = compute(file)
+            self.put(file, namespace, value)
+        return value
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._entries)
+
+    def save(self) -> None:
+        """Write the cache to its file if anything was added since it was loaded."""
+        if self._path is None or not self._modified:
+            return
+        with self._lock:
+            content = json.dumps(self._entries)
+            self._modified = False
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self._path.with_suffix(".tmp")
+        temporary.write_text(content)
+        temporary.replace(self._path)
+        logger.debug(f"Saved metadata of {len(self._entries)} files to '{self._path}'")
+
+
+_shared_cache = MetadataCache()
+
+
+def shared_cache() -> MetadataCache:
+    """Return the cache used for all media metadata, in memory unless replaced with 'set_shared_cache'."""
+    return _shared_cache
+
+
+def set_shared_cache(cache: MetadataCache) -> None:
+    """Use 'cache' for all media metadata read from now on, e.g. a cache which persists across runs."""
+    global _shared_cache
+    _shared_cache = cache
@@ -1,14 +1,18 @@
-from dataclasses import dataclass
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
 from datetime import date, datetime
-from pathlib import Path
 from typing import Self
 
 from loguru import logger
 
+import polarsteps_data_parser.photo_metadata as photo_metadata
+from polarsteps_data_parser.export_source import ExportPath
+from polarsteps_data_parser.geotag import geotag
 import polarsteps_data_parser.utils as utils
 
 
-@dataclass
+@dataclass(slots=True)
 class Location:
     """Location as tracked by the travel tracker."""
 
@@ -22,7 +26,58 @@ class Location:
         return Location(lat=data["lat"], lon=data["lon"], time=utils.parse_date(data["time"]))
 
 
-def load_locations_from_file(file: Path) -> list[Location]:
+class Track(Sequence):
+    """Locations of a trip stored as three columns of latitude, longitude and unix time.
+
+    The columns can be any sequences of floats, e.g. memoryviews into a memory-mapped track file (see 'track_file').
+    Location objects are only created when single points are accessed.
+    """
+
+    def __init__(self, lats: Sequence[float], lons: Sequence[float], times: Sequence[float]) -> None:
+        if not len(lats) == len(lons) == len(times):
+            raise ValueError("Columns of a track must have the same length.")
+        self.lats = lats
+        self.lons = lons
+        self.times = times
+
+    @classmethod
+    def from_locations(cls, locations: list[Location]) -> Self:
+        """Create track from location objects."""
+        return cls(
+            [location.lat for location in locations],
+            [location.lon for location in locations],
+            [location.time.timestamp() for location in locations],
+        )
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self.times)
+
+    def __reduce__(self) -> tuple:  # noqa: D105
+        # a track which is not backed by a track file (see 'track_file.MappedTrack') is copied into another process
+        return Track, (array("d", self.lats), array("d", self.lons), array("d", self.times))
+
+    def __getitem__(self, index: int | slice) -> Location | list[Location]:  # noqa: D105
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Location(self.lats[index], self.lons[index], utils.parse_date(self.times[index]))
+
+    def points(self) -> Iterator[tuple[float, float, float]]:
+        """Iterate (lat, lon, unix time) of all points without creating Location objects."""
+        return zip(self.lats, self.lons, self.times)
+
+    def points_by_time(self) -> Iterable[tuple[float, float, float]]:
+        """Iterate (lat, lon, unix time) of all points sorted by time, tracks from a track file are sorted already."""
+        return self.sorted_by_time().points()
+
+    def sorted_by_time(self) -> "Track":
+        """Return the track sorted by time, the track itself if it is sorted already."""
+        if not any(earlier > later for earlier, later in zip(self.times, self.times[1:])):
+            return self
+        points = sorted(self.points(), key=lambda point: point[2])
+        return Track([point[0] for point in points], [point[1] for point in points], [point[2] for point in points])
+
+
+def load_locations_from_file(file: ExportPath) -> list[Location]:
     """Load all locations of a trip in Polarsteps which are located in file 'locations.json'."""
     if not file.exists():
         raise FileNotFoundError(f"File '{file}' does not exist.")
@@ -31,10 +86,12 @@ def load_locations_from_file(file: Path) -> list[Location]:
     return locations
 
 
-@dataclass
+@dataclass(slots=True)
 class StepLocation:
     """Location as provided by a step."""
 
+    JSON_FIELDS = ("lat", "lon", "name", "detail")
+
     lat: float
     lon: float
     name: str
@@ -51,17 +108,24 @@ class StepLocation:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Step:
     """Polarsteps Step object."""
 
+    JSON_FIELDS = ("id", "name", "display_name", "description", "start_time", "timezone_id")
+
     step_id: str
     name: str
     description: str
     location: StepLocation
     date: date
-    photos: list[Path]
-    videos: list[Path]
+    timezone_id: str = ""
+    media_folder: ExportPath | None = field(default=None, repr=False)
+    # media folders of all steps in 'media_folder', see 'utils.index_step_folders', shared by the steps of a trip
+    _step_folders: dict[str, ExportPath] | None = field(init=False, default=None, repr=False)
+    _photos: list[ExportPath] | None = field(init=False, default=None, repr=False)
+    _videos: list[ExportPath] | None = field(init=False, default=None, repr=False)
+    _photo_locations: dict[ExportPath, Location | None] | None = field(init=False, default=None, repr=False)
 
     @classmethod
     def from_json(cls, data: dict) -> Self:
@@ -73,30 +137,118 @@ class Step:
             description=data["description"],
             location=StepLocation.from_json(data["location"]),
             date=utils.parse_date(data["start_time"]),
-            photos=[],
-            videos=[],
+            timezone_id=data.get("timezone_id") or "",
         )
         return s
 
-    def lookup_media_files(self, input_folder: Path) -> None:
-        """Search for photos and videos for all steps in the file system."""
+    @property
+    def photos(self) -> list[ExportPath]:
+        """Photos of the step. Unless looked up before, they are searched in 'media_folder' on first access."""
+        if self._photos is None:
+            self._lookup_media_files_on_demand()
+        return self._photos
+
+    @property
+    def sorted_photos(self) -> list[ExportPath]:
+        """Photos of the step sorted by capture time, which reads their EXIF headers unless they are cached."""
+        return photo_metadata.sort_by_capture_time(self.photos)
+
+    @property
+    def videos(self) -> list[ExportPath]:
+        """Videos of the step. Unless looked up before, they are searched in 'media_folder' on first access."""
+        if self._videos is None:
+            self._lookup_media_files_on_demand()
+        return self._videos
+
+    @property
+    def photo_locations(self) -> dict[ExportPath, Location | None]:
+        """Where and when each photo was taken, as far as known. Empty unless the trip's photos have been geotagged."""
+        return self._photo_locations or {}
+
+    def _lookup_media_files_on_demand(self) -> None:
+        if self.media_folder is None:
+            self._photos, self._videos = [], []
+        else:
+            self.lookup_media_files(self.media_folder, self._step_folders)
+
+    def lookup_media_files(
+        self, input_folder: ExportPath, step_folders: dict[str, ExportPath] | None = None
+    ) -> tuple[int, int]:
+        """Search for photos and videos for all steps in the file system, see 'utils.find_media_files_of_step'."""
         if self.step_id is None or self.step_id == "":
-            raise ValueError("Step ID is '{self.step_id}', cannot lookup media files.")
-        photos, videos = utils.find_media_files_of_step(self.step_id, input_folder)
-        self.photos = photos
-        self.videos = videos
+            raise ValueError(f"Step ID is '{self.step_id}', cannot lookup media files.")
+        photos, videos = utils.find_media_files_of_step(self.step_id, input_folder, step_folders)
+        self._photos = photos
+        self._videos = videos
         return len(photos), len(videos)
 
+    @classmethod
+    def prune_json(cls, data: dict) -> dict:
+        """Return the JSON data of a step with only the fields used by 'from_json', copied if it has other fields.
+
+        Data decoded with 'TRIP_JSON_SCHEMA' has no other fields and is returned as it is.
+        """
+        if data.keys() <= {*cls.JSON_FIELDS, "location"} and data["location"].keys() <= {*StepLocation.JSON_FIELDS}:
+            return data
+        pruned = {key: data[key] for key in cls.JSON_FIELDS if key in data}
+        pruned["location"] = {key: data["location"][key] for key in StepLocation.JSON_FIELDS}
+        return pruned
+
+
+class StepList(Sequence):
+    """Steps of a trip which are parsed from their JSON data on first access.
+
+    Only the fields used by the model are kept from the JSON data, comments, likes or media metadata are dropped.
+    """
+
+    def __init__(self, data: list[dict]) -> None:
+        self._data: list[dict | None] = [Step.prune_json(step) for step in data]
+        self._steps: list[Step | None] = [None] * len(data)
+        self._media_folder: ExportPath | None = None
+        self._step_folders: dict[str, ExportPath] | None = None
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._steps)
+
+    def __getitem__(self, index: int | slice) -> Step | list[Step]:  # noqa: D105
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        step = self._steps[index]
+        if step is None:
+            step = Step.from_json(self._data[index])
+            step.media_folder = self._media_folder
+            step._step_folders = self._step_folders
+            self._steps[index] = step
+            self._data[index] = None
+        return step
+
+    @property
+    def materialized_count(self) -> int:
+        """Number of steps which have been parsed so far."""
+        return sum(1 for step in self._steps if step is not None)
+
+    def set_media_folder(self, input_folder: ExportPath) -> None:
+        """Set the media folder of all steps including those not parsed yet. Its step folders are indexed once."""
+        self._media_folder = input_folder
+        self._step_folders = utils.index_step_folders(input_folder)
+        for step in self._steps:
+            if step is not None:
+                step.media_folder = input_folder
+                step._step_folders = self._step_folders
+
 
-@dataclass
+@dataclass(slots=True)
 class Trip:
     """Polarsteps trip object."""
 
+    JSON_FIELDS = ("id", "name", "start_date", "end_date", "cover_photo_path", "all_steps")
+
     name: str
     start_date: datetime
     end_date: datetime
     cover_photo_path: str
-    steps: list[Step]
+    steps: Sequence[Step]
+    trip_id: str = ""
 
     @classmethod
     def from_json(cls, data: dict) -> Self:
@@ -106,22 +258,67 @@ class Trip:
             start_date=utils.parse_date(data.get("start_date")),
             end_date=utils.parse_date(data.get("end_date")),
             cover_photo_path=data["cover_photo_path"],
-            steps=[Step.from_json(step) for step in data.get("all_steps")],
+            steps=StepList(data.get("all_steps")),
+            trip_id=str(data.get("id", "")),
         )
 
 
-    def lookup_media_files(self, input_folder: Path) -> tuple[int, int]:
+    def set_media_folder(self, input_folder: ExportPath) -> None:
+        """Let all steps look up their photos and videos in 'input_folder' when they are first accessed."""
+        if isinstance(self.steps, StepList):
+            self.steps.set_media_folder(input_folder)
+            return
+        step_folders = utils.index_step_folders(input_folder)
+        for step in self.steps:
+            step.media_folder = input_folder
+            step._step_folders = step_folders
+
+    def lookup_media_files(self, input_folder: ExportPath) -> tuple[int, int]:
         """Search for photos and videos for all steps in the file system."""
         found_fotos = 0
         found_videos = 0
+        step_folders = utils.index_step_folders(input_folder)
         for step in self.steps:
-            new_fotos, new_videos = step.lookup_media_files(input_folder)
+            new_fotos, new_videos = step.lookup_media_files(input_folder, step_folders)
             found_fotos += new_fotos
             found_videos += new_videos
         logger.debug(f"Found {found_fotos} photos and {found_videos} videos for trip '{self.name}'")
         return found_fotos, found_videos
 
 
+    def read_photo_metadata(self, step_numbers: list[int]) -> None:
+        """Read the capture times of the photos of all given steps in one parallel batch.
+
+        The times are cached, so sorting the photos of each step needs no further file access.
+        """
+        photo_metadata.capture_times([photo for number in step_numbers for photo in self.get_step(number).photos])
+
+    def geotag_photos(self, track: Track, step_numbers: list[int] | None = None) -> int:
+        """Locate the photos of the given (default all) steps on the track by their capture time.
+
+        Capture times without UTC offset in their EXIF header are taken as local times of the step's timezone. The
+        photos of all steps are matched against the track in a single pass, see 'geotag.geotag'.
+
+        Returns:
+            int: number of photos which could be located
+        """
+        if step_numbers is None:
+            step_numbers = list(range(1, len(self.steps) + 1))
+        steps = [self.get_step(step_number) for step_number in step_numbers]
+        photos = [(step, photo) for step in steps for photo in step.photos]
+        times = photo_metadata.capture_times([photo for _, photo in photos])
+        unix_times = [
+            photo_metadata.capture_timestamp(time, step.timezone_id) for (step, _), time in zip(photos, times)
+        ]
+        positions = geotag(unix_times, track)
+        for step in steps:
+            step._photo_locations = {}
+        for (step, photo), time, position in zip(photos, times, positions):
+            step._photo_locations[photo] = Location(*position, time) if position is not None else None
+        located = sum(1 for position in positions if position is not None)
+        logger.debug(f"Located {located} of {len(photos)} photos on the track")
+        return located
+
     def get_step(self, step_number: int) -> Step:
         """Get step by its number (1-based)."""
         if step_number < 1 or step_number > len(self.steps):
@@ -129,10 +326,27 @@ class Trip:
         return self.steps[step_number - 1]
 
 
-def load_trip_from_file(file: Path) -> Trip:  # noqa: D103
+# 'trip.json' is decoded with only the fields used by the model, comments, likes or media metadata are skipped
+TRIP_JSON_SCHEMA = utils.json_schema(
+    "TripJson",
+    Trip.JSON_FIELDS,
+    {
+        "all_steps": list[
+            utils.json_schema(
+                "StepJson",
+                (*Step.JSON_FIELDS, "location"),
+                {"location": utils.json_schema("StepLocationJson", StepLocation.JSON_FIELDS)},
+            )
+        ]
+    },
+)
+
+
+def load_trip_from_file(file: ExportPath) -> Trip:  # noqa: D103
     if not file.exists():
         raise FileNotFoundError(f"File {file} does not exist.")
-    trip_data_json = utils.load_json_from_file(file)
+    trip_data_json = utils.load_json_from_file(file, TRIP_JSON_SCHEMA)
     trip = Trip.from_json(trip_data_json)
-    trip.lookup_media_files(file.parent)
+    # Media files are looked up per step on first access, runs on a few steps don't walk the whole export.
+    trip.set_media_folder(file.parent)
     return trip
\ No newline at end of file
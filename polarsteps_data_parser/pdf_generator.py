@@ -1,137 +1,227 @@
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any
+
 from loguru import logger
 from pathlib import Path
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.utils import ImageReader
-from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfgen.canvas import Canvas
 
+from polarsteps_data_parser.export_source import ExportPath, is_in_archive, open_binary
+from polarsteps_data_parser.image_decoder import ImageDecoder
+from polarsteps_data_parser.image_probe import cached_image_size
+from polarsteps_data_parser.media_index import MediaIndex
 from polarsteps_data_parser.model import Trip, Step
+from polarsteps_data_parser.pdf_layout import ImageItem, PageLayout, PagePlan, TextItem
+from polarsteps_data_parser.video_metadata import VideoInfo, video_infos
 
 
 class PDFGenerator:
-    """Generates a PDF for Polarsteps Trip objects."""
+    """Generates a PDF for Polarsteps Trip objects.
+
+    Generation has two passes: 'plan' lays out all pages using only the image dimensions, 'render' draws the plan.
+    """
 
     MAIN_FONT = ("Helvetica", 12)
     BOLD_FONT = ("Helvetica-Bold", 12)
     HEADING_FONT = ("Helvetica-Bold", 16)
     TITLE_HEADING_FONT = ("Helvetica-Bold", 36)
+    DECODER_THREADS = 4
+    LAYOUT_THREADS = 4
 
-    def __init__(self, output: str) -> None:
+    def __init__(self, output: str, photos_per_row: int = 1, decoder: ImageDecoder | None = None) -> None:
         self.canvas = Canvas(output, pagesize=letter)
-        self.width, self.height = letter
-        self.y_position = self.height - 30
+        self.photos_per_row = photos_per_row
+        self.decoder = decoder or ImageDecoder()
+        self.embedded_sources: dict[str, str | None] = {}
+        self.layout = PageLayout(letter, self.measure_image)
+        # Identical photos are embedded once and the image is reused wherever it appears.
+        self.media_index = MediaIndex()
+        self.image_sizes: dict[str, tuple[int, int]] = {}
+        # Photos inside an export ZIP by the name of their image source.
+        self.archive_photos: dict[str, zipfile.Path] = {}
 
     def generate_pdf(self, trip: Trip, progress_bar, step_numbers_to_process:list[int]) -> None:
-        """Generate a PDF for a given trip."""
+        """Generate a PDF for a given trip. The progress bar advances by page."""
+        self.render(self.plan(trip, step_numbers_to_process), progress_bar)
+
+    def plan(self, trip: Trip, step_numbers_to_process: list[int]) -> PagePlan:
+        """Lay out the title page and the pages of all given steps without drawing anything.
+
+        Every step starts on a new page, so the page ranges of the steps are laid out in parallel and then joined in
+        the order of the steps. Measuring the photos, which reads their files, thus overlaps.
+        """
         self.canvas.setTitle(trip.name)
         self.generate_title_page(trip)
-        with progress_bar as visible_bar:
-            for zero_based_index, step_number in enumerate(step_numbers_to_process):
-                step = trip.get_step(step_number)
-                logger.debug(f"{zero_based_index+1}/{len(step_numbers_to_process)} generating pages for step {step.name}")
-                self.generate_step_pages(step)
-                visible_bar.update(zero_based_index+1)
+        steps = [trip.get_step(step_number) for step_number in step_numbers_to_process]
+        with ThreadPoolExecutor(max_workers=self.LAYOUT_THREADS) as executor:
+            step_plans = list(executor.map(self.step_plan, steps))
+        plan = PagePlan([*self.layout.plan.pages, *(page for step_plan in step_plans for page in step_plan.pages)])
+        logger.debug(f"Planned {plan.page_count} pages with {plan.image_count} images")
+        return plan
+
+    def render(self, plan: PagePlan, progress_bar=None) -> None:  # noqa: ANN001
+        """Draw all pages of a plan and save the PDF."""
+        self.prepare_images(plan)
+        with progress_bar if progress_bar is not None else nullcontext() as visible_bar:
+            for page in plan.pages:
+                for item in page.items:
+                    self.draw_item(item)
+                self.canvas.showPage()
+                if visible_bar is not None:
+                    visible_bar.update(1)
         self.canvas.save()
 
+    def draw_item(self, item: TextItem | ImageItem) -> None:
+        """Draw a single item of the plan on the current page."""
+        if isinstance(item, TextItem):
+            self.canvas.setFont(*item.font)
+            self.canvas.drawString(item.x, item.y, item.text)
+            return
+        source = self.embedded_sources.get(item.source, item.source)
+        if source is None:
+            return
+        try:
+            self.canvas.drawImage(self.drawable(source), item.x, item.y, width=item.width, height=item.height)
+        except Exception as e:
+            logger.error(f"Failed to draw image {item.source}: {e}")
+
+    def prepare_images(self, plan: PagePlan) -> None:
+        """Decode all photos of a plan which cannot be embedded as they are, in parallel and at reduced scale."""
+        sources = {
+            item.source
+            for page in plan.pages
+            for item in page.items
+            if isinstance(item, ImageItem)
+            and item.source not in self.embedded_sources
+            and self.photo_file(item.source) is not None
+        }
+        with ThreadPoolExecutor(max_workers=self.DECODER_THREADS) as executor:
+            self.embedded_sources.update(zip(sources, executor.map(self.embeddable_source, sources)))
+
+    def embeddable_source(self, source: str) -> str | None:
+        """Return the file to embed for a photo, None if it cannot be decoded."""
+        try:
+            return str(self.decoder.embeddable(self.photo_file(source)))
+        except Exception as e:
+            logger.error(f"Failed to load image {source}: {e}")
+            return None
+
     def generate_title_page(self, trip: Trip) -> None:
         """Generate title page."""
-        self.title_heading(trip.name)
-        self.y_position -= 20
-        self.short_text(
-            f"{trip.start_date.strftime('%d-%m-%Y')} - {trip.end_date.strftime('%d-%m-%Y')}", bold=True, centered=True
+        self.layout.title_heading(trip.name, self.TITLE_HEADING_FONT)
+        self.layout.y_position -= 20
+        self.layout.short_text(
+            f"{trip.start_date.strftime('%d-%m-%Y')} - {trip.end_date.strftime('%d-%m-%Y')}",
+            self.BOLD_FONT,
+            centered=True,
         )
-        self.photo(trip.cover_photo_path, centered=True, photo_width=400)
-
-    def generate_step_pages(self, step: Step) -> None:
-        """Add a step to the canvas."""
-        self.new_page()
-        self.heading(step.name)
-        self.short_text(f"Location: {step.location.name}, {step.location.country}")
-        self.short_text(f"Date: {step.date.strftime('%d-%m-%Y')}")
-        self.long_text(step.description or "")
-        for photo in step.photos:
-            self.photo(photo)
-
-    def new_page(self) -> None:
-        """Add a new page to the canvas."""
-        self.canvas.showPage()
-        self.width, self.height = letter
-        self.y_position = self.height - 30
-
-    def heading(self, text: str) -> None:
-        """Add heading to canvas."""
-        if self.y_position < 50:
-            self.new_page()
-        self.canvas.setFont(*self.HEADING_FONT)
-        self.canvas.drawString(30, self.y_position, text)
-        self.y_position -= 30
-
-    def title_heading(self, text: str) -> None:
-        """Add heading to canvas."""
-        self.y_position -= 100
-        self.canvas.setFont(*self.TITLE_HEADING_FONT)
-        self.canvas.drawString(self.calc_width_centered(text, self.TITLE_HEADING_FONT), self.y_position, text)
-        self.y_position -= 30
-
-    def calc_width_centered(self, text: str, font: tuple) -> float:
-        """Calculate the width location to center the text."""
-        return (self.width - stringWidth(text, *font)) / 2.0
-
-    def short_text(self, text: str, bold: bool = False, centered: bool = False) -> None:
-        """Add short text to canvas."""
-        if self.y_position < 50:
-            self.new_page()
-        font = self.BOLD_FONT if bold else self.MAIN_FONT
-        self.canvas.setFont(*font)
-        width = self.calc_width_centered(text, self.MAIN_FONT) if centered else 30
-        self.canvas.drawString(width, self.y_position, text)
-        self.y_position -= 20
-
-    def long_text(self, text: str) -> None:
-        """Add long text to canvas."""
-        self.y_position -= 10
-        lines = self.wrap_text(text, self.width - 60)
-        for line in lines:
-            if self.y_position < 50:
-                self.new_page()
-                self.canvas.setFont(*self.MAIN_FONT)
-            self.canvas.drawString(30, self.y_position, line)
-            self.y_position -= 20
-        self.y_position -= 20
-
-    def photo(self, photo_path: Path | str, centered: bool = False, photo_width: int = 250) -> None:
-        """Add photo to canvas."""
+        self.layout.photo(trip.cover_photo_path, centered=True, photo_width=400)
+
+    def step_plan(self, step: Step) -> PagePlan:
+        """Lay out the pages of a step on a layout of its own."""
+        logger.debug(f"Laying out pages for step {step.name}")
+        layout = PageLayout(letter, self.measure_image)
+        self.generate_step_pages(step, layout)
+        return layout.plan
+
+    def generate_step_pages(self, step: Step, layout: PageLayout | None = None) -> None:
+        """Lay out the pages of a step, on the layout of the document unless another is given."""
+        layout = layout or self.layout
+        layout.new_page()
+        layout.heading(step.name, self.HEADING_FONT)
+        layout.short_text(f"Location: {step.location.name}, {step.location.country}", self.MAIN_FONT)
+        layout.short_text(f"Date: {step.date.strftime('%d-%m-%Y')}", self.MAIN_FONT)
+        layout.long_text(step.description or "", self.MAIN_FONT)
+        photos = step.sorted_photos
+        if self.photos_per_row > 1:
+            layout.photo_grid(photos, columns=self.photos_per_row)
+        else:
+            for photo in photos:
+                layout.photo(photo)
+        for video, info in zip(step.videos, video_infos(step.videos, with_posters=True)):
+            self.video(video, info, layout)
+
+    def video(self, video_path: Path, info: VideoInfo, layout: PageLayout | None = None) -> None:
+        """Lay out poster frame and caption of a video."""
+        layout = layout or self.layout
+        if info.poster is not None and layout.photo(info.poster):
+            layout.y_position += 10
+        resolution = f", {info.width}x{info.height}" if info.width else ""
+        layout.short_text(f"Video {video_path.name} ({info.duration_text}{resolution})", self.MAIN_FONT)
+        layout.y_position -= 10
+
+    def measure_image(self, photo_path: ExportPath | str) -> tuple[str, int, int] | None:
+        """Return the file name to embed for a photo and its size in pixels, None if it cannot be loaded.
+
+        Photo files are measured from their header (see 'image_probe'), others are opened with reportlab.
+        """
         try:
-            image = ImageReader(photo_path)
-            img_width, img_height = image.getSize()
-            aspect = img_height / float(img_width)
-            new_height = photo_width * aspect
-            if self.y_position - new_height < 50:
-                self.canvas.showPage()
-                self.y_position = self.height - 30
-            self.canvas.drawImage(
-                image,
-                (self.width - photo_width) / 2.0 if centered else 30,
-                self.y_position - new_height,
-                width=photo_width,
-                height=new_height,
-            )
-            self.y_position = self.y_position - new_height - 20
+            image = self.image_source(photo_path)
+            if image not in self.image_sizes:
+                photo_file = self.photo_file(image)
+                size = cached_image_size(photo_file) if photo_file is not None else None
+                self.image_sizes[image] = size or self.image_reader(image).getSize()
         except Exception as e:
             logger.error(f"Failed to load image {photo_path}: {e}")
-
-    def wrap_text(self, text: str, max_width: int) -> list:
-        """Wrap text to fit within max_width."""
-        self.canvas.setFont(*self.MAIN_FONT)
-        lines = []
-        words = text.split()
-        current_line = ""
-        for word in words:
-            test_line = f"{current_line} {word}".strip()
-            if self.canvas.stringWidth(test_line) <= max_width:
-                current_line = test_line
-            else:
-                lines.append(current_line)
-                current_line = word
-        lines.append(current_line)
-        return lines
+            return None
+        return image, *self.image_sizes[image]
+
+    def image_source(self, photo_path: ExportPath | str) -> str:
+        """Return the file name to embed for a photo, which is the same for all photos with identical content.
+
+        reportlab embeds an image referenced by file name only once per document, so duplicates cost no space.
+        Photos inside an export ZIP are named by their member in the ZIP, which is read when the image is embedded.
+        """
+        if is_in_archive(photo_path):
+            canonical = self.media_index.add(photo_path)
+            if is_in_archive(canonical):
+                self.archive_photos[str(canonical)] = canonical
+            return str(canonical)
+        if Path(photo_path).is_file():
+            return str(self.media_index.add(Path(photo_path)))
+        return str(photo_path)
+
+    def photo_file(self, source: str) -> ExportPath | None:
+        """Return the photo file of an image source, on disk or inside the export ZIP, None if there is none."""
+        if source in self.archive_photos:
+            return self.archive_photos[source]
+        return Path(source) if Path(source).is_file() else None
+
+    def drawable(self, source: str) -> "str | _ArchiveImage":
+        """Return what reportlab reads an image source from, a file name or a photo inside the export ZIP."""
+        if source in self.archive_photos:
+            return _ArchiveImage(self.archive_photos[source])
+        return source
+
+    def image_reader(self, source: str) -> ImageReader:
+        """Return a reportlab reader of an image source, on disk or inside the export ZIP."""
+        if source in self.archive_photos:
+            return ImageReader(open_binary(self.archive_photos[source]))
+        return ImageReader(source)
+
+
+class _ArchiveImage:
+    """A photo inside an export ZIP, which reportlab draws without extracting it.
+
+    reportlab names embedded images by the 'str' of their source, for which the member name is used, so a photo
+    drawn several times is embedded once. The image is read through the interface of reportlab's ImageReader, e.g.
+    'jpeg_fh' to embed a JPEG as it is, from a reader of the member created when reportlab first embeds the photo.
+    """
+
+    def __init__(self, path: zipfile.Path) -> None:
+        self._path = path
+        self._reader: ImageReader | None = None
+
+    def __str__(self) -> str:  # noqa: D105
+        return str(self._path)
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        # only called for attributes missing here, which are those of the ImageReader
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if self._reader is None:
+            self._reader = ImageReader(open_binary(self._path))
+        return getattr(self._reader, name)
@@ -0,0 +1,164 @@
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# Returns the file name to embed for a photo with its width and height in pixels, or None if it cannot be used.
+ImageMeasure = Callable[[Path | str], tuple[str, int, int] | None]
+
+
+@dataclass(frozen=True)
+class TextItem:
+    """Single line of text placed on a page."""
+
+    x: float
+    y: float
+    text: str
+    font: tuple[str, int]
+
+
+@dataclass(frozen=True)
+class ImageItem:
+    """Image placed on a page, 'y' is its lower edge."""
+
+    x: float
+    y: float
+    width: float
+    height: float
+    source: str
+
+
+@dataclass
+class Page:
+    """Content of a single page in drawing order."""
+
+    items: list[TextItem | ImageItem] = field(default_factory=list)
+
+
+@dataclass
+class PagePlan:
+    """Result of the layout pass: every page with the exact position of all its content."""
+
+    pages: list[Page]
+
+    @property
+    def page_count(self) -> int:  # noqa: D102
+        return len(self.pages)
+
+    @property
+    def image_count(self) -> int:  # noqa: D102
+        return sum(1 for page in self.pages for item in page.items if isinstance(item, ImageItem))
+
+
+class PageLayout:
+    """Layout pass of the PDF generation, which places content on pages without drawing anything.
+
+    Page breaks and image placements only need the image dimensions, which 'measure_image' provides. Drawing the
+    resulting plan is a straight pass over its pages.
+    """
+
+    MARGIN = 30
+    BOTTOM = 50
+    LINE_HEIGHT = 20
+    GRID_GAP = 20
+
+    def __init__(self, page_size: tuple[float, float], measure_image: ImageMeasure) -> None:
+        self.width, self.height = page_size
+        self._measure_image = measure_image
+        self._pages = [Page()]
+        self.y_position = self.height - self.MARGIN
+
+    @property
+    def plan(self) -> PagePlan:  # noqa: D102
+        return PagePlan(list(self._pages))
+
+    def new_page(self) -> None:
+        """Continue on a new page, unless nothing has been placed on the current page yet."""
+        if self._pages[-1].items:
+            self._pages.append(Page())
+        self.y_position = self.height - self.MARGIN
+
+    def heading(self, text: str, font: tuple[str, int]) -> None:
+        """Add heading."""
+        if self.y_position < self.BOTTOM:
+            self.new_page()
+        self._add(TextItem(self.MARGIN, self.y_position, text, font))
+        self.y_position -= 30
+
+    def title_heading(self, text: str, font: tuple[str, int]) -> None:
+        """Add centered heading below a large top margin."""
+        self.y_position -= 100
+        self._add(TextItem(self.calc_width_centered(text, font), self.y_position, text, font))
+        self.y_position -= 30
+
+    def calc_width_centered(self, text: str, font: tuple[str, int]) -> float:
+        """Calculate the width location to center the text."""
+        return (self.width - stringWidth(text, *font)) / 2.0
+
+    def short_text(self, text: str, font: tuple[str, int], centered: bool = False) -> None:
+        """Add a single line of text."""
+        if self.y_position < self.BOTTOM:
+            self.new_page()
+        x = self.calc_width_centered(text, font) if centered else self.MARGIN
+        self._add(TextItem(x, self.y_position, text, font))
+        self.y_position -= self.LINE_HEIGHT
+
+    def long_text(self, text: str, font: tuple[str, int]) -> None:
+        """Add text wrapped to the page width."""
+        self.y_position -= 10
+        for line in self.wrap_text(text, self.width - 2 * self.MARGIN, font):
+            if self.y_position < self.BOTTOM:
+                self.new_page()
+            self._add(TextItem(self.MARGIN, self.y_position, line, font))
+            self.y_position -= self.LINE_HEIGHT
+        self.y_position -= self.LINE_HEIGHT
+
+    def photo(self, photo_path: Path | str, centered: bool = False, photo_width: float = 250) -> bool:
+        """Add photo scaled to 'photo_width'. Returns False if the photo cannot be used."""
+        measured = self._measure_image(photo_path)
+        if measured is None:
+            return False
+        source, img_width, img_height = measured
+        new_height = photo_width * img_height / float(img_width)
+        if self.y_position - new_height < self.BOTTOM:
+            self.new_page()
+        x = (self.width - photo_width) / 2.0 if centered else self.MARGIN
+        self._add(ImageItem(x, self.y_position - new_height, photo_width, new_height, source))
+        self.y_position -= new_height + self.LINE_HEIGHT
+        return True
+
+    def photo_grid(self, photo_paths: list[Path | str], columns: int = 2) -> None:
+        """Add photos in rows of 'columns' photos which share the page width, top aligned in each row."""
+        measured = [m for m in (self._measure_image(path) for path in photo_paths) if m is not None]
+        column_width = (self.width - 2 * self.MARGIN - (columns - 1) * self.GRID_GAP) / columns
+        for row_start in range(0, len(measured), columns):
+            row = [
+                (source, column_width * img_height / float(img_width))
+                for source, img_width, img_height in measured[row_start : row_start + columns]
+            ]
+            row_height = max(height for _, height in row)
+            if self.y_position - row_height < self.BOTTOM:
+                self.new_page()
+            for column, (source, height) in enumerate(row):
+                x = self.MARGIN + column * (column_width + self.GRID_GAP)
+                self._add(ImageItem(x, self.y_position - height, column_width, height, source))
+            self.y_position -= row_height + self.LINE_HEIGHT
+
+    @staticmethod
+    def wrap_text(text: str, max_width: float, font: tuple[str, int]) -> list[str]:
+        """Wrap text to fit within max_width."""
+        lines = []
+        current_line = ""
+        for word in text.split():
+            test_line = f"{current_line} {word}".strip()
+            if stringWidth(test_line, *font) <= max_width:
+                current_line = test_line
+            else:
+                lines.append(current_line)
+                current_line = word
+        lines.append(current_line)
+        return lines
+
+    def _add(self, item: TextItem | ImageItem) -> None:
+        self._pages[-1].items.append(item)
@@ -0,0 +1,153 @@
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from typing import BinaryIO
+
+from loguru import logger
+
+from polarsteps_data_parser.export_source import open_binary
+from polarsteps_data_parser.metadata_cache import shared_cache
+
+MAX_WORKERS = 8
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+# EXIF tags holding the capture time, in order of preference
+TAG_EXIF_IFD_POINTER = 0x8769
+TAG_DATE_TIME_ORIGINAL = 0x9003
+TAG_DATE_TIME_DIGITIZED = 0x9004
+TAG_DATE_TIME = 0x0132
+# EXIF tags holding the UTC offsets of the capture times, e.g. '+09:00'
+TAG_OFFSET_TIME = 0x9010
+TAG_OFFSET_TIME_ORIGINAL = 0x9011
+TAG_OFFSET_TIME_DIGITIZED = 0x9012
+OFFSET_TAGS = {
+    TAG_DATE_TIME_ORIGINAL: (TAG_OFFSET_TIME_ORIGINAL, TAG_OFFSET_TIME),
+    TAG_DATE_TIME_DIGITIZED: (TAG_OFFSET_TIME_DIGITIZED, TAG_OFFSET_TIME),
+    TAG_DATE_TIME: (TAG_OFFSET_TIME,),
+}
+ASCII_TAGS = {*OFFSET_TAGS, TAG_OFFSET_TIME, TAG_OFFSET_TIME_ORIGINAL, TAG_OFFSET_TIME_DIGITIZED}
+TYPE_ASCII = 2
+TYPE_LONG = 4
+
+
+def read_capture_time(path: Path) -> datetime | None:
+    """Return the capture time from the EXIF header of a JPEG, or None if the photo has none.
+
+    The time is aware if the header holds its UTC offset, otherwise it is the naive local time of the camera. Only the
+    segments before the image data are read, never the compressed image itself.
+    """
+    try:
+        with open_binary(path) as file:
+            tiff = _read_jpeg_exif_segment(file)
+        if tiff is None:
+            return None
+        tags = _read_date_tags(tiff)
+    except (OSError, struct.error, ValueError) as e:
+        logger.debug(f"Cannot read EXIF of {path}: {e}")
+        return None
+    for tag in (TAG_DATE_TIME_ORIGINAL, TAG_DATE_TIME_DIGITIZED, TAG_DATE_TIME):
+        try:
+            capture_time = datetime.strptime(tags[tag], EXIF_DATE_FORMAT)
+        except (KeyError, ValueError):
+            continue
+        for offset_tag in OFFSET_TAGS[tag]:
+            try:
+                return datetime.strptime(f"{tags[tag]} {tags[offset_tag]}", f"{EXIF_DATE_FORMAT} %z")
+            except (KeyError, ValueError):
+                continue
+        return capture_time
+    return None
+
+
+def capture_timestamp(capture_time: datetime | None, timezone_id: str = "") -> float | None:
+    """Return the unix time of a capture time, naive times are taken as local times of the timezone (e.g. 'Asia/Tokyo').
+
+    Without a known timezone naive times are taken as local times of this machine.
+    """
+    if capture_time is None:
+        return None
+    if capture_time.tzinfo is None and timezone_id:
+        try:
+            capture_time = capture_time.replace(tzinfo=ZoneInfo(timezone_id))
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.debug(f"Unknown timezone '{timezone_id}', taking capture time {capture_time} as local time")
+    return capture_time.timestamp()
+
+
+def capture_times(paths: list[Path], max_workers: int = MAX_WORKERS) -> list[datetime | None]:
+    """Return the capture times of all photos, read in parallel and cached by file fingerprint."""
+
+    def cached_capture_time(path: Path) -> datetime | None:
+        value = shared_cache().get_or_compute(path, "capture_time_with_offset", _capture_time_as_text)
+        return datetime.fromisoformat(value) if value is not None else None
+
+    if len(paths) <= 1:
+        return [cached_capture_time(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(cached_capture_time, paths))
+
+
+def sort_by_capture_time(paths: list[Path], max_workers: int = MAX_WORKERS) -> list[Path]:
+    """Sort photos by capture time. Photos without capture time follow, sorted by name."""
+    times = capture_times(paths, max_workers)
+    order = sorted(
+        range(len(paths)),
+        # by local time of the camera, times with and without UTC offset cannot be compared
+        key=lambda i: (times[i] is None, times[i].replace(tzinfo=None) if times[i] else datetime.min, paths[i].name),
+    )
+    return [paths[i] for i in order]
+
+
+def _capture_time_as_text(path: Path) -> str | None:
+    capture_time = read_capture_time(path)
+    return capture_time.isoformat() if capture_time is not None else None
+
+
+def _read_jpeg_exif_segment(file: BinaryIO) -> bytes | None:
+    if file.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD9, 0xDA):
+            # end of image or start of the compressed data, there are no header segments after it
+            return None
+        (length,) = struct.unpack(">H", file.read(2))
+        if marker[1] == 0xE1:
+            payload = file.read(length - 2)
+            if payload.startswith(b"Exif\x00\x00"):
+                return payload[6:]
+        else:
+            file.seek(length - 2, 1)
+
+
+def _read_date_tags(tiff: bytes) -> dict[int, str]:
+    byte_order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if byte_order is None:
+        raise ValueError("invalid TIFF header")
+    (ifd0_offset,) = struct.unpack(f"{byte_order}I", tiff[4:8])
+    tags = _read_ifd(tiff, ifd0_offset, byte_order)
+    if TAG_EXIF_IFD_POINTER in tags:
+        tags.update(_read_ifd(tiff, tags[TAG_EXIF_IFD_POINTER], byte_order))
+    return tags
+
+
+def _read_ifd(tiff: bytes, offset: int, byte_order: str) -> dict[int, str | int]:
+    tags: dict[int, str | int] = {}
+    (count,) = struct.unpack(f"{byte_order}H", tiff[offset : offset + 2])
+    for index in range(count):
+        entry = offset + 2 + index * 12
+        tag, value_type, value_count = struct.unpack(f"{byte_order}HHI", tiff[entry : entry + 8])
+        if tag == TAG_EXIF_IFD_POINTER and value_type == TYPE_LONG:
+            (tags[tag],) = struct.unpack(f"{byte_order}I", tiff[entry + 8 : entry + 12])
+        elif tag in ASCII_TAGS and value_type == TYPE_ASCII:
+            if value_count <= 4:
+                value = tiff[entry + 8 : entry + 8 + value_count]
+            else:
+                (value_offset,) = struct.unpack(f"{byte_order}I", tiff[entry + 8 : entry + 12])
+                value = tiff[value_offset : value_offset + value_count]
+            tags[tag] = value.rstrip(b"\x00").decode("ascii", errors="replace")
+    return tags
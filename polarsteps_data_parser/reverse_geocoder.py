@@ -0,0 +1,142 @@
+import csv
+import math
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from loguru import logger
+
+import polarsteps_data_parser.utils as utils
+from polarsteps_data_parser.geo_export import distance_m
+from polarsteps_data_parser.model import Track
+
+METERS_PER_DEGREE = 111_195.0
+
+
+@dataclass(frozen=True, slots=True)
+class Place:
+    """A named place of a gazetteer."""
+
+    name: str
+    country: str
+    lat: float
+    lon: float
+
+
+class Gazetteer:
+    """Offline reverse geocoder which finds the nearest place of a local gazetteer.
+
+    Places are indexed in a grid of 'CELL_DEGREES' cells, a query searches rings of cells around its position until no
+    nearer place can be found. Results are cached per coarse cell of 'CACHE_CELL_DEGREES' (about 1 km), so the points
+    of a track, which mostly lie close to each other, are resolved with a dictionary lookup each.
+    """
+
+    CELL_DEGREES = 1.0
+    CACHE_CELL_DEGREES = 0.01
+    MAX_DISTANCE_M = 100_000.0
+
+    def __init__(self, places: list[Place], max_distance_m: float = MAX_DISTANCE_M) -> None:
+        self._places = places
+        self._max_distance_m = max_distance_m
+        self._cells: dict[tuple[int, int], list[Place]] = {}
+        for place in places:
+            self._cells.setdefault(self._cell(place.lat, place.lon), []).append(place)
+        self._cache: dict[tuple[int, int], Place | None] = {}
+
+    @classmethod
+    def load(cls, path: Path, max_distance_m: float = MAX_DISTANCE_M) -> "Gazetteer":
+        """Load a GeoNames dump (e.g. 'cities1000.txt') or a CSV file with the columns name, lat, lon and country."""
+        with open(path, encoding="utf-8", newline="") as file:
+            if path.suffix.lower() == ".csv":
+                places = [
+                    Place(row["name"], row["country"], float(row["lat"]), float(row["lon"]))
+                    for row in csv.DictReader(file)
+                ]
+            else:
+                # GeoNames: geonameid, name, asciiname, alternatenames, latitude, longitude, class, code, country, ...
+                places = [
+                    Place(row[1], row[8], float(row[4]), float(row[5]))
+                    for row in csv.reader(file, delimiter="\t", quoting=csv.QUOTE_NONE)
+                    if len(row) > 8
+                ]
+        logger.debug(f"Loaded {len(places)} places from gazetteer '{path}'")
+        return cls(places, max_distance_m)
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._places)
+
+    def reverse_geocode(self, points: Iterable[tuple[float, float]]) -> list[Place | None]:
+        """Return the nearest place within the maximum distance of each (lat, lon), or None if there is none."""
+        return [self.lookup(lat, lon) for lat, lon in points]
+
+    def lookup(self, lat: float, lon: float) -> Place | None:
+        """Return the nearest place of the coarse cell which contains (lat, lon), cached per cell."""
+        key = (round(lat / self.CACHE_CELL_DEGREES), round(lon / self.CACHE_CELL_DEGREES))
+        if key not in self._cache:
+            self._cache[key] = self.nearest(key[0] * self.CACHE_CELL_DEGREES, key[1] * self.CACHE_CELL_DEGREES)
+        return self._cache[key]
+
+    def nearest(self, lat: float, lon: float) -> Place | None:
+        """Return the nearest place within the maximum distance, searched in the grid without cache."""
+        cell_lat, cell_lon = self._cell(lat, lon)
+        columns = round(360 / self.CELL_DEGREES)
+        best, best_distance = None, self._max_distance_m
+        ring = 0
+        # cells of ring r are at least r - 1 cells away from the position
+        while (ring - 1) * self.CELL_DEGREES * METERS_PER_DEGREE * self._min_cos(lat, ring) <= best_distance:
+            for cell_y in range(cell_lat - ring, cell_lat + ring + 1):
+                for cell_x in range(cell_lon - ring, cell_lon + ring + 1):
+                    if max(abs(cell_y - cell_lat), abs(cell_x - cell_lon)) != ring:
+                        continue
+                    for place in self._cells.get((cell_y, cell_x % columns), ()):
+                        distance = distance_m((lat, lon, 0.0), (place.lat, place.lon, 0.0))
+                        if distance <= best_distance:
+                            best, best_distance = place, distance
+            ring += 1
+            if ring * self.CELL_DEGREES > 180:
+                break
+        return best
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.CELL_DEGREES), math.floor((lon % 360.0) / self.CELL_DEGREES)
+
+    def _min_cos(self, lat: float, ring: int) -> float:
+        # cells of a ring are narrowest on the side towards the pole
+        return math.cos(math.radians(min(89.0, abs(lat) + ring * self.CELL_DEGREES)))
+
+
+@dataclass
+class CountryStatistics:
+    """Time and distance the track spent in a country."""
+
+    days: int
+    distance_km: float
+
+
+def country_statistics(track: Track, gazetteer: Gazetteer) -> dict[str, CountryStatistics]:
+    """Return days and distance per country of the nearest place of each track point.
+
+    A day counts for every country in which at least one point was recorded on it (local time), the distance between
+    two points counts for the country of the first one.
+    """
+    days: dict[str, set] = {}
+    distances: dict[str, float] = {}
+    previous = None
+    day, day_end = None, -math.inf
+    for point in track.points_by_time():
+        if previous is not None:
+            distances[previous[1]] = distances.get(previous[1], 0.0) + distance_m(previous[0], point)
+        place = gazetteer.lookup(point[0], point[1])
+        if place is None:
+            previous = None
+            continue
+        if point[2] >= day_end:
+            day = utils.parse_date(point[2]).date()
+            day_end = datetime.combine(day + timedelta(days=1), time()).timestamp()
+        days.setdefault(place.country, set()).add(day)
+        previous = (point, place.country)
+    return {
+        country: CountryStatistics(len(country_days), distances.get(country, 0.0) / 1000)
+        for country, country_days in sorted(days.items(), key=lambda item: -len(item[1]))
+    }
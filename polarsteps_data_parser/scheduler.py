@@ -0,0 +1,202 @@
+import multiprocessing
+import os
+import queue
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+import click
+from loguru import logger
+
+DEFAULT_MEMORY_MB = 4096
+
+# (job name, units done, new length of the job or None), put by jobs in threads and processes of the running scheduler
+_progress_queue: "multiprocessing.Queue | None" = None
+
+
+@dataclass(frozen=True)
+class Budget:
+    """CPUs and memory (MB) which all running jobs share."""
+
+    cpus: int
+    memory_mb: int
+
+    @classmethod
+    def of_machine(cls, cpus: int = 0, memory_mb: int = 0) -> "Budget":
+        """Return a budget of the given resources, all CPUs and half of the available memory for those which are 0."""
+        return cls(cpus or os.cpu_count() or 1, memory_mb or _available_memory_mb() // 2)
+
+
+@dataclass(frozen=True)
+class Job:
+    """An output to render by calling 'function(*args)', with the resources it needs while it runs.
+
+    'units' is the length of the job in the combined progress, see 'JobProgress'. Jobs which hold the GIL, like map
+    rendering, run in a process of their own if 'in_process' is set, their function and arguments must be picklable.
+    """
+
+    name: str
+    function: Callable
+    args: tuple = ()
+    units: int = 1
+    cpus: int = 1
+    memory_mb: int = 256
+    in_process: bool = False
+
+
+class JobProgress:
+    """Progress of a job, reported to the scheduler from the thread or process the job runs in.
+
+    It is used like a click progress bar, 'with progress as bar: bar.update(1)'. Outside of a scheduler it does nothing.
+    """
+
+    def __init__(self, job_name: str) -> None:
+        self.job_name = job_name
+
+    def __enter__(self) -> "JobProgress":  # noqa: D105
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:  # noqa: D105
+        pass
+
+    def update(self, units: int) -> None:
+        """Report units of the job as done."""
+        if _progress_queue is not None:
+            _progress_queue.put((self.job_name, units, None))
+
+    def set_length(self, units: int) -> None:
+        """Replace the length of the job once it is known, e.g. the page count of a PDF."""
+        if _progress_queue is not None:
+            _progress_queue.put((self.job_name, 0, units))
+
+
+class Scheduler:
+    """Runs jobs concurrently within a budget of CPUs and memory and shows one progress bar for all of them.
+
+    Pending jobs start in the order given as soon as the resources they need are free. A job needing more than the
+    whole budget runs alone. The wall time thus approaches the one of the longest job instead of the sum of all. After
+    a job failed no further job starts, the error is raised once the running jobs finished.
+    """
+
+    POLL_SECONDS = 0.1
+
+    def __init__(self, budget: Budget, initializer: Callable | None = None, initargs: tuple = ()) -> None:
+        """Create scheduler, 'initializer(*initargs)' is called in each process started for a job."""
+        self._budget = budget
+        self._initializer = initializer
+        self._initargs = initargs
+
+    def run(self, jobs: list[Job], label: str = "Rendering") -> dict[str, Any]:
+        """Run all jobs and return their results by job name."""
+        context = multiprocessing.get_context("spawn")
+        progress_queue = context.Queue()
+        pending = list(jobs)
+        running: dict[Future, tuple[Job, float]] = {}
+        results: dict[str, Any] = {}
+        errors: list[BaseException] = []
+        free_cpus, free_memory = self._budget.cpus, self._budget.memory_mb
+        job_seconds = 0.0
+        started = time.perf_counter()
+        _set_progress_queue(progress_queue)
+        threads = ThreadPoolExecutor(max_workers=max(1, len(jobs)), thread_name_prefix="job")
+        processes = ProcessPoolExecutor(
+            max_workers=max(1, sum(job.in_process for job in jobs)),
+            mp_context=context,
+            initializer=_initialize_process,
+            initargs=(progress_queue, self._initializer, self._initargs),
+        )
+        try:
+            with threads, processes, click.progressbar(length=sum(job.units for job in jobs), label=label) as bar:
+                progress = _CombinedProgress(bar, {job.name: job.units for job in jobs})
+                while pending or running:
+                    for job in pending[:] if not errors else []:
+                        cpus, memory_mb = self._demand(job)
+                        if running and (cpus > free_cpus or memory_mb > free_memory):
+                            continue
+                        pending.remove(job)
+                        free_cpus, free_memory = free_cpus - cpus, free_memory - memory_mb
+                        logger.debug(f"Starting job {job.name} with {cpus} CPUs and {memory_mb} MB")
+                        executor = processes if job.in_process else threads
+                        running[executor.submit(job.function, *job.args)] = (job, time.perf_counter())
+                    if errors:
+                        pending.clear()
+                    finished, _ = wait(running, timeout=self.POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    progress.read(progress_queue)
+                    for future in finished:
+                        job, job_started = running.pop(future)
+                        cpus, memory_mb = self._demand(job)
+                        free_cpus, free_memory = free_cpus + cpus, free_memory + memory_mb
+                        job_seconds += time.perf_counter() - job_started
+                        progress.complete(job.name)
+                        if future.exception() is not None:
+                            logger.error(f"Job {job.name} failed: {future.exception()}")
+                            errors.append(future.exception())
+                        else:
+                            results[job.name] = future.result()
+        finally:
+            _set_progress_queue(None)
+            progress_queue.close()
+        if errors:
+            raise errors[0]
+        click.echo(
+            f"Finished {len(jobs)} jobs in {time.perf_counter() - started:.1f} s, "
+            f"one after another they would have taken about {job_seconds:.1f} s"
+        )
+        return results
+
+    def _demand(self, job: Job) -> tuple[int, int]:
+        return min(job.cpus, self._budget.cpus), min(job.memory_mb, self._budget.memory_mb)
+
+
+class _CombinedProgress:
+    """Progress of all jobs of a scheduler shown by one click progress bar."""
+
+    def __init__(self, bar, lengths: dict[str, int]) -> None:  # noqa: ANN001
+        self._bar = bar
+        self._lengths = lengths
+        self._done = dict.fromkeys(lengths, 0)
+        self._completed: set[str] = set()
+
+    def read(self, progress_queue: "multiprocessing.Queue") -> None:
+        """Apply all progress reported by the jobs so far."""
+        while True:
+            try:
+                name, units, length = progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            # progress of a completed job may still be queued
+            if name in self._completed:
+                continue
+            if length is not None:
+                self._lengths[name] = max(length, self._done[name])
+                self._bar.length = sum(self._lengths.values())
+            self._advance(name, min(units, self._lengths[name] - self._done[name]))
+
+    def complete(self, name: str) -> None:
+        """Count all units of a finished job as done."""
+        self._advance(name, self._lengths[name] - self._done[name])
+        self._completed.add(name)
+
+    def _advance(self, name: str, units: int) -> None:
+        self._done[name] += units
+        self._bar.update(units)
+
+
+def _set_progress_queue(progress_queue: "multiprocessing.Queue | None") -> None:
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _initialize_process(progress_queue: "multiprocessing.Queue", initializer: Callable | None, initargs: tuple) -> None:
+    _set_progress_queue(progress_queue)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _available_memory_mb() -> int:
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2**20
+    except (AttributeError, ValueError, OSError):
+        return DEFAULT_MEMORY_MB
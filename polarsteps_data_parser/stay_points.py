@@ -0,0 +1,59 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import polarsteps_data_parser.utils as utils
+from polarsteps_data_parser.geo_export import TrackPoint, distance_m
+from polarsteps_data_parser.model import Track
+
+RADIUS_M = 200.0
+MIN_DURATION = timedelta(minutes=20)
+
+
+@dataclass(frozen=True, slots=True)
+class Stay:
+    """A place where the traveller stayed, as the centre of the track points recorded there."""
+
+    lat: float
+    lon: float
+    arrival: datetime
+    departure: datetime
+    point_count: int
+
+    @property
+    def duration(self) -> timedelta:  # noqa: D102
+        return self.departure - self.arrival
+
+
+def detect_stays(track: Track, radius_m: float = RADIUS_M, min_duration: timedelta = MIN_DURATION) -> list[Stay]:
+    """Return the places where the track stayed within 'radius_m' for at least 'min_duration'.
+
+    A window of consecutive points grows as long as the next point is within 'radius_m' of the window's centre, which
+    is updated as a running mean. The first point outside closes the window, which is a stay if it lasted long enough,
+    and starts the next one. Each point is visited once, so the detection takes O(n) instead of comparing point pairs.
+    Tracks which are not sorted by time are sorted first.
+    """
+    stays: list[Stay] = []
+    sum_lat = sum_lon = arrival = departure = 0.0
+    count = 0
+    for lat, lon, time in track.points_by_time():
+        if count and distance_m((sum_lat / count, sum_lon / count, 0.0), (lat, lon, time)) <= radius_m:
+            sum_lat, sum_lon, departure, count = sum_lat + lat, sum_lon + lon, time, count + 1
+            continue
+        if count:
+            _append_stay(stays, (sum_lat / count, sum_lon / count, arrival), departure, count, min_duration)
+        sum_lat, sum_lon, arrival, departure, count = lat, lon, time, time, 1
+    if count:
+        _append_stay(stays, (sum_lat / count, sum_lon / count, arrival), departure, count, min_duration)
+    return stays
+
+
+def total_duration(stays: Iterable[Stay]) -> timedelta:
+    """Return the time spent in all stays."""
+    return sum((stay.duration for stay in stays), timedelta())
+
+
+def _append_stay(stays: list[Stay], centre: TrackPoint, departure: float, count: int, min_duration: timedelta) -> None:
+    lat, lon, arrival = centre
+    if timedelta(seconds=departure - arrival) >= min_duration:
+        stays.append(Stay(lat, lon, utils.parse_date(arrival), utils.parse_date(departure), count))
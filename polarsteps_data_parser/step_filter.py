@@ -0,0 +1,149 @@
+import math
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date
+
+import polarsteps_data_parser.utils as utils
+from polarsteps_data_parser.model import Trip
+
+CLAUSE_SEPARATOR = ";"
+SYNTAX_HELP = (
+    "Specify steps as list e.g. '2,6' or range '5-7' or combinations thereof, or by clauses like "
+    "'date:2025-03-01..2025-03-20', 'country:japan,korea', 'name:kyoto' or 'bbox:LAT_MIN,LON_MIN,LAT_MAX,LON_MAX', "
+    "all separated by ';' to select steps matching every clause."
+)
+
+
+@dataclass(frozen=True)
+class Clause:
+    """A condition on the steps to select, 'kind' is 'steps', 'date', 'country', 'name' or 'bbox'."""
+
+    kind: str
+    value: tuple
+
+
+def parse_step_filter(step_filter: str) -> list[Clause]:
+    """Parse a step filter of clauses separated by ';', each a list of step numbers or 'kind:value'."""
+    clauses = []
+    for text in step_filter.split(CLAUSE_SEPARATOR):
+        text = text.strip()
+        kind, _, value = text.partition(":") if ":" in text else ("steps", "", text)
+        kind, value = kind.strip().lower(), value.strip()
+        if kind == "steps":
+            clauses.append(Clause(kind, tuple(utils.decode_step_filter(value))))
+        elif kind == "date":
+            clauses.append(Clause(kind, _parse_date_range(value)))
+        elif kind == "country":
+            clauses.append(Clause(kind, tuple(sorted({c.strip().lower() for c in value.split(",") if c.strip()}))))
+        elif kind == "name" and value:
+            clauses.append(Clause(kind, (value.lower(),)))
+        elif kind == "bbox":
+            clauses.append(Clause(kind, _parse_bbox(value)))
+        else:
+            raise ValueError(f"Invalid filter clause '{text}'. {SYNTAX_HELP}")
+    return clauses
+
+
+def is_numeric(clauses: list[Clause]) -> bool:
+    """Whether the clauses select by step numbers only, which needs no index."""
+    return all(clause.kind == "steps" for clause in clauses)
+
+
+class StepIndex:
+    """Indexes of the steps of a trip by date, country and position, to select steps matching filter clauses.
+
+    Dates are kept sorted for range queries by bisection, countries in a dictionary and positions in a grid of
+    'CELL_DEGREES' cells. Each indexed clause yields its candidate steps without a scan of all steps, the candidates
+    of all clauses are intersected and only the remaining steps are compared by name.
+    """
+
+    CELL_DEGREES = 1.0
+
+    def __init__(self, trip: Trip) -> None:
+        self._trip = trip
+        self._step_count = len(trip.steps)
+        by_date = sorted((step.date.date(), number) for number, step in enumerate(trip.steps, 1))
+        self._dates = [step_date for step_date, _ in by_date]
+        self._numbers_by_date = [number for _, number in by_date]
+        self._countries: dict[str, set[int]] = {}
+        self._cells: dict[tuple[int, int], list[int]] = {}
+        for number, step in enumerate(trip.steps, 1):
+            self._countries.setdefault(step.location.country.strip().lower(), set()).add(number)
+            self._cells.setdefault(self._cell(step.location.lat, step.location.lon), []).append(number)
+
+    def select(self, clauses: list[Clause]) -> list[int]:
+        """Return the sorted numbers of the steps which match all clauses."""
+        selected: set[int] | None = None
+        # the most selective clauses go first, names are compared only for steps left by the others
+        for clause in sorted(clauses, key=lambda clause: clause.kind == "name"):
+            if clause.kind == "name":
+                candidates = selected if selected is not None else range(1, self._step_count + 1)
+                selected = {n for n in candidates if clause.value[0] in self._trip.get_step(n).name.lower()}
+                continue
+            matches = getattr(self, f"_select_{clause.kind}")(*clause.value)
+            selected = matches if selected is None else selected & matches
+        return sorted(selected or ())
+
+    def _select_steps(self, *numbers: int) -> set[int]:
+        return {number for number in numbers if number <= self._step_count}
+
+    def _select_date(self, start: date | None, end: date | None) -> set[int]:
+        first = bisect_left(self._dates, start) if start is not None else 0
+        last = bisect_right(self._dates, end) if end is not None else len(self._dates)
+        return set(self._numbers_by_date[first:last])
+
+    def _select_country(self, *countries: str) -> set[int]:
+        return set().union(*(self._countries.get(country, set()) for country in countries))
+
+    def _select_bbox(self, lat_min: float, lon_min: float, lat_max: float, lon_max: float) -> set[int]:
+        # a box with lon_min > lon_max crosses the antimeridian
+        lon_ranges = [(lon_min, lon_max)] if lon_min <= lon_max else [(lon_min, 180.0), (-180.0, lon_max)]
+        selected = set()
+        for west, east in lon_ranges:
+            (y_min, x_min), (y_max, x_max) = self._cell(lat_min, west), self._cell(lat_max, east)
+            for y in range(y_min, y_max + 1):
+                for x in range(x_min, x_max + 1):
+                    for number in self._cells.get((y, x), ()):
+                        location = self._trip.get_step(number).location
+                        if lat_min <= location.lat <= lat_max and west <= location.lon <= east:
+                            selected.add(number)
+        return selected
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.CELL_DEGREES), math.floor(lon / self.CELL_DEGREES)
+
+
+def select_steps(step_filter: str, trip: Trip) -> list[int]:
+    """Return the sorted numbers of the steps of a trip which match a step filter, see 'parse_step_filter'."""
+    clauses = parse_step_filter(step_filter)
+    if is_numeric(clauses):
+        # plain step numbers need no step to be parsed
+        selected = set.intersection(*(set(clause.value) for clause in clauses))
+        return sorted(selected)
+    return StepIndex(trip).select(clauses)
+
+
+def _parse_date_range(value: str) -> tuple[date | None, date | None]:
+    start, separator, end = value.partition("..")
+    try:
+        start_date = date.fromisoformat(start.strip()) if start.strip() else None
+        end_date = date.fromisoformat(end.strip()) if end.strip() else None
+    except ValueError:
+        raise ValueError(f"Invalid date range '{value}', use 'YYYY-MM-DD..YYYY-MM-DD'.") from None
+    if not separator:
+        end_date = start_date
+    if start_date is None and end_date is None:
+        raise ValueError(f"Invalid date range '{value}', at least one date is needed.")
+    if start_date is not None and end_date is not None and start_date > end_date:
+        raise ValueError(f"Invalid date range '{value}', the start is after the end.")
+    return start_date, end_date
+
+
+def _parse_bbox(value: str) -> tuple[float, float, float, float]:
+    if re.fullmatch(r"\s*-?[\d.]+(\s*,\s*-?[\d.]+){3}\s*", value) is None:
+        raise ValueError(f"Invalid bounding box '{value}', use 'LAT_MIN,LON_MIN,LAT_MAX,LON_MAX'.")
+    lat_min, lon_min, lat_max, lon_max = (float(number) for number in value.split(","))
+    if lat_min > lat_max:
+        raise ValueError(f"Invalid bounding box '{value}', LAT_MIN is greater than LAT_MAX.")
+    return lat_min, lon_min, lat_max, lon_max
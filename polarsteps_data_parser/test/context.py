@@ -6,4 +6,26 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import model
 import utils
 import map_generator
-import pdf_generator
\ No newline at end of file
+import pdf_generator
+import tile_fetcher
+import tile_pack
+import base_map
+import map_encoder
+import media_index
+import metadata_cache
+import photo_metadata
+import geotag
+import video_metadata
+import pdf_layout
+import image_probe
+import image_decoder
+import export_source
+import track_file
+import geo_export
+import columnar_export
+import ingest
+import stay_points
+import reverse_geocoder
+import step_filter
+import scheduler
+import job_journal
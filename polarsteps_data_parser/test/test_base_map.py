@@ -0,0 +1,88 @@
+import io
+from pathlib import Path
+
+import pytest
+import staticmaps
+from PIL import Image
+
+from .context import base_map, map_generator
+
+MapGenerator = map_generator.MapGenerator
+
+
+class SolidTileDownloader(staticmaps.TileDownloader):
+    """Serves tiles of one color each, the tiles of every third column are missing."""
+
+    def get(self, provider: staticmaps.TileProvider, cache_dir: str, zoom: int, x: int, y: int) -> bytes | None:  # noqa: D102
+        if x % 3 == 0:
+            return None
+        tile = io.BytesIO()
+        Image.new("RGB", (256, 256), (x * 40 % 256, y * 40 % 256, 128)).save(tile, format="PNG")
+        return tile.getvalue()
+
+
+def make_step_map(lat: float, lon: float) -> MapGenerator:  # noqa: D103
+    generator = MapGenerator(MapGenerator.PROVIDER_NONE)
+    generator.set_zoom(9)
+    generator.set_image_properties(width_pixels=800, ratio_x_over_y=4 / 3)
+    generator.add_location_marker(map_generator.GPSPoint(lat=lat, lon=lon), marker_size=12)
+    return generator
+
+
+def test_Mosaic_covering__contains_tiles_required_by_each_map() -> None:  # noqa: D103
+    generators = [make_step_map(48.80, 9.37), make_step_map(48.95, 9.20), make_step_map(49.10, 9.50)]
+    windows = [base_map.PixelWindow.from_transformer(generator.transformer()) for generator in generators]
+
+    mosaic = base_map.Mosaic.covering(windows, tile_size=256)
+
+    mosaic_tiles = {
+        (9, mosaic.first_tile_x + xx, mosaic.first_tile_y + yy)
+        for xx in range(mosaic.tiles_x)
+        for yy in range(mosaic.tiles_y)
+    }
+    for generator, window in zip(generators, windows):
+        assert generator.required_tiles() <= mosaic_tiles
+        offset_x, offset_y = mosaic.offset_of(window)
+        assert offset_x <= 0 and offset_y <= 0
+        assert offset_x + mosaic.tiles_x * 256 >= window.width
+        assert offset_y + mosaic.tiles_y * 256 >= window.height
+
+
+def test_group_windows__neighbouring_maps_share_a_region() -> None:  # noqa: D103
+    generators = [make_step_map(48.80, 9.37), make_step_map(48.95, 9.20), make_step_map(35.68, 139.69)]
+    windows = [base_map.PixelWindow.from_transformer(generator.transformer()) for generator in generators]
+
+    regions = base_map.group_windows(windows, max_mosaic_size=4096)
+
+    assert sorted(sorted(region) for region in regions) == [[0, 1], [2]]
+
+
+def test_group_windows__mosaics_do_not_exceed_maximum_size() -> None:  # noqa: D103
+    generators = [make_step_map(40.0 + i * 0.2, 9.0 + i * 0.3) for i in range(60)]
+    windows = [base_map.PixelWindow.from_transformer(generator.transformer()) for generator in generators]
+
+    regions = base_map.group_windows(windows, max_mosaic_size=4096)
+
+    assert 1 < len(regions) < len(windows)
+    assert sorted(index for region in regions for index in region) == list(range(len(windows)))
+    for region in regions:
+        mosaic = base_map.Mosaic.covering([windows[index] for index in region], tile_size=256)
+        assert mosaic.tiles_x * 256 <= 4096 and mosaic.tiles_y * 256 <= 4096
+
+
+def test_SharedBaseMapRenderer_render__maps_equal_maps_rendered_alone(tmp_path: Path) -> None:  # noqa: D103
+    pytest.importorskip("cairo")
+    generators = [make_step_map(48.80, 9.37), make_step_map(48.95, 9.20)]
+    for generator in generators:
+        generator._set_tile_downloader(SolidTileDownloader())
+        generator.set_background_color(MapGenerator.GREEN)
+
+    shared_maps = dict(base_map.SharedBaseMapRenderer().render(generators))
+
+    for index, generator in enumerate(generators):
+        alone, shared = tmp_path / f"alone-{index}.png", tmp_path / f"shared-{index}.png"
+        generator.write_to_png(alone)
+        shared_maps[index].write_to_png(shared.as_posix())
+        with Image.open(alone) as alone_image, Image.open(shared) as shared_image:
+            assert alone_image.size == shared_image.size
+            assert alone_image.tobytes() == shared_image.tobytes()
@@ -0,0 +1,60 @@
+from array import array
+from pathlib import Path
+
+import pytest
+
+from .context import columnar_export, model, track_file
+from .test_model import make_trip_folder
+
+LOCATIONS = (
+    '{"locations": [{"lat": 48.8, "lon": 9.3, "time": 1752616800}, {"lat": 48.9, "lon": 9.4, "time": 1752620400.5}]}'
+)
+
+
+def test_location_columns__mapped_track_is_not_copied(tmp_path: Path) -> None:  # noqa: D103
+    (tmp_path / "locations.json").write_text(LOCATIONS)
+    track_file.convert_locations_json(tmp_path / "locations.json", tmp_path / "locations.pstrack")
+    track = track_file.load_track_file(tmp_path / "locations.pstrack")
+
+    columns = columnar_export.location_columns(track, 1, 2, "123")
+
+    assert isinstance(columns["lat"], memoryview)
+    assert list(columns["lat"]) == [48.9]
+    assert columns["time"] == array("q", [1752620400_500000])
+    assert columns["trip_id"] == ["123"]
+
+
+def test_location_batches__track_is_split(tmp_path: Path) -> None:  # noqa: D103
+    track = model.Track([1.0, 2.0, 3.0], [4.0, 5.0, 6.0], [7.0, 8.0, 9.0])
+
+    batches = list(columnar_export.location_batches(track, "123", batch_size=2))
+
+    assert [list(batch["lon"]) for batch in batches] == [[4.0, 5.0], [6.0]]
+    assert isinstance(batches[1]["lon"], array)
+
+
+def test_step_batches__steps_are_numbered_and_media_counted(tmp_path: Path) -> None:  # noqa: D103
+    trip = model.load_trip_from_file(make_trip_folder(tmp_path))
+
+    batches = list(columnar_export.step_batches(trip, "19846118", batch_size=1))
+
+    assert [batch["step_number"] for batch in batches] == [[1], [2]]
+    assert batches[0]["name"] == ["Weinstadt"]
+    assert batches[0]["photo_count"] == [2]
+    assert batches[1]["video_count"] == [1]
+    assert trip.trip_id == "19846118"
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_export_trip__partition_per_trip(tmp_path: Path, file_format: str) -> None:  # noqa: D103
+    dataset = pytest.importorskip("pyarrow.dataset")
+    trip = model.load_trip_from_file(make_trip_folder(tmp_path))
+    track = model.Track([48.8, 48.9], [9.3, 9.4], [1752616800.0, 1752620400.0])
+
+    steps_file, locations_file = columnar_export.export_trip(tmp_path / "out", trip, track, file_format, batch_size=1)
+
+    assert steps_file == tmp_path / "out" / "steps" / "trip=19846118" / f"part-0.{file_format}"
+    dataset_format = "ipc" if file_format == "arrow" else file_format
+    table = dataset.dataset(locations_file.parent.parent, format=dataset_format).to_table()
+    assert table.column("lat").to_pylist() == [48.8, 48.9]
+    assert table.column("trip_id").to_pylist() == ["19846118", "19846118"]
@@ -0,0 +1,83 @@
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from .context import export_source, image_decoder, model, pdf_generator, photo_metadata
+from .test_model import make_trip_folder
+
+
+def make_export_zip(tmp_path: Path, trips: tuple[str, ...] = ("trip/rundreise_123",)) -> Path:  # noqa: D103
+    folder = tmp_path / "extracted"
+    folder.mkdir()
+    make_trip_folder(folder)
+    (folder / "locations.json").write_text('{"locations": [{"lat": 48.8, "lon": 9.3, "time": 1752616800}]}')
+    exif = Image.Exif()
+    exif.get_ifd(0x8769)[0x9003] = "2024:05:01 10:30:00"
+    Image.new("RGB", (40, 30)).save(folder / "weinstadt_174638490" / "photos" / "b.jpg", format="JPEG", exif=exif)
+    export = tmp_path / "export.zip"
+    with zipfile.ZipFile(export, "w") as archive:
+        for trip in trips:
+            for file in folder.rglob("*"):
+                if file.is_file():
+                    archive.write(file, f"{trip}/{file.relative_to(folder).as_posix()}".lstrip("/"))
+    return export
+
+
+def test_open_export__folder_is_returned_as_it_is(tmp_path: Path) -> None:  # noqa: D103
+    assert export_source.open_export(tmp_path) == tmp_path
+
+
+@pytest.mark.parametrize("trip", ["trip/rundreise_123", ""])
+def test_open_export__trip_is_read_from_zip(tmp_path: Path, trip: str) -> None:  # noqa: D103
+    folder = export_source.open_export(make_export_zip(tmp_path, (trip,)))
+
+    trip = model.load_trip_from_file(folder / "trip.json")
+    locations = model.load_locations_from_file(folder / "locations.json")
+
+    assert export_source.is_in_archive(folder)
+    assert trip.get_step(1).name == "Weinstadt"
+    assert len(locations) == 1
+    assert [photo.name for photo in trip.get_step(1).photos] == ["b.jpg", "a.jpg"]
+    assert [video.name for video in trip.get_step(2).videos] == ["c.mp4"]
+    assert photo_metadata.read_capture_time(trip.get_step(1).photos[0]).hour == 10
+
+
+def test_open_export__several_trips_need_selection(tmp_path: Path) -> None:  # noqa: D103
+    export = make_export_zip(tmp_path, ("trip/rundreise_123", "trip/roadtrip_456"))
+
+    with pytest.raises(ValueError, match="contains 2 matching trips"):
+        export_source.open_export(export)
+    assert export_source.open_export(export, "roadtrip").at == "trip/roadtrip_456/"
+
+
+def test_trip_folders__all_trips_of_zip_and_folder(tmp_path: Path) -> None:  # noqa: D103
+    export = make_export_zip(tmp_path, ("trip/rundreise_123", "trip/roadtrip_456"))
+
+    in_zip = export_source.trip_folders(export)
+    in_folder = export_source.trip_folders(tmp_path / "extracted")
+
+    assert [folder.at for folder in in_zip] == ["trip/roadtrip_456/", "trip/rundreise_123/"]
+    assert in_folder == [tmp_path / "extracted"]
+
+
+def test_PDFGenerator_generate_pdf__embeds_photo_from_zip_without_extracting(tmp_path: Path) -> None:  # noqa: D103
+    folder = export_source.open_export(make_export_zip(tmp_path))
+    trip = model.load_trip_from_file(folder / "trip.json")
+    decoder = image_decoder.ImageDecoder(cache_dir=tmp_path / "cache")
+    generator = pdf_generator.PDFGenerator(str(tmp_path / "trip.pdf"), decoder=decoder)
+    source = str(folder / "weinstadt_174638490" / "photos" / "b.jpg")
+
+    generator.generate_pdf(trip, None, [1])
+
+    assert source in generator.archive_photos
+    pdf = (tmp_path / "trip.pdf").read_bytes()
+    # the JPEG is embedded as it is
+    assert pdf.count(b"/Subtype /Image") == 1
+    assert b"/DCTDecode" in pdf
+    assert not (tmp_path / "cache").exists()
+    # the photo is no path on disk
+    with pytest.raises(TypeError):
+        os.fspath(generator.drawable(source))
@@ -0,0 +1,112 @@
+import json
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from .context import geo_export, model
+
+GPX = "{http://www.topografix.com/GPX/1/1}"
+
+
+def make_track() -> model.Track:  # noqa: D103
+    # about 11 m between successive points, going north
+    return model.Track([48.8, 48.8001, 48.8002, 48.8003], [9.3, 9.3, 9.3, 9.3], [100.0, 200.0, 300.0, 400.0])
+
+
+def make_step(name: str, date: datetime) -> model.Step:  # noqa: D103
+    location = model.StepLocation(lat=48.8, lon=9.3, name="Weinstadt <Endersbach>", country="Germany")
+    return model.Step(step_id="1", name=name, description="", location=location, date=date)
+
+
+def test_track_points__time_range_is_inclusive() -> None:  # noqa: D103
+    start, end = datetime.fromtimestamp(200), datetime.fromtimestamp(300)
+
+    points = list(geo_export.track_points(make_track(), start, end))
+
+    assert [time for _, _, time in points] == [200.0, 300.0]
+
+
+def test_track_points__close_points_are_dropped_but_last_is_kept() -> None:  # noqa: D103
+    points = list(geo_export.track_points(make_track(), tolerance_m=15.0))
+
+    assert [time for _, _, time in points] == [100.0, 300.0, 400.0]
+
+
+def test_distance_m__across_antimeridian() -> None:  # noqa: D103
+    assert geo_export.distance_m((0.0, 179.9999, 0.0), (0.0, -179.9999, 0.0)) == pytest.approx(22.2, abs=0.1)
+
+
+def test_write_gpx__steps_are_waypoints_and_points_a_track(tmp_path: Path) -> None:  # noqa: D103
+    output = tmp_path / "trip.gpx"
+    steps = [make_step("Start & Ziel", datetime.fromtimestamp(150))]
+
+    count = geo_export.write_gpx(output, "Rundreise", make_track().points(), steps)
+
+    root = ET.parse(output).getroot()
+    assert count == 4
+    assert root.find(f"{GPX}wpt/{GPX}name").text == "Start & Ziel"
+    assert root.find(f"{GPX}wpt/{GPX}time").text == "1970-01-01T00:02:30Z"
+    track_points = root.findall(f"{GPX}trk/{GPX}trkseg/{GPX}trkpt")
+    assert [point.get("lat") for point in track_points] == ["48.8", "48.8001", "48.8002", "48.8003"]
+    assert track_points[0].find(f"{GPX}time").text == "1970-01-01T00:01:40Z"
+
+
+def test_write_geojson__line_and_step_features(tmp_path: Path) -> None:  # noqa: D103
+    output = tmp_path / "trip.geojson"
+    steps = [make_step("Stuttgart", datetime.fromtimestamp(150)), make_step("Weinstadt", datetime.fromtimestamp(350))]
+
+    count = geo_export.write_geojson(output, "Rundreise", make_track().points(), steps)
+
+    document = json.loads(output.read_text(encoding="utf-8"))
+    line, *points = document["features"]
+    assert count == 4
+    assert line["geometry"]["coordinates"][1] == [9.3, 48.8001]
+    assert line["properties"] == {
+        "name": "Rundreise",
+        "point_count": 4,
+        "start_time": "1970-01-01T00:01:40Z",
+        "end_time": "1970-01-01T00:06:40Z",
+    }
+    assert [point["properties"]["name"] for point in points] == ["Stuttgart", "Weinstadt"]
+    assert points[0]["geometry"] == {"type": "Point", "coordinates": [9.3, 48.8]}
+
+
+def test_write_geojson__empty_track_is_valid(tmp_path: Path) -> None:  # noqa: D103
+    output = tmp_path / "trip.geojson"
+
+    assert geo_export.write_geojson(output, "Rundreise", iter(()), []) == 0
+
+    document = json.loads(output.read_text(encoding="utf-8"))
+    assert document["features"][0]["geometry"]["coordinates"] == []
+
+
+def test_export_trip__steps_are_filtered_by_time(tmp_path: Path) -> None:  # noqa: D103
+    output = tmp_path / "trip.json"
+    steps = [make_step("Stuttgart", datetime.fromtimestamp(150)), make_step("Weinstadt", datetime.fromtimestamp(350))]
+
+    count = geo_export.export_trip(output, "Rundreise", make_track(), steps, start=datetime.fromtimestamp(300))
+
+    document = json.loads(output.read_text(encoding="utf-8"))
+    assert count == 2
+    assert [feature["properties"]["name"] for feature in document["features"][1:]] == ["Weinstadt"]
+
+
+def test_export_format__unknown_suffix_raises() -> None:  # noqa: D103
+    with pytest.raises(ValueError, match="Unknown export format"):
+        geo_export.export_format(Path("trip.kml"))
+
+
+def test_write_flatgeobuf(tmp_path: Path) -> None:  # noqa: D103
+    fiona = pytest.importorskip("fiona")
+    output = tmp_path / "trip.fgb"
+
+    steps = [make_step("Stuttgart", datetime.fromtimestamp(150))]
+
+    count = geo_export.write_flatgeobuf(output, "Rundreise", make_track().points(), steps)
+
+    with fiona.open(output) as layer:
+        kinds = [feature["properties"]["kind"] for feature in layer]
+    assert count == 4
+    assert kinds == ["step", "track", "track", "track", "track"]
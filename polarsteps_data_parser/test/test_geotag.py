@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from .context import geotag, model
+
+START = datetime(2024, 5, 1, 10, 0, 0)
+
+
+def make_track() -> model.Track:  # noqa: D103
+    return model.Track.from_locations(
+        [
+            model.Location(lat=48.0, lon=9.0, time=START + timedelta(minutes=10)),
+            model.Location(lat=50.0, lon=11.0, time=START),
+            model.Location(lat=47.0, lon=8.0, time=START + timedelta(hours=3)),
+        ]
+    )
+
+
+def unix_times(times: list[datetime | None]) -> list[float | None]:  # noqa: D103
+    return [time.timestamp() if time is not None else None for time in times]
+
+
+def test_geotag__interpolates_between_fixes() -> None:  # noqa: D103
+    positions = geotag.geotag(unix_times([START + timedelta(minutes=5)]), make_track())
+
+    assert positions[0] == pytest.approx((49.0, 10.0))
+
+
+def test_geotag__uses_nearest_fix_across_large_gaps() -> None:  # noqa: D103
+    times = [
+        START + timedelta(minutes=20),
+        START + timedelta(hours=2, minutes=50),
+        START + timedelta(hours=1, minutes=30),
+    ]
+
+    positions = geotag.geotag(unix_times(times), make_track())
+
+    assert positions == [(48.0, 9.0), (47.0, 8.0), None]
+
+
+def test_geotag__times_outside_track_and_unknown_times() -> None:  # noqa: D103
+    times = [START - timedelta(minutes=10), None, START + timedelta(hours=5)]
+
+    positions = geotag.geotag(unix_times(times), make_track())
+
+    assert positions == [(50.0, 11.0), None, None]
+
+
+def test_geotag__interpolates_across_antimeridian() -> None:  # noqa: D103
+    track = model.Track.from_locations(
+        [
+            model.Location(lat=0.0, lon=179.0, time=START),
+            model.Location(lat=0.0, lon=-179.0, time=START + timedelta(minutes=10)),
+        ]
+    )
+    times = unix_times([START + timedelta(minutes=5), START + timedelta(minutes=7, seconds=30)])
+
+    positions = geotag.geotag(times, track)
+
+    assert abs(positions[0][1]) == pytest.approx(180.0)
+    assert positions[1][1] == pytest.approx(-179.5)
+
+
+class ColumnsOnlyTrack(model.Track):
+    """Track which must not create Location objects."""
+
+    def __getitem__(self, index: int) -> model.Location:  # noqa: D105
+        raise AssertionError("track point accessed as Location")
+
+
+def test_geotag__reads_columns_of_sorted_track_in_place() -> None:  # noqa: D103
+    track = ColumnsOnlyTrack([48.0, 49.0], [9.0, 10.0], [1000.0, 2000.0])
+
+    assert track.sorted_by_time() is track
+    assert geotag.geotag([1500.0, 500.0], track) == [(48.5, 9.5), (48.0, 9.0)]
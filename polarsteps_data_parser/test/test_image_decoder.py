@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from .context import image_decoder
+
+
+def make_decoder(tmp_path: Path, memory_limit: int = 256 * 1024 * 1024) -> "image_decoder.ImageDecoder":  # noqa: D103
+    return image_decoder.ImageDecoder(max_edge=100, memory_limit=memory_limit, cache_dir=tmp_path / "cache")
+
+
+def test_ImageDecoder_embeddable__small_jpeg_is_embedded_as_it_is(tmp_path: Path) -> None:  # noqa: D103
+    path = tmp_path / "photo.jpg"
+    Image.new("RGB", (100, 50)).save(path)
+
+    assert make_decoder(tmp_path).embeddable(path) == path
+
+
+def test_ImageDecoder_embeddable__large_jpeg_is_decoded_at_reduced_scale(tmp_path: Path) -> None:  # noqa: D103
+    path = tmp_path / "photo.jpg"
+    Image.new("RGB", (800, 400)).save(path)
+    # a full decode needs 1.28 MB, DCT scaling by 1/8 only 20 kB
+    testee = make_decoder(tmp_path, memory_limit=100_000)
+
+    reduced = testee.embeddable(path)
+
+    assert reduced.parent == tmp_path / "cache"
+    with Image.open(reduced) as image:
+        assert image.size == (100, 50)
+    assert testee.embeddable(path) == reduced
+
+
+def test_ImageDecoder_embeddable__png_is_converted_to_jpeg(tmp_path: Path) -> None:  # noqa: D103
+    path = tmp_path / "photo.png"
+    Image.new("RGBA", (60, 30)).save(path)
+
+    with Image.open(make_decoder(tmp_path).embeddable(path)) as image:
+        assert (image.format, image.size) == ("JPEG", (60, 30))
+
+
+def test_ImageDecoder_embeddable__refuses_decode_beyond_memory_limit(tmp_path: Path) -> None:  # noqa: D103
+    path = tmp_path / "photo.png"
+    Image.new("RGB", (800, 400)).save(path)
+
+    with pytest.raises(MemoryError):
+        make_decoder(tmp_path, memory_limit=100_000).embeddable(path)
+
+
+def test_MemoryBudget__release_makes_room_again() -> None:  # noqa: D103
+    testee = image_decoder.MemoryBudget(100)
+
+    testee.acquire(60)
+    testee.release(60)
+    testee.acquire(100)
+
+    assert testee.limit_bytes == 100
@@ -0,0 +1,64 @@
+import struct
+from pathlib import Path
+
+import pytest
+from PIL import Image, features
+
+from .context import image_probe
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:  # noqa: D103
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def make_ispe(width: int, height: int) -> bytes:  # noqa: D103
+    return box(b"ispe", bytes(4) + struct.pack(">II", width, height))
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "PNG"])
+def test_probe_image_size__common_formats(tmp_path: Path, image_format: str) -> None:  # noqa: D103
+    path = tmp_path / "photo"
+    Image.new("RGB", (321, 123)).save(path, format=image_format)
+
+    assert image_probe.probe_image_size(path) == (321, 123)
+
+
+def test_probe_image_size__jpeg_with_large_exif_segment(tmp_path: Path) -> None:  # noqa: D103
+    path = tmp_path / "photo.jpg"
+    exif = Image.Exif()
+    exif[0x010E] = "x" * 30000
+    Image.new("RGB", (64, 48)).save(path, format="JPEG", exif=exif, progressive=True)
+
+    assert image_probe.probe_image_size(path) == (64, 48)
+
+
+@pytest.mark.skipif(not features.check("webp"), reason="Pillow without WebP support")
+@pytest.mark.parametrize("lossless", [False, True])
+def test_probe_image_size__webp(tmp_path: Path, lossless: bool) -> None:  # noqa: D103
+    path = tmp_path / "photo.webp"
+    Image.new("RGB", (321, 123)).save(path, format="WEBP", lossless=lossless)
+
+    assert image_probe.probe_image_size(path) == (321, 123)
+
+
+def test_probe_image_size__heic_uses_largest_image(tmp_path: Path) -> None:  # noqa: D103
+    path = tmp_path / "photo.heic"
+    ipco = box(b"ipco", make_ispe(512, 512) + make_ispe(4032, 3024) + make_ispe(320, 240))
+    meta = box(b"meta", bytes(4) + box(b"hdlr", bytes(24)) + box(b"iprp", ipco))
+    path.write_bytes(box(b"ftyp", b"heic" + bytes(4) + b"mif1heic") + meta + box(b"mdat", bytes(1000)))
+
+    assert image_probe.probe_image_size(path) == (4032, 3024)
+
+
+def test_probe_image_size__unknown_format(tmp_path: Path) -> None:  # noqa: D103
+    (tmp_path / "photo.gif").write_bytes(b"GIF89a")
+
+    assert image_probe.probe_image_size(tmp_path / "photo.gif") is None
+
+
+def test_cached_image_size__returns_tuple(tmp_path: Path) -> None:  # noqa: D103
+    path = tmp_path / "photo.png"
+    Image.new("RGB", (10, 20)).save(path)
+
+    assert image_probe.cached_image_size(path) == (10, 20)
+    assert image_probe.cached_image_size(path) == (10, 20)
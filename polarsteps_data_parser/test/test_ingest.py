@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from .context import ingest, model
+from .test_model import make_trip_folder
+
+
+def write_locations(folder: Path, times: list[int]) -> None:  # noqa: D103
+    points = [{"lat": 48.0 + i, "lon": 9.0, "time": time} for i, time in enumerate(times)]
+    (folder / "locations.json").write_text(json.dumps({"locations": points}, indent=2))
+
+
+def test_Ingest__only_the_tail_is_parsed_after_commit(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:  # noqa: D103
+    trip = model.load_trip_from_file(make_trip_folder(tmp_path))
+    write_locations(tmp_path, [100, 200])
+    testee = ingest.Ingest(tmp_path / "state")
+    track, delta = testee.ingest(tmp_path, trip)
+    testee.commit()
+    assert (len(track), delta.first_run, delta.new_point_count, delta.new_step_numbers) == (2, True, 2, [1, 2])
+
+    write_locations(tmp_path, [100, 200, 300])
+    parsed = []
+    parse_json = ingest.utils.parse_json
+    monkeypatch.setattr(ingest.utils, "parse_json", lambda content: parsed.append(content) or parse_json(content))
+    track, delta = ingest.Ingest(tmp_path / "state").ingest(tmp_path, trip)
+
+    assert (len(track), delta.first_run, delta.new_point_count, delta.new_step_numbers) == (3, False, 1, [])
+    assert list(track.times) == [100.0, 200.0, 300.0]
+    assert parsed[0].count(b'"time"') == 1
+
+
+def test_Ingest__nothing_new_gives_empty_delta(tmp_path: Path) -> None:  # noqa: D103
+    trip = model.load_trip_from_file(make_trip_folder(tmp_path))
+    write_locations(tmp_path, [100, 200])
+    testee = ingest.Ingest(tmp_path / "state")
+    testee.ingest(tmp_path, trip)
+    testee.commit()
+
+    track, delta = ingest.Ingest(tmp_path / "state").ingest(tmp_path, trip)
+
+    assert len(track) == 2
+    assert delta.is_empty
+
+
+def test_Ingest__uncommitted_ingest_is_repeated(tmp_path: Path) -> None:  # noqa: D103
+    trip = model.load_trip_from_file(make_trip_folder(tmp_path))
+    write_locations(tmp_path, [100])
+    testee = ingest.Ingest(tmp_path / "state")
+    testee.ingest(tmp_path, trip)
+    testee.commit()
+    write_locations(tmp_path, [100, 200])
+    ingest.Ingest(tmp_path / "state").ingest(tmp_path, trip)
+
+    track, delta = ingest.Ingest(tmp_path / "state").ingest(tmp_path, trip)
+
+    assert list(track.times) == [100.0, 200.0]
+    assert delta.new_point_count == 1
+
+
+def test_Ingest__changed_history_is_parsed_completely(tmp_path: Path) -> None:  # noqa: D103
+    trip = model.load_trip_from_file(make_trip_folder(tmp_path))
+    write_locations(tmp_path, [100, 300])
+    testee = ingest.Ingest(tmp_path / "state")
+    testee.ingest(tmp_path, trip)
+    testee.commit()
+    write_locations(tmp_path, [100, 250, 300, 400])
+
+    track, delta = ingest.Ingest(tmp_path / "state").ingest(tmp_path, trip)
+
+    assert list(track.times) == [100.0, 250.0, 300.0, 400.0]
+    assert delta.new_point_count == 1
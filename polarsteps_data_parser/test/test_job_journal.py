@@ -0,0 +1,79 @@
+from concurrent.futures import Future
+from pathlib import Path
+
+from .context import job_journal
+
+
+def write_output(path: Path, content: str = "map") -> Path:  # noqa: D103
+    path.write_text(content)
+    return path
+
+
+def test_JobJournal_is_done__after_record(tmp_path: Path) -> None:  # noqa: D103
+    output = write_output(tmp_path / "step_1_map.png")
+    inputs = job_journal.inputs_fingerprint(48.8, 9.3, 7)
+    journal = job_journal.JobJournal.of_output_folder(tmp_path, "step-maps")
+
+    assert not journal.is_done("step 1", inputs)
+    journal.record("step 1", inputs, [output])
+
+    assert journal.is_done("step 1", inputs)
+    assert job_journal.JobJournal.of_output_folder(tmp_path, "step-maps").is_done("step 1", inputs)
+    assert not journal.is_done("step 1", job_journal.inputs_fingerprint(48.8, 9.3, 8))
+    assert not journal.is_done("step 2", inputs)
+
+
+def test_JobJournal_is_done__changed_or_missing_output(tmp_path: Path) -> None:  # noqa: D103
+    output = write_output(tmp_path / "step_1_map.png")
+    journal = job_journal.JobJournal.of_output_folder(tmp_path, "step-maps")
+    journal.record("step 1", "inputs", [output])
+
+    write_output(output, "partly written")
+    assert not journal.is_done("step 1", "inputs")
+    output.unlink()
+    assert not journal.is_done("step 1", "inputs")
+
+
+def test_JobJournal__line_cut_off_by_crash_is_ignored(tmp_path: Path) -> None:  # noqa: D103
+    output = write_output(tmp_path / "trip.pdf")
+    journal = job_journal.JobJournal(tmp_path / "pdf.jsonl")
+    journal.record("trip.pdf", "inputs", [output])
+    with open(tmp_path / "pdf.jsonl", "a") as file:
+        file.write('{"unit": "other.pdf", "inp')
+
+    assert job_journal.JobJournal(tmp_path / "pdf.jsonl").is_done("trip.pdf", "inputs")
+
+
+def test_JobJournal__outdated_lines_are_compacted(tmp_path: Path) -> None:  # noqa: D103
+    output = write_output(tmp_path / "trip.pdf")
+    journal = job_journal.JobJournal(tmp_path / "pdf.jsonl")
+    for run in range(150):
+        journal.record("trip.pdf", f"inputs {run}", [output])
+
+    journal = job_journal.JobJournal(tmp_path / "pdf.jsonl")
+
+    assert len((tmp_path / "pdf.jsonl").read_text().splitlines()) == 1
+    assert journal.is_done("trip.pdf", "inputs 149")
+
+
+def test_JobJournal_record_when_done__waits_for_all_outputs(tmp_path: Path) -> None:  # noqa: D103
+    outputs = [write_output(tmp_path / "step_1_map.png"), write_output(tmp_path / "step_1_map_thumb.png")]
+    futures = [Future(), Future()]
+    journal = job_journal.JobJournal(tmp_path / "step-maps.jsonl")
+
+    journal.record_when_done("step 1", "inputs", outputs, futures)
+    futures[0].set_result(None)
+    assert not journal.is_done("step 1", "inputs")
+    futures[1].set_result(None)
+    assert journal.is_done("step 1", "inputs")
+
+
+def test_JobJournal_record_when_done__failed_output_is_not_recorded(tmp_path: Path) -> None:  # noqa: D103
+    futures = [Future()]
+    journal = job_journal.JobJournal(tmp_path / "step-maps.jsonl")
+
+    journal.record_when_done("step 1", "inputs", [tmp_path / "step_1_map.png"], futures)
+    futures[0].set_exception(OSError("disk full"))
+
+    assert not journal.is_done("step 1", "inputs")
+    assert not (tmp_path / "step-maps.jsonl").exists()
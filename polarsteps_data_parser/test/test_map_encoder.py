@@ -0,0 +1,84 @@
+import threading
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from .context import map_encoder
+
+
+class FakeSurface:
+    """Stands in for a cairo ARGB32 image surface filled with a single opaque color."""
+
+    def __init__(self, width: int, height: int) -> None:
+        self._width = width
+        self._height = height
+        # native byte order of cairo ARGB32 on little endian hosts is BGRA
+        self._data = bytearray([40, 80, 160, 255] * width * height)
+
+    def get_width(self) -> int:  # noqa: D102
+        return self._width
+
+    def get_height(self) -> int:  # noqa: D102
+        return self._height
+
+    def get_stride(self) -> int:  # noqa: D102
+        return self._width * 4
+
+    def get_data(self) -> memoryview:  # noqa: D102
+        return memoryview(self._data)
+
+    def write_to_png(self, filename: str) -> None:  # noqa: D102
+        Image.frombuffer("RGBA", (self._width, self._height), bytes(self._data), "raw", "BGRA").save(filename)
+
+
+@pytest.mark.parametrize("image_format", [f for f in map_encoder.MapEncoder.FORMATS])
+def test_encode__writes_decodable_image_and_reports_size(image_format: str, tmp_path: Path) -> None:  # noqa: D103
+    encoder = map_encoder.MapEncoder(image_format)
+    output_path = tmp_path / f"map{encoder.extension}"
+
+    result = encoder.encode(FakeSurface(64, 48), output_path)
+
+    assert result.bytes == output_path.stat().st_size > 0
+    assert result.seconds >= 0
+    with Image.open(output_path) as image:
+        assert image.size == (64, 48)
+        assert image.convert("RGB").getpixel((10, 10)) == pytest.approx((160, 80, 40), abs=3)
+
+
+def test_submit__encodes_on_background_threads(tmp_path: Path) -> None:  # noqa: D103
+    with map_encoder.MapEncoder("png-fast", max_workers=2) as encoder:
+        for index in range(5):
+            encoder.submit(FakeSurface(32, 32), tmp_path / f"map_{index}.png")
+
+    assert len(encoder.wait()) == 5
+    assert len(list(tmp_path.glob("*.png"))) == 5
+    assert encoder.summary().startswith("Encoded 5 images as 'png-fast'")
+
+
+def test_submit__blocks_while_encoder_is_busy(tmp_path: Path) -> None:  # noqa: D103
+    encoding_may_finish = threading.Event()
+
+    class BlockedEncoder(map_encoder.MapEncoder):
+        def encode(self, surface: FakeSurface, output_filepath: Path) -> "map_encoder.EncodeResult":
+            encoding_may_finish.wait()
+            return super().encode(surface, output_filepath)
+
+    with BlockedEncoder("png-fast", max_workers=1) as encoder:
+        for index in range(encoder.PENDING_PER_WORKER):
+            encoder.submit(FakeSurface(8, 8), tmp_path / f"map_{index}.png")
+        blocked = threading.Thread(target=encoder.submit, args=(FakeSurface(8, 8), tmp_path / "map_last.png"))
+        blocked.start()
+        blocked.join(timeout=0.2)
+        assert blocked.is_alive()
+
+        encoding_may_finish.set()
+        blocked.join(timeout=5)
+        assert not blocked.is_alive()
+
+    assert len(encoder.wait()) == encoder.PENDING_PER_WORKER + 1
+
+
+def test_unknown_format__raises_error() -> None:  # noqa: D103
+    with pytest.raises(ValueError):
+        map_encoder.MapEncoder("gif")
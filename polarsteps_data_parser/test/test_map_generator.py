@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from .context import map_encoder, map_generator
+from .test_map_encoder import FakeSurface
+
+MapGenerator = map_generator.MapGenerator
+MapVariant = map_generator.MapVariant
+
+
+def make_generator(zoom: int | None) -> "map_generator.MapGenerator":  # noqa: D103
+    generator = MapGenerator(MapGenerator.PROVIDER_NONE)
+    if zoom is not None:
+        generator.set_zoom(zoom)
+    generator.set_image_properties(width_pixels=800, ratio_x_over_y=2.0)
+    generator.add_location_markers(map_generator.GPSPoint.from_tuples([(48.8, 9.3), (52.5, 13.4)]), marker_size=12)
+    return generator
+
+
+@pytest.fixture
+def rendered(monkeypatch: pytest.MonkeyPatch) -> list[tuple[int, int, int]]:
+    """Renders maps as fake surfaces without cairo and records (zoom, width, height) of each rendering."""
+    rendered = []
+
+    def render_cairo(context: "map_generator.staticmaps.Context", width: int, height: int) -> FakeSurface:
+        rendered.append((context.determine_center_zoom(width, height)[1], width, height))
+        return FakeSurface(width, height)
+
+    def scale_surface(surface: FakeSurface, width_pixels: int) -> FakeSurface:
+        return FakeSurface(width_pixels, round(surface.get_height() * width_pixels / surface.get_width()))
+
+    monkeypatch.setattr(map_generator.staticmaps.Context, "render_cairo", render_cairo)
+    monkeypatch.setattr(map_generator, "scale_surface", scale_surface)
+    return rendered
+
+
+def image_sizes(paths: list[Path]) -> list[tuple[int, int]]:  # noqa: D103
+    sizes = []
+    for path in paths:
+        with Image.open(path) as image:
+            sizes.append(image.size)
+    return sizes
+
+
+def test_MapGenerator_write_variants__each_zoom_is_rendered_once_at_largest_width(  # noqa: D103
+    rendered: list, tmp_path: Path
+) -> None:
+    generator = make_generator(zoom=8)
+    variants = [
+        MapVariant(tmp_path / "a.png", 400),
+        MapVariant(tmp_path / "b.png", 200),
+        MapVariant(tmp_path / "c.png", 300, zoom=5),
+        MapVariant(tmp_path / "d.png", 100, zoom=5),
+    ]
+
+    with map_encoder.MapEncoder("png-fast") as encoder:
+        generator.write_variants(variants, encoder)
+        encoder.wait()
+
+    assert rendered == [(8, 400, 200), (5, 300, 150)]
+    sizes = image_sizes([variant.output_filepath for variant in variants])
+    assert sizes == [(400, 200), (200, 100), (300, 150), (100, 50)]
+    assert generator.transformer().zoom() == 8
+
+
+def test_MapGenerator_write_variants__map_keeps_automatic_zoom(rendered: list, tmp_path: Path) -> None:  # noqa: D103
+    generator = make_generator(zoom=None)
+    automatic_zoom = generator.transformer().zoom()
+
+    variants = [MapVariant(tmp_path / "a.png", 800, zoom=2), MapVariant(tmp_path / "b.png", 800)]
+
+    with map_encoder.MapEncoder("png-fast") as encoder:
+        generator.write_variants(variants, encoder)
+        encoder.wait()
+
+    assert rendered == [(2, 800, 400), (automatic_zoom, 800, 400)]
+    assert generator.transformer().zoom() == automatic_zoom
+
+
+def test_scale_surface__keeps_aspect_ratio() -> None:  # noqa: D103
+    cairo = pytest.importorskip("cairo")
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 400, 300)
+
+    scaled = map_generator.scale_surface(surface, 100)
+
+    assert (scaled.get_width(), scaled.get_height()) == (100, 75)
+
+
+def test_scale_surface__without_cairo_raises_import_error(monkeypatch: pytest.MonkeyPatch) -> None:  # noqa: D103
+    monkeypatch.setattr(map_generator, "cairo", None)
+
+    with pytest.raises(ImportError, match="cairo"):
+        map_generator.scale_surface(FakeSurface(400, 300), 100)
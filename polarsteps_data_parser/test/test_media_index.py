@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from .context import image_decoder, media_index, pdf_generator
+
+
+def write_file(path: Path, content: bytes) -> Path:  # noqa: D103
+    path.write_bytes(content)
+    return path
+
+
+def test_MediaIndex_add__identical_files_map_to_first_file(tmp_path: Path) -> None:  # noqa: D103
+    content = bytes(range(256)) * 1000
+    first = write_file(tmp_path / "a.jpg", content)
+    second = write_file(tmp_path / "b.jpg", content)
+    testee = media_index.MediaIndex()
+
+    assert testee.add(first) == first
+    assert testee.add(second) == first
+    assert testee.canonical(second) == first
+    assert testee.duplicates() == {first: [second]}
+
+
+def test_MediaIndex_add__partial_hash_collision_is_resolved_by_full_hash(tmp_path: Path) -> None:  # noqa: D103
+    size = 3 * media_index.MediaIndex.PARTIAL_HASH_BYTES
+    content = bytearray(size)
+    first = write_file(tmp_path / "a.jpg", bytes(content))
+    # same size, same head and tail, different middle
+    content[size // 2] = 1
+    second = write_file(tmp_path / "b.jpg", bytes(content))
+    testee = media_index.MediaIndex()
+
+    assert testee.add(first) == first
+    assert testee.add(second) == second
+    assert testee.duplicates() == {}
+
+
+def test_MediaIndex_add__files_added_from_several_threads_map_to_one_file(tmp_path: Path) -> None:  # noqa: D103
+    content = bytes(range(256)) * 1000
+    paths = [write_file(tmp_path / f"{index}.jpg", content) for index in range(16)]
+    testee = media_index.MediaIndex()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        canonicals = list(executor.map(testee.add, paths + paths))
+
+    assert len(set(canonicals)) == 1
+    assert len(testee) == 16
+    assert sum(len(duplicates) for duplicates in testee.duplicates().values()) == 15
+
+
+def test_link_or_copy__destination_has_same_content(tmp_path: Path) -> None:  # noqa: D103
+    source = write_file(tmp_path / "a.jpg", b"photo")
+    destination = write_file(tmp_path / "b.jpg", b"old")
+
+    media_index.link_or_copy(source, destination)
+
+    assert destination.read_bytes() == b"photo"
+
+
+def test_PDFGenerator_photo__duplicates_are_embedded_once(tmp_path: Path) -> None:  # noqa: D103
+    Image.new("RGB", (40, 30), (200, 10, 10)).save(tmp_path / "a.png")
+    (tmp_path / "b.png").write_bytes((tmp_path / "a.png").read_bytes())
+    output = tmp_path / "out.pdf"
+    testee = pdf_generator.PDFGenerator(str(output), decoder=image_decoder.ImageDecoder(cache_dir=tmp_path / "cache"))
+
+    testee.layout.photo(tmp_path / "a.png")
+    testee.layout.new_page()
+    testee.layout.photo(tmp_path / "b.png")
+    testee.render(testee.layout.plan)
+
+    assert output.read_bytes().count(b"/Subtype /Image") == 1
@@ -0,0 +1,35 @@
+import os
+from pathlib import Path
+
+from .context import metadata_cache
+
+
+def test_MetadataCache_get_or_compute__computes_once_per_fingerprint(tmp_path: Path) -> None:  # noqa: D103
+    file = tmp_path / "a.jpg"
+    file.write_bytes(b"first")
+    calls = []
+
+    def compute(path: Path) -> int:
+        calls.append(path)
+        return len(calls)
+
+    testee = metadata_cache.MetadataCache()
+
+    assert testee.get_or_compute(file, "value", compute) == 1
+    assert testee.get_or_compute(file, "value", compute) == 1
+    file.write_bytes(b"modified")
+    os.utime(file, ns=(0, 1))
+    assert testee.get_or_compute(file, "value", compute) == 2
+
+
+def test_MetadataCache_save__entries_are_loaded_again(tmp_path: Path) -> None:  # noqa: D103
+    file = tmp_path / "a.jpg"
+    file.write_bytes(b"photo")
+    cache_file = tmp_path / "cache" / "metadata.json"
+    testee = metadata_cache.MetadataCache(cache_file)
+    testee.get_or_compute(file, "value", lambda path: "cached")
+    testee.save()
+
+    reloaded = metadata_cache.MetadataCache(cache_file)
+
+    assert reloaded.get_or_compute(file, "value", lambda path: "computed") == "cached"
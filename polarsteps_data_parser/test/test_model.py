@@ -1,6 +1,12 @@
+import inspect
 import json
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
 
 import pytest
+from PIL import Image
 
 from .context import model
 
@@ -226,3 +232,140 @@ def test_Trip_from_json_two_steps() -> None:  # noqa: D103
     assert testee.steps[1].name == "Pleidelsheim"
     assert testee.steps[0].location.name == "Weinstadt"
     assert testee.steps[1].location.name == "Pleidelsheim"
+
+
+def make_trip_folder(folder: Path) -> Path:  # noqa: D103
+    (folder / "trip.json").write_text(make_json_doc_trip_with_two_steps())
+    photos = folder / "weinstadt_174638490" / "photos"
+    photos.mkdir(parents=True)
+    (photos / "a.jpg").write_bytes(b"")
+    (photos / "b.jpg").write_bytes(b"")
+    (folder / "pleidelsheim_174638111" / "videos").mkdir(parents=True)
+    (folder / "pleidelsheim_174638111" / "videos" / "c.mp4").write_bytes(b"")
+    return folder / "trip.json"
+
+
+def test_load_trip_from_file__media_files_are_looked_up_on_first_access(tmp_path: Path) -> None:  # noqa: D103
+    testee = model.load_trip_from_file(make_trip_folder(tmp_path))
+
+    assert all(step._photos is None and step._videos is None for step in testee.steps)
+    assert sorted(photo.name for photo in testee.get_step(1).photos) == ["a.jpg", "b.jpg"]
+    assert testee.get_step(1).videos == []
+    assert testee.get_step(2)._photos is None
+    assert [video.name for video in testee.get_step(2).videos] == ["c.mp4"]
+
+
+def test_load_trip_from_file__step_folders_are_indexed_per_trip(tmp_path: Path) -> None:  # noqa: D103
+    trip_json = make_trip_folder(tmp_path)
+    step_folder = tmp_path / "weinstadt_174638490"
+    step_folder.rename(tmp_path / "later")
+    assert model.load_trip_from_file(trip_json).get_step(1).photos == []
+
+    (tmp_path / "later").rename(step_folder)
+
+    assert sorted(photo.name for photo in model.load_trip_from_file(trip_json).get_step(1).photos) == ["a.jpg", "b.jpg"]
+
+
+def test_Step_photos__capture_times_are_read_only_for_sorted_photos(  # noqa: D103
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    testee = model.load_trip_from_file(make_trip_folder(tmp_path)).get_step(1)
+    exif = Image.Exif()
+    exif.get_ifd(0x8769)[0x9003] = "2024:05:01 10:30:00"
+    Image.new("RGB", (8, 8)).save(tmp_path / "weinstadt_174638490" / "photos" / "b.jpg", format="JPEG", exif=exif)
+    read_capture_time = model.photo_metadata.read_capture_time
+    read = []
+
+    def counting_read_capture_time(path: Path) -> datetime | None:
+        read.append(path.name)
+        return read_capture_time(path)
+
+    monkeypatch.setattr(model.photo_metadata, "read_capture_time", counting_read_capture_time)
+
+    assert len(testee.photos) == 2
+    assert read == []
+    assert [photo.name for photo in testee.sorted_photos] == ["b.jpg", "a.jpg"]
+
+
+def test_Step_without_media_folder_has_no_media() -> None:  # noqa: D103
+    testee = model.Step.from_json(json.loads(make_json_doc_single_step(step_id="a", location_id="a")))
+
+    assert testee.photos == []
+    assert testee.videos == []
+
+
+def test_Step__media_is_not_a_constructor_argument() -> None:  # noqa: D103
+    location = model.StepLocation(lat=48.8, lon=9.3, name="Weinstadt", country="Germany")
+
+    testee = model.Step(step_id="1", name="n", description="d", location=location, date=datetime(2024, 5, 1))
+
+    assert [name for name in inspect.signature(model.Step).parameters if name.startswith("_")] == []
+    assert (testee.photos, testee.videos, testee.photo_locations) == ([], [], {})
+
+
+def test_Trip_from_json__steps_are_parsed_on_first_access() -> None:  # noqa: D103
+    testee = model.Trip.from_json(json.loads(make_json_doc_trip_with_two_steps()))
+
+    assert len(testee.steps) == 2
+    assert testee.steps.materialized_count == 0
+    assert testee.get_step(2).name == "Pleidelsheim"
+    assert testee.steps.materialized_count == 1
+    assert testee.steps[1] is testee.get_step(2)
+    assert [step.name for step in testee.steps] == ["Weinstadt", "Pleidelsheim"]
+
+
+def test_Step_prune_json__keeps_only_parsed_fields() -> None:  # noqa: D103
+    data = json.loads(make_json_doc_single_step(step_id="a", location_id="a"))
+
+    pruned = model.Step.prune_json(data)
+
+    assert set(pruned) <= set(model.Step.JSON_FIELDS) | {"location"}
+    assert set(pruned["location"]) == set(model.StepLocation.JSON_FIELDS)
+    assert model.Step.from_json(pruned) == model.Step.from_json(data)
+
+
+def test_Step_prune_json__pruned_data_is_not_copied() -> None:  # noqa: D103
+    pruned = model.Step.prune_json(json.loads(make_json_doc_single_step(step_id="a", location_id="a")))
+
+    assert model.Step.prune_json(pruned) is pruned
+
+
+def test_load_trip_from_file__unused_fields_are_not_decoded(tmp_path: Path) -> None:  # noqa: D103
+    pytest.importorskip("msgspec")
+    trip = json.loads(make_json_doc_trip_with_two_steps())
+    step = trip["all_steps"][0]
+    step["comments"] = [{"id": i, "text": f"comment {i}", "likes": list(range(10))} for i in range(500)]
+    trip["all_steps"] = [{**step, "id": i} for i in range(200)]
+    (tmp_path / "trip.json").write_text(json.dumps(trip))
+
+    def peak_memory(function: Callable[[], object]) -> int:
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    all_fields = peak_memory(lambda: model.utils.load_json_from_file(tmp_path / "trip.json"))
+    used_fields = peak_memory(lambda: model.load_trip_from_file(tmp_path / "trip.json"))
+
+    # the peak of the decode with the schema is mostly the content of the file
+    assert used_fields < all_fields / 4
+    testee = model.load_trip_from_file(tmp_path / "trip.json")
+    assert [step.step_id for step in testee.steps] == list(range(200))
+    expected = model.Step.from_json(step | {"id": 0})
+    assert (testee.get_step(1).name, testee.get_step(1).location) == (expected.name, expected.location)
+
+
+def test_Trip_geotag_photos__photos_are_located_by_capture_time(tmp_path: Path) -> None:  # noqa: D103
+    testee = model.load_trip_from_file(make_trip_folder(tmp_path))
+    exif = Image.Exif()
+    exif.get_ifd(0x8769)[0x9003] = "2024:05:01 10:30:00"
+    Image.new("RGB", (8, 8)).save(tmp_path / "weinstadt_174638490" / "photos" / "a.jpg", format="JPEG", exif=exif)
+    # 10:30 in Weinstadt (Europe/Berlin, UTC+2) is 08:30 UTC
+    track = model.Track([48.0, 49.0], [9.0, 10.0], [1714551600.0, 1714552800.0])
+
+    assert testee.geotag_photos(track) == 1
+    photo_locations = {photo.name: location for photo, location in testee.get_step(1).photo_locations.items()}
+    assert photo_locations["a.jpg"] == model.Location(48.5, 9.5, datetime(2024, 5, 1, 10, 30))
+    assert photo_locations["b.jpg"] is None
+    assert testee.get_step(2).photo_locations == {}
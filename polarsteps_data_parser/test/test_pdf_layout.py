@@ -0,0 +1,80 @@
+from pathlib import Path
+
+from PIL import Image
+from reportlab.lib.pagesizes import letter
+
+from .context import model, pdf_generator, pdf_layout
+from .test_model import make_trip_folder
+
+FONT = ("Helvetica", 12)
+
+
+def measure_landscape(path: Path | str) -> tuple[str, int, int] | None:  # noqa: D103
+    return (str(path), 400, 300) if str(path) != "broken.jpg" else None
+
+
+def test_PageLayout_photo__breaks_page_when_photo_does_not_fit() -> None:  # noqa: D103
+    testee = pdf_layout.PageLayout(letter, measure_landscape)
+
+    for index in range(4):
+        testee.photo(f"{index}.jpg")
+
+    plan = testee.plan
+    assert plan.page_count == 2
+    assert [item.source for item in plan.pages[0].items] == ["0.jpg", "1.jpg", "2.jpg"]
+    assert plan.pages[1].items[0] == pdf_layout.ImageItem(30, letter[1] - 30 - 187.5, 250, 187.5, "3.jpg")
+
+
+def test_PageLayout_photo__skips_photos_which_cannot_be_measured() -> None:  # noqa: D103
+    testee = pdf_layout.PageLayout(letter, measure_landscape)
+
+    assert testee.photo("broken.jpg") is False
+    assert testee.plan.image_count == 0
+
+
+def test_PageLayout_photo_grid__places_two_photos_per_row() -> None:  # noqa: D103
+    testee = pdf_layout.PageLayout(letter, measure_landscape)
+
+    testee.photo_grid([f"{index}.jpg" for index in range(5)], columns=2)
+
+    items = testee.plan.pages[0].items
+    assert len(items) == 5
+    assert items[0].y == items[1].y
+    assert items[1].x == items[0].x + items[0].width + pdf_layout.PageLayout.GRID_GAP
+    assert items[0].x + 2 * items[0].width + pdf_layout.PageLayout.GRID_GAP == letter[0] - 30
+    assert items[2].y < items[0].y
+
+
+def test_PageLayout_long_text__continues_on_new_page() -> None:  # noqa: D103
+    testee = pdf_layout.PageLayout(letter, measure_landscape)
+
+    testee.long_text(" ".join(["word"] * 2000), FONT)
+
+    plan = testee.plan
+    assert plan.page_count > 1
+    assert all(item.y >= pdf_layout.PageLayout.BOTTOM for page in plan.pages for item in page.items)
+
+
+def test_PageLayout_new_page__empty_page_is_continued() -> None:  # noqa: D103
+    testee = pdf_layout.PageLayout(letter, measure_landscape)
+
+    testee.new_page()
+    testee.heading("Weinstadt", FONT)
+    testee.new_page()
+
+    assert testee.plan.page_count == 2
+
+
+def test_PDFGenerator_plan__steps_laid_out_in_parallel_keep_their_order(tmp_path: Path) -> None:  # noqa: D103
+    trip = model.load_trip_from_file(make_trip_folder(tmp_path))
+    Image.new("RGB", (400, 300)).save(tmp_path / "weinstadt_174638490" / "photos" / "a.jpg", format="JPEG")
+    testee = pdf_generator.PDFGenerator(str(tmp_path / "trip.pdf"))
+
+    plan = testee.plan(trip, [1, 2, 1, 2, 2])
+
+    assert plan.page_count == 6
+    headings = [page.items[0].text for page in plan.pages[1:]]
+    assert headings == ["Weinstadt", "Pleidelsheim", "Weinstadt", "Pleidelsheim", "Pleidelsheim"]
+    assert [item.source for item in plan.pages[1].items if hasattr(item, "source")] == [
+        str(tmp_path / "weinstadt_174638490" / "photos" / "a.jpg")
+    ]
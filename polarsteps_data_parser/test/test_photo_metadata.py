@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from PIL import Image
+
+from .context import photo_metadata
+
+
+def write_jpeg(  # noqa: D103
+    path: Path, date_time_original: str | None = None, date_time: str | None = None, offset: str | None = None
+) -> Path:
+    exif = Image.Exif()
+    if offset is not None:
+        exif.get_ifd(0x8769)[0x9011] = offset
+    if date_time is not None:
+        exif[0x0132] = date_time
+    if date_time_original is not None:
+        exif.get_ifd(0x8769)[0x9003] = date_time_original
+    Image.new("RGB", (16, 16), (0, 128, 0)).save(path, format="JPEG", exif=exif)
+    return path
+
+
+def test_read_capture_time__prefers_date_time_original(tmp_path: Path) -> None:  # noqa: D103
+    photo = write_jpeg(tmp_path / "a.jpg", "2024:05:01 10:11:12", "2024:06:01 00:00:00")
+
+    assert photo_metadata.read_capture_time(photo) == datetime(2024, 5, 1, 10, 11, 12)
+
+
+def test_read_capture_time__falls_back_to_date_time(tmp_path: Path) -> None:  # noqa: D103
+    photo = write_jpeg(tmp_path / "a.jpg", date_time="2024:06:01 08:00:00")
+
+    assert photo_metadata.read_capture_time(photo) == datetime(2024, 6, 1, 8, 0, 0)
+
+
+def test_read_capture_time__with_offset_time_original(tmp_path: Path) -> None:  # noqa: D103
+    photo = write_jpeg(tmp_path / "a.jpg", "2024:05:01 10:11:12", offset="+09:00")
+
+    capture_time = photo_metadata.read_capture_time(photo)
+
+    assert capture_time == datetime(2024, 5, 1, 10, 11, 12, tzinfo=timezone(timedelta(hours=9)))
+    assert photo_metadata.capture_timestamp(capture_time, "Europe/Berlin") == capture_time.timestamp()
+
+
+def test_capture_timestamp__naive_time_is_local_time_of_timezone() -> None:  # noqa: D103
+    tokyo = photo_metadata.capture_timestamp(datetime(2024, 5, 1, 10, 0), "Asia/Tokyo")
+    berlin = photo_metadata.capture_timestamp(datetime(2024, 5, 1, 10, 0), "Europe/Berlin")
+
+    assert tokyo == datetime(2024, 5, 1, 1, 0, tzinfo=timezone.utc).timestamp()
+    assert berlin - tokyo == 7 * 3600
+    assert photo_metadata.capture_timestamp(None, "Asia/Tokyo") is None
+
+
+def test_read_capture_time__none_without_exif(tmp_path: Path) -> None:  # noqa: D103
+    Image.new("RGB", (16, 16)).save(tmp_path / "a.png")
+
+    assert photo_metadata.read_capture_time(write_jpeg(tmp_path / "a.jpg")) is None
+    assert photo_metadata.read_capture_time(tmp_path / "a.png") is None
+
+
+def test_sort_by_capture_time__photos_without_time_follow_by_name(tmp_path: Path) -> None:  # noqa: D103
+    photos = [
+        write_jpeg(tmp_path / "z.jpg"),
+        write_jpeg(tmp_path / "late.jpg", "2024:05:02 09:00:00"),
+        write_jpeg(tmp_path / "y.jpg"),
+        write_jpeg(tmp_path / "early.jpg", "2024:05:01 09:00:00"),
+    ]
+
+    testee = photo_metadata.sort_by_capture_time(photos)
+
+    assert [photo.name for photo in testee] == ["early.jpg", "late.jpg", "y.jpg", "z.jpg"]
@@ -0,0 +1,63 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from .context import model, reverse_geocoder
+
+PLACES = [
+    reverse_geocoder.Place("Weinstadt", "DE", 48.81, 9.37),
+    reverse_geocoder.Place("Stuttgart", "DE", 48.78, 9.18),
+    reverse_geocoder.Place("Strasbourg", "FR", 48.58, 7.75),
+    reverse_geocoder.Place("Suva", "FJ", -18.14, 178.44),
+    reverse_geocoder.Place("Taveuni", "FJ", -16.85, -179.97),
+]
+
+
+def brute_force_nearest(lat: float, lon: float, max_distance_m: float) -> reverse_geocoder.Place | None:  # noqa: D103
+    distances = [(reverse_geocoder.distance_m((lat, lon, 0), (p.lat, p.lon, 0)), p) for p in PLACES]
+    distance, place = min(distances, key=lambda item: item[0])
+    return place if distance <= max_distance_m else None
+
+
+def test_Gazetteer_nearest__matches_brute_force() -> None:  # noqa: D103
+    random.seed(42)
+    testee = reverse_geocoder.Gazetteer(PLACES, max_distance_m=300_000)
+    queries = [(random.uniform(47, 50), random.uniform(6, 11)) for _ in range(200)]
+    queries += [(random.uniform(-19, -16), random.choice([-1, 1]) * random.uniform(177, 180)) for _ in range(200)]
+
+    for lat, lon in queries:
+        assert testee.nearest(lat, lon) == brute_force_nearest(lat, lon, 300_000), (lat, lon)
+
+
+def test_Gazetteer_reverse_geocode__far_points_have_no_place() -> None:  # noqa: D103
+    testee = reverse_geocoder.Gazetteer(PLACES)
+
+    places = testee.reverse_geocode([(48.80, 9.36), (0.0, 0.0), (-16.86, 179.99)])
+
+    assert [place.name if place else None for place in places] == ["Weinstadt", None, "Taveuni"]
+
+
+def test_Gazetteer_load__geonames_and_csv(tmp_path: Path) -> None:  # noqa: D103
+    geonames = tmp_path / "cities1000.txt"
+    geonames.write_text("2810716\tWeinstadt\tWeinstadt\tWeinstadt\t48.81\t9.37\tP\tPPLA4\tDE\t\t01\t\t\t\t27000\n")
+    table = tmp_path / "places.csv"
+    table.write_text("name,lat,lon,country\nStrasbourg,48.58,7.75,FR\n")
+
+    assert reverse_geocoder.Gazetteer.load(geonames).nearest(48.8, 9.4).country == "DE"
+    assert reverse_geocoder.Gazetteer.load(table).nearest(48.6, 7.7).name == "Strasbourg"
+
+
+def test_country_statistics__days_and_distance_per_country() -> None:  # noqa: D103
+    day = 86400.0
+    track = model.Track([48.78, 48.81, 48.58, 48.59], [9.18, 9.37, 7.75, 7.76], [0.0, 3600.0, day, 2 * day])
+
+    statistics = reverse_geocoder.country_statistics(track, reverse_geocoder.Gazetteer(PLACES))
+
+    assert list(statistics) == ["FR", "DE"]
+    assert statistics["DE"].days == 1 and statistics["FR"].days == 2
+    # the move from Weinstadt to Strasbourg counts for Germany
+    points = list(track.points())
+    distances = [reverse_geocoder.distance_m(a, b) / 1000 for a, b in zip(points, points[1:])]
+    assert statistics["DE"].distance_km == pytest.approx(distances[0] + distances[1])
+    assert statistics["FR"].distance_km == pytest.approx(distances[2])
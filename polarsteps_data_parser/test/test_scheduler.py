@@ -0,0 +1,93 @@
+import math
+import threading
+import time
+
+import pytest
+
+from .context import scheduler
+
+
+class Concurrency:
+    """Records how many jobs run at the same time."""
+
+    def __init__(self) -> None:
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def job(self, result: int, seconds: float = 0.05) -> int:  # noqa: D102
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(seconds)
+        with self._lock:
+            self.running -= 1
+        return result
+
+
+def test_Scheduler_run__runs_jobs_at_the_same_time() -> None:  # noqa: D103
+    concurrency = Concurrency()
+    jobs = [scheduler.Job(f"job {i}", concurrency.job, (i, 0.2)) for i in range(4)]
+
+    started = time.perf_counter()
+    results = scheduler.Scheduler(scheduler.Budget(4, 1024)).run(jobs)
+
+    assert results == {"job 0": 0, "job 1": 1, "job 2": 2, "job 3": 3}
+    assert concurrency.peak == 4
+    assert time.perf_counter() - started < 0.6
+
+
+@pytest.mark.parametrize(("budget", "peak"), [(scheduler.Budget(2, 4096), 2), (scheduler.Budget(8, 1000), 1)])
+def test_Scheduler_run__stays_within_budget(budget: scheduler.Budget, peak: int) -> None:  # noqa: D103
+    concurrency = Concurrency()
+    jobs = [scheduler.Job(f"job {i}", concurrency.job, (i,), cpus=1, memory_mb=600) for i in range(4)]
+
+    scheduler.Scheduler(budget).run(jobs)
+
+    assert concurrency.peak == peak
+
+
+def test_Scheduler_run__job_beyond_budget_runs_alone() -> None:  # noqa: D103
+    concurrency = Concurrency()
+    jobs = [scheduler.Job("huge", concurrency.job, (1,), cpus=16), scheduler.Job("small", concurrency.job, (2,))]
+
+    assert scheduler.Scheduler(scheduler.Budget(2, 1024)).run(jobs) == {"huge": 1, "small": 2}
+    assert concurrency.peak == 1
+
+
+def test_Scheduler_run__reports_progress_of_jobs() -> None:  # noqa: D103
+    def pages(progress: scheduler.JobProgress) -> int:
+        progress.set_length(3)
+        with progress as bar:
+            for _ in range(3):
+                bar.update(1)
+        return 3
+
+    jobs = [scheduler.Job("pdf", pages, (scheduler.JobProgress("pdf"),), units=1)]
+
+    assert scheduler.Scheduler(scheduler.Budget(1, 1024)).run(jobs) == {"pdf": 3}
+
+
+def test_Scheduler_run__runs_job_in_process() -> None:  # noqa: D103
+    jobs = [scheduler.Job("factorial", math.factorial, (20,), in_process=True)]
+
+    assert scheduler.Scheduler(scheduler.Budget(1, 1024)).run(jobs) == {"factorial": math.factorial(20)}
+
+
+def test_Scheduler_run__failed_job__raises_error_and_starts_no_further_job() -> None:  # noqa: D103
+    concurrency = Concurrency()
+
+    def fail() -> None:
+        raise ValueError("broken")
+
+    jobs = [scheduler.Job("fail", fail), scheduler.Job("next", concurrency.job, (1,))]
+
+    with pytest.raises(ValueError, match="broken"):
+        scheduler.Scheduler(scheduler.Budget(1, 1024)).run(jobs)
+    assert concurrency.peak == 0
+
+
+def test_JobProgress__outside_of_scheduler__does_nothing() -> None:  # noqa: D103
+    with scheduler.JobProgress("pdf") as bar:
+        bar.set_length(2)
+        bar.update(1)
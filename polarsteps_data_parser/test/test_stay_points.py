@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+import pytest
+
+from .context import model, stay_points
+
+# about 11 m per 0.0001 degree of latitude
+HOUR = 3600.0
+
+
+def make_track(points: list[tuple[float, float]]) -> model.Track:  # noqa: D103
+    return model.Track([lat for lat, _ in points], [9.3] * len(points), [time for _, time in points])
+
+
+def test_detect_stays__stays_between_moves() -> None:  # noqa: D103
+    track = make_track(
+        [
+            (48.8000, 0.0), (48.8001, 0.5 * HOUR), (48.8000, 8 * HOUR),  # night in Weinstadt
+            (48.9000, 9 * HOUR),  # on the road
+            (49.0000, 10 * HOUR), (49.0005, 10.2 * HOUR),  # short break, too short
+            (49.5000, 12 * HOUR), (49.5002, 14 * HOUR),  # lunch
+        ]
+    )  # fmt: skip
+
+    stays = stay_points.detect_stays(track, radius_m=100.0, min_duration=timedelta(minutes=30))
+
+    assert [(stay.point_count, stay.duration) for stay in stays] == [(3, timedelta(hours=8)), (2, timedelta(hours=2))]
+    assert stays[0].lat == pytest.approx(48.80003, abs=1e-5)
+    assert stays[0].arrival == model.utils.parse_date(0.0)
+    assert stay_points.total_duration(stays) == timedelta(hours=10)
+
+
+def test_detect_stays__slow_drift_leaves_the_centre() -> None:  # noqa: D103
+    # 20 m per step, 10 minutes apart: the running centre is left after a few steps
+    track = make_track([(48.8 + i * 0.00018, i * 600.0) for i in range(30)])
+
+    stays = stay_points.detect_stays(track, radius_m=50.0, min_duration=timedelta(minutes=20))
+
+    assert len(stays) > 1
+    assert all(stay.point_count < 30 for stay in stays)
+
+
+def test_detect_stays__unsorted_track_is_sorted() -> None:  # noqa: D103
+    track = make_track([(48.8, 2 * HOUR), (48.8, 0.0), (49.8, 3 * HOUR), (48.8, HOUR)])
+
+    stays = stay_points.detect_stays(track)
+
+    assert [(stay.point_count, stay.duration) for stay in stays] == [(3, timedelta(hours=2))]
+
+
+def test_detect_stays__empty_track() -> None:  # noqa: D103
+    assert stay_points.detect_stays(make_track([])) == []
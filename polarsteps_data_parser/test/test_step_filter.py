@@ -0,0 +1,82 @@
+from datetime import date, datetime
+
+import pytest
+
+from .context import model, step_filter
+
+STEPS = [
+    ("Frankfurt", "Germany", 50.11, 8.68, datetime(2025, 2, 28, 18, 0)),
+    ("Tokyo", "Japan", 35.68, 139.69, datetime(2025, 3, 2, 9, 0)),
+    ("Kyoto", "Japan", 35.01, 135.77, datetime(2025, 3, 8, 9, 0)),
+    ("Kyoto Station", "Japan", 34.99, 135.76, datetime(2025, 3, 9, 23, 30)),
+    ("Seoul", "South Korea", 37.57, 126.98, datetime(2025, 3, 20, 12, 0)),
+    ("Fiji", "Fiji", -17.71, 178.07, datetime(2025, 4, 1, 8, 0)),
+    ("Samoa", "Samoa", -13.76, -172.10, datetime(2025, 4, 5, 8, 0)),
+]
+
+
+@pytest.fixture
+def trip() -> model.Trip:  # noqa: D103
+    steps = [
+        model.Step(str(number), name, "", model.StepLocation(lat, lon, name, country), step_date)
+        for number, (name, country, lat, lon, step_date) in enumerate(STEPS, 1)
+    ]
+    return model.Trip("Asia", STEPS[0][4], STEPS[-1][4], "", steps)
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("2,4-5", [2, 4, 5]),
+        ("date:2025-03-01..2025-03-09", [2, 3, 4]),
+        ("date:2025-03-08", [3]),
+        ("date:..2025-03-01", [1]),
+        ("date:2025-03-20..", [5, 6, 7]),
+        ("country:japan", [2, 3, 4]),
+        ("country:Germany, south korea", [1, 5]),
+        ("name:KYOTO", [3, 4]),
+        ("bbox:34,135,36,136", [3, 4]),
+        ("bbox:-20,170,-10,-170", [6, 7]),
+        ("country:japan; date:2025-03-05..; name:station", [4]),
+        ("1-4;country:japan", [2, 3, 4]),
+        ("country:france", []),
+    ],
+)
+def test_select_steps(trip: model.Trip, query: str, expected: list[int]) -> None:  # noqa: D103
+    assert step_filter.select_steps(query, trip) == expected
+
+
+class UnreadableSteps(list):
+    """Steps which must not be accessed."""
+
+    def __getitem__(self, index: int) -> model.Step:  # noqa: D105
+        raise AssertionError("step accessed")
+
+    def __iter__(self) -> None:  # noqa: D105
+        raise AssertionError("steps iterated")
+
+
+def test_select_steps__numbers_only__does_not_index_steps() -> None:  # noqa: D103
+    trip = model.Trip("Lazy", datetime(2025, 1, 1), datetime(2025, 1, 2), "", UnreadableSteps([None] * 3))
+
+    assert step_filter.select_steps("1,3;2-3", trip) == [3]
+
+
+def test_parse_step_filter() -> None:  # noqa: D103
+    clauses = step_filter.parse_step_filter("date:2025-03-01..2025-03-20;Country:Japan")
+
+    assert clauses == [
+        step_filter.Clause("date", (date(2025, 3, 1), date(2025, 3, 20))),
+        step_filter.Clause("country", ("japan",)),
+    ]
+    assert not step_filter.is_numeric(clauses)
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["", "continent:asia", "date:2025-03-20..2025-03-01", "date:03/01/2025", "date:..", "bbox:1,2,3", "bbox:5,0,1,1",
+     "name:", "1-4;"],
+)  # fmt: skip
+def test_parse_step_filter__invalid__raises_error(query: str) -> None:  # noqa: D103
+    with pytest.raises(ValueError):
+        step_filter.parse_step_filter(query)
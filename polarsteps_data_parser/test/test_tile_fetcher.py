@@ -0,0 +1,98 @@
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import staticmaps
+
+from .context import map_generator, tile_fetcher
+
+
+class StandInTileServer:
+    """Local HTTP server which serves fake tiles and counts the requests per path."""
+
+    def __init__(self, failures_per_path: int = 0) -> None:
+        self.requests = Counter()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                server.requests[self.path] += 1
+                if server.requests[self.path] <= failures_per_path:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = self.path.encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:  # noqa: D102
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.provider = staticmaps.TileProvider(
+            "stand-in", url_pattern=f"http://127.0.0.1:{self._httpd.server_port}/$z/$x/$y.png"
+        )
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def shutdown(self) -> None:  # noqa: D102
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def server() -> StandInTileServer:  # noqa: D103
+    server = StandInTileServer()
+    yield server
+    server.shutdown()
+
+
+def test_prefetch__fetches_each_tile_once(server: StandInTileServer) -> None:  # noqa: D103
+    tiles = {(3, x, y) for x in range(4) for y in range(4)}
+    with tile_fetcher.TileFetcher(max_workers=4, rate_limits={}) as fetcher:
+        assert fetcher.prefetch(server.provider, None, tiles) == 0
+        assert fetcher.prefetch(server.provider, None, tiles) == 0
+        assert fetcher.get(server.provider, None, 3, 1, 2) == b"/3/1/2.png"
+
+    assert len(server.requests) == 16
+    assert set(server.requests.values()) == {1}
+
+
+def test_prefetch__retries_failed_requests() -> None:  # noqa: D103
+    server = StandInTileServer(failures_per_path=2)
+    try:
+        with tile_fetcher.TileFetcher(max_retries=2, backoff_seconds=0.0, rate_limits={}) as fetcher:
+            assert fetcher.prefetch(server.provider, None, {(1, 0, 0)}) == 0
+    finally:
+        server.shutdown()
+
+    assert server.requests["/1/0/0.png"] == 3
+
+
+def test_prefetch__reports_tiles_which_could_not_be_fetched() -> None:  # noqa: D103
+    server = StandInTileServer(failures_per_path=5)
+    try:
+        with tile_fetcher.TileFetcher(max_retries=1, backoff_seconds=0.0, rate_limits={}) as fetcher:
+            assert fetcher.prefetch(server.provider, None, {(1, 0, 0), (1, 1, 0)}) == 2
+    finally:
+        server.shutdown()
+
+
+def test_prefetch_tiles__covers_tiles_required_by_map(server: StandInTileServer, tmp_path: Path) -> None:  # noqa: D103
+    generator = map_generator.MapGenerator(server.provider)
+    generator.set_cache_dir(tmp_path.as_posix())
+    generator.set_zoom(5)
+    generator.set_image_properties(width_pixels=600, ratio_x_over_y=1.5)
+    generator.add_location_marker(map_generator.GPSPoint(lat=48.8, lon=9.4), marker_size=12)
+
+    required = generator.required_tiles()
+    with tile_fetcher.TileFetcher(rate_limits={}) as fetcher:
+        map_generator.MapGenerator.prefetch_tiles([generator], fetcher)
+
+    assert required
+    assert all(zoom == 5 for zoom, _, _ in required)
+    assert set(server.requests) == {f"/{z}/{x}/{y}.png" for z, x, y in required}
+    assert len(list(tmp_path.rglob("*.png"))) == len(required)
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+from .context import map_generator, tile_fetcher, tile_pack
+from .test_tile_fetcher import StandInTileServer
+
+
+@pytest.fixture
+def server() -> StandInTileServer:  # noqa: D103
+    server = StandInTileServer()
+    yield server
+    server.shutdown()
+
+
+def test_tile_range__covers_bounding_box() -> None:  # noqa: D103
+    assert tile_pack.tile_range(-85, -180, 85, 180, 0) == (0, 0, 0, 0)
+    assert tile_pack.tile_range(-85, -180, 85, 180, 2) == (0, 0, 3, 3)
+    # Stuttgart area at zoom 10
+    assert tile_pack.tile_range(48.7, 9.1, 48.9, 9.4, 10) == (537, 352, 538, 352)
+
+
+def test_seed_tile_pack__tiles_are_readable_from_provider(server: StandInTileServer, tmp_path: Path) -> None:  # noqa: D103
+    pack_path = tmp_path / "trip.mbtiles"
+    bounds = (48.7, 9.1, 48.9, 9.4)
+
+    with tile_fetcher.TileFetcher(rate_limits={}) as fetcher:
+        written = tile_pack.seed_tile_pack(pack_path, server.provider, bounds, range(2, 5), fetcher, margin_tiles=0)
+        assert tile_pack.seed_tile_pack(pack_path, server.provider, bounds, range(2, 5), fetcher, margin_tiles=0) == 0
+
+    assert written == len(server.requests)
+    provider = map_generator.MapGenerator.tile_pack_provider(pack_path)
+    assert provider.max_zoom() == 4
+    assert provider.downloader().get(provider, None, 4, 8, 5) == b"/4/8/5.png"
+    assert provider.downloader().get(provider, None, 4, 0, 0) is None
+
+
+def test_seed_tile_pack__failed_tiles_are_skipped_until_retry(tmp_path: Path) -> None:  # noqa: D103
+    server = StandInTileServer(failures_per_path=1000)
+
+    def requests_of_seeding(**options: object) -> int:
+        before = sum(server.requests.values())
+        pack_path, bounds = tmp_path / "trip.mbtiles", (48.7, 9.1, 48.9, 9.4)
+        with tile_fetcher.TileFetcher(max_retries=0, rate_limits={}) as fetcher:
+            written = tile_pack.seed_tile_pack(pack_path, server.provider, bounds, range(2, 4), fetcher, **options)
+        assert written == 0
+        return sum(server.requests.values()) - before
+
+    try:
+        failed = requests_of_seeding()
+        skipped = requests_of_seeding()
+        retried = requests_of_seeding(retry_failed_after=timedelta())
+    finally:
+        server.shutdown()
+
+    assert failed > 0
+    # each tile is requested once, a tile which failed in the prefetch is not downloaded again
+    assert failed == len(server.requests)
+    assert skipped == 0
+    assert retried == failed
+
+
+def test_seed_tile_pack__refuses_bulk_downloads(server: StandInTileServer, tmp_path: Path) -> None:  # noqa: D103
+    with tile_fetcher.TileFetcher(rate_limits={}) as fetcher, pytest.raises(ValueError):
+        tile_pack.seed_tile_pack(tmp_path / "world.mbtiles", server.provider, (-80, -170, 80, 170), range(12), fetcher)
+
+    assert len(server.requests) == 0
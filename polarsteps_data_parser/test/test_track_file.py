@@ -0,0 +1,85 @@
+import os
+import pickle
+from pathlib import Path
+
+import pytest
+
+from .context import model, track_file
+
+LOCATIONS = (
+    '{"locations": [{"lat": 48.8, "lon": 9.3, "time": 1752620400}, '
+    '{"lat": 48.7, "lon": 9.2, "time": 1752616800.5}, {"lat": 48.9, "lon": 9.4, "time": 1752624000}]}'
+)
+
+
+def test_convert_locations_json__points_are_sorted_by_time(tmp_path: Path) -> None:  # noqa: D103
+    (tmp_path / "locations.json").write_text(LOCATIONS)
+
+    count = track_file.convert_locations_json(tmp_path / "locations.json", tmp_path / "locations.pstrack")
+    track = track_file.load_track_file(tmp_path / "locations.pstrack")
+
+    assert count == 3
+    assert len(track) == 3
+    assert [location.lat for location in track] == [48.7, 48.8, 48.9]
+    assert track.times[0] == 1752616800.5
+    assert (track[1].lat, track[1].lon) == (48.8, 9.3)
+    assert track[1].time == model.utils.parse_date(1752620400)
+    assert not (tmp_path / "locations.tmp").exists()
+
+
+def test_load_track_file__columns_are_views_into_the_file(tmp_path: Path) -> None:  # noqa: D103
+    (tmp_path / "locations.json").write_text(LOCATIONS)
+    track_file.convert_locations_json(tmp_path / "locations.json", tmp_path / "locations.pstrack")
+
+    track = track_file.load_track_file(tmp_path / "locations.pstrack")
+
+    assert isinstance(track.lats, memoryview)
+    assert track.lats.readonly
+    assert list(track.lons) == [9.2, 9.3, 9.4]
+
+
+def test_load_track_file__track_can_be_pickled(tmp_path: Path) -> None:  # noqa: D103
+    (tmp_path / "locations.json").write_text(LOCATIONS)
+    track_file.convert_locations_json(tmp_path / "locations.json", tmp_path / "locations.pstrack")
+
+    track = pickle.loads(pickle.dumps(track_file.load_track_file(tmp_path / "locations.pstrack")))
+
+    assert track.track_file == tmp_path / "locations.pstrack"
+    assert isinstance(track.times, memoryview)
+    assert list(track.points()) == [(48.7, 9.2, 1752616800.5), (48.8, 9.3, 1752620400.0), (48.9, 9.4, 1752624000.0)]
+
+
+def test_Track__track_without_file_is_pickled_with_its_points() -> None:  # noqa: D103
+    track = pickle.loads(pickle.dumps(model.Track([48.7, 48.8], [9.2, 9.3], [1752616800.5, 1752620400.0])))
+
+    assert list(track.points()) == [(48.7, 9.2, 1752616800.5), (48.8, 9.3, 1752620400.0)]
+
+
+@pytest.mark.parametrize("content", [b"", b"not a track file at all, no no no", b"PSTRACK\x00" + bytes(24)[:-1]])
+def test_load_track_file__invalid_file_raises(tmp_path: Path, content: bytes) -> None:  # noqa: D103
+    (tmp_path / "locations.pstrack").write_bytes(content)
+
+    with pytest.raises(ValueError):
+        track_file.load_track_file(tmp_path / "locations.pstrack")
+
+
+def test_load_track_file__truncated_file_raises(tmp_path: Path) -> None:  # noqa: D103
+    (tmp_path / "locations.json").write_text(LOCATIONS)
+    track_file.convert_locations_json(tmp_path / "locations.json", tmp_path / "locations.pstrack")
+    content = (tmp_path / "locations.pstrack").read_bytes()
+    (tmp_path / "locations.pstrack").write_bytes(content[:-8])
+
+    with pytest.raises(ValueError, match="truncated"):
+        track_file.load_track_file(tmp_path / "locations.pstrack")
+
+
+def test_load_track__outdated_track_file_is_ignored(tmp_path: Path) -> None:  # noqa: D103
+    (tmp_path / "locations.json").write_text(LOCATIONS)
+    track_file.convert_locations_json(tmp_path / "locations.json", tmp_path / "locations.pstrack")
+    assert isinstance(track_file.load_track(tmp_path).lats, memoryview)
+
+    os.utime(tmp_path / "locations.pstrack", ns=(0, 0))
+    track = track_file.load_track(tmp_path)
+
+    assert not isinstance(track.lats, memoryview)
+    assert [location.lat for location in track] == [48.8, 48.7, 48.9]
@@ -43,3 +43,12 @@ def test__decode_step_filter__invalid_syntax__raises_error() -> None:  # noqa: D
 def test__decode_step_filter__combinations() -> None:  # noqa: D103
     assert utils.decode_step_filter("3-5,8") == [3,4,5,8]
     assert utils.decode_step_filter("7,55-56,1") == [1,7,55,56]
+
+def test__decode_zoom_range() -> None:  # noqa: D103
+    assert utils.decode_zoom_range("7") == range(7, 8)
+    assert utils.decode_zoom_range("3-9") == range(3, 10)
+
+def test__decode_zoom_range__invalid__raises_error() -> None:  # noqa: D103
+    for zoom_range in ["9-3", "5-", "3-21", "a"]:
+        with pytest.raises(ValueError):
+            utils.decode_zoom_range(zoom_range)
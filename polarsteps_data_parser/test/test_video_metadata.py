@@ -0,0 +1,62 @@
+import struct
+from pathlib import Path
+
+import pytest
+
+from .context import video_metadata
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:  # noqa: D103
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def make_mvhd(timescale: int, duration: int) -> bytes:  # noqa: D103
+    return box(b"mvhd", bytes(4) + struct.pack(">IIII", 0, 0, timescale, duration) + bytes(80))
+
+
+def make_tkhd(width: int, height: int, rotated: bool = False) -> bytes:  # noqa: D103
+    matrix = [0, 0x10000, 0, -0x10000, 0, 0, 0, 0, 0x40000000]
+    if not rotated:
+        matrix = [0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000]
+    size = struct.pack(">II", width << 16, height << 16)
+    payload = bytes(4) + bytes(20) + bytes(16) + struct.pack(">9i", *matrix) + size
+    return box(b"tkhd", payload)
+
+
+def write_mp4(path: Path, rotated: bool = False) -> Path:  # noqa: D103
+    moov = box(
+        b"moov",
+        make_mvhd(600, 45000) + box(b"trak", make_tkhd(0, 0)) + box(b"trak", make_tkhd(1920, 1080, rotated)),
+    )
+    # media data before the header, as written by most phones
+    path.write_bytes(box(b"ftyp", b"isom" + bytes(4)) + box(b"mdat", bytes(100_000)) + moov)
+    return path
+
+
+def test_read_video_header__duration_and_resolution(tmp_path: Path) -> None:  # noqa: D103
+    testee = video_metadata.read_video_header(write_mp4(tmp_path / "a.mp4"))
+
+    assert testee.duration_seconds == pytest.approx(75.0)
+    assert (testee.width, testee.height) == (1920, 1080)
+    assert testee.duration_text == "1:15"
+
+
+def test_read_video_header__rotated_video_is_upright(tmp_path: Path) -> None:  # noqa: D103
+    testee = video_metadata.read_video_header(write_mp4(tmp_path / "a.mp4", rotated=True))
+
+    assert (testee.width, testee.height) == (1080, 1920)
+
+
+def test_read_video_header__not_a_video(tmp_path: Path) -> None:  # noqa: D103
+    (tmp_path / "a.mp4").write_bytes(b"no video")
+
+    assert video_metadata.read_video_header(tmp_path / "a.mp4") == video_metadata.VideoInfo()
+
+
+def test_video_infos__inspects_in_process_pool(tmp_path: Path) -> None:  # noqa: D103
+    videos = [write_mp4(tmp_path / "a.mp4"), write_mp4(tmp_path / "b.mp4", rotated=True)]
+
+    testee = video_metadata.video_infos(videos, max_workers=2)
+
+    assert [(info.width, info.height) for info in testee] == [(1920, 1080), (1080, 1920)]
+    assert video_metadata.video_infos(videos, max_workers=2) == testee
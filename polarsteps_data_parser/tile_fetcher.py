@@ -0,0 +1,178 @@
+import os
+import pathlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import staticmaps
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+TileKey = tuple[int, int, int]
+
+
+class RateLimiter:
+    """Spaces out calls so that at most 'requests_per_second' calls pass per second."""
+
+    def __init__(self, requests_per_second: float) -> None:
+        self._interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Block until the next call is allowed."""
+        if self._interval == 0.0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class TileFetcher(staticmaps.TileDownloader):
+    """Tile downloader that prefetches tiles in parallel over pooled keep-alive connections.
+
+    Tiles are kept in memory once fetched, so any number of maps rendered with the same fetcher
+    download each tile at most once. Tiles which have not been prefetched are downloaded on demand.
+    """
+
+    DEFAULT_MAX_WORKERS = 8
+    DEFAULT_MAX_RETRIES = 3
+    DEFAULT_BACKOFF_SECONDS = 0.5
+    # Polite defaults for public tile servers (requests per second). Unlisted providers are not limited.
+    DEFAULT_RATE_LIMITS = {
+        staticmaps.tile_provider_OSM.name(): 10.0,
+        staticmaps.tile_provider_ArcGISWorldImagery.name(): 20.0,
+    }
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+        rate_limits: dict[str, float] | None = None,
+    ) -> None:
+        super().__init__()
+        self._max_workers = max_workers
+        self._max_retries = max_retries
+        self._backoff_seconds = backoff_seconds
+        self._rate_limits = dict(self.DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits)
+        self._rate_limiters: dict[str, RateLimiter] = {}
+        self._tiles: dict[tuple[str, int, int, int], bytes] = {}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, pool_block=True)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._session.close()
+
+    def __enter__(self) -> "TileFetcher":  # noqa: D105
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:  # noqa: D105
+        self.close()
+
+    def get(self, provider: staticmaps.TileProvider, cache_dir: str, zoom: int, x: int, y: int) -> bytes | None:
+        """Return a tile from memory, the disk cache or the tile server (in this order)."""
+        key = (provider.name(), zoom, x, y)
+        with self._lock:
+            data = self._tiles.get(key)
+        if data is not None:
+            return data
+        data = self._load(provider, cache_dir, zoom, x, y)
+        if data is not None:
+            with self._lock:
+                self._tiles[key] = data
+        return data
+
+    def fetched(self, provider: staticmaps.TileProvider, zoom: int, x: int, y: int) -> bytes | None:
+        """Return a tile kept in memory, None unless it has been fetched before. Nothing is downloaded."""
+        with self._lock:
+            return self._tiles.get((provider.name(), zoom, x, y))
+
+    def prefetch(self, provider: staticmaps.TileProvider, cache_dir: str | None, tiles: set[TileKey]) -> int:
+        """Download all given tiles of a provider in parallel and keep them in memory.
+
+        Args:
+            provider: tile provider to download from
+            cache_dir: directory of the staticmaps tile cache or None
+            tiles: set of (zoom, x, y) tuples
+
+        Returns:
+            int: number of tiles which could not be fetched
+        """
+        with self._lock:
+            missing = [tile for tile in tiles if (provider.name(), *tile) not in self._tiles]
+        if not missing:
+            return 0
+        logger.debug(f"Prefetching {len(missing)} tiles from '{provider.name()}' with {self._max_workers} workers")
+
+        def fetch(tile: TileKey) -> bool:
+            try:
+                return self.get(provider, cache_dir, *tile) is not None
+            except RuntimeError as e:
+                logger.warning(f"Failed to prefetch tile {tile} from '{provider.name()}': {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            results = list(executor.map(fetch, missing))
+        return results.count(False)
+
+    def evict(self, provider: staticmaps.TileProvider) -> None:
+        """Drop all tiles of a provider from memory."""
+        with self._lock:
+            self._tiles = {key: data for key, data in self._tiles.items() if key[0] != provider.name()}
+
+    def _load(
+        self, provider: staticmaps.TileProvider, cache_dir: str | None, zoom: int, x: int, y: int
+    ) -> bytes | None:
+        file_name = None
+        if cache_dir is not None:
+            file_name = self.cache_file_name(provider, cache_dir, zoom, x, y)
+            if os.path.isfile(file_name):
+                with open(file_name, "rb") as f:
+                    return f.read()
+
+        url = provider.url(zoom, x, y)
+        if url is None:
+            return None
+        data = self._download(provider.name(), url)
+
+        if file_name is not None:
+            pathlib.Path(os.path.dirname(file_name)).mkdir(parents=True, exist_ok=True)
+            with open(file_name, "wb") as f:
+                f.write(data)
+        return data
+
+    def _download(self, provider_name: str, url: str) -> bytes:
+        rate_limiter = self._rate_limiter(provider_name)
+        for attempt in range(self._max_retries + 1):
+            rate_limiter.wait()
+            try:
+                response = self._session.get(url, headers={"user-agent": self._user_agent}, timeout=10)
+            except requests.RequestException as e:
+                reason = str(e)
+            else:
+                if response.status_code == 200:
+                    return response.content
+                reason = f"status {response.status_code}"
+                if response.status_code not in self.RETRY_STATUS_CODES:
+                    break
+            if attempt < self._max_retries:
+                delay = self._backoff_seconds * 2**attempt
+                logger.debug(f"Fetching {url} failed ({reason}), retry in {delay:.1f}s")
+                time.sleep(delay)
+        raise RuntimeError(f"fetch {url} yields {reason}")
+
+    def _rate_limiter(self, provider_name: str) -> RateLimiter:
+        with self._lock:
+            if provider_name not in self._rate_limiters:
+                self._rate_limiters[provider_name] = RateLimiter(self._rate_limits.get(provider_name, 0.0))
+            return self._rate_limiters[provider_name]
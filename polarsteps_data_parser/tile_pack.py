@@ -0,0 +1,214 @@
+import math
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import staticmaps
+from loguru import logger
+
+from polarsteps_data_parser.tile_fetcher import TileFetcher
+
+MAX_MERCATOR_LATITUDE = 85.0511287798
+RETRY_FAILED_AFTER = timedelta(days=1)
+
+
+def tile_range(lat_lo: float, lon_lo: float, lat_hi: float, lon_hi: float, zoom: int) -> tuple[int, int, int, int]:
+    """Return the inclusive tile range (x_min, y_min, x_max, y_max) covering a bounding box at a zoom level."""
+    number_of_tiles = 2**zoom
+
+    def tile_x(lon: float) -> int:
+        return min(number_of_tiles - 1, max(0, int((lon + 180.0) / 360.0 * number_of_tiles)))
+
+    def tile_y(lat: float) -> int:
+        lat_rad = math.radians(max(-MAX_MERCATOR_LATITUDE, min(MAX_MERCATOR_LATITUDE, lat)))
+        y = (1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi) / 2.0
+        return min(number_of_tiles - 1, max(0, int(y * number_of_tiles)))
+
+    return tile_x(lon_lo), tile_y(lat_hi), tile_x(lon_hi), tile_y(lat_lo)
+
+
+class TilePack:
+    """Read access to map tiles stored in a local MBTiles (SQLite) file.
+
+    The file is opened read-only with SQLite's memory-mapped I/O, so tile reads are served from the page cache.
+    """
+
+    MMAP_SIZE = 1 << 30
+
+    def __init__(self, path: Path) -> None:
+        if not path.exists():
+            raise FileNotFoundError(f"Tile pack '{path}' does not exist.")
+        self._path = path
+        self._connection = sqlite3.connect(f"file:{path.as_posix()}?mode=ro", uri=True, check_same_thread=False)
+        self._connection.execute(f"PRAGMA mmap_size = {self.MMAP_SIZE}")
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:  # noqa: D102
+        return self._path
+
+    def metadata(self) -> dict[str, str]:
+        """Return the content of the 'metadata' table."""
+        with self._lock:
+            return dict(self._connection.execute("SELECT name, value FROM metadata").fetchall())
+
+    def tile(self, zoom: int, x: int, y: int) -> bytes | None:
+        """Return the tile with XYZ coordinates or None if the pack does not contain it."""
+        # MBTiles stores rows in TMS order, i.e. the y axis is flipped.
+        tms_y = (1 << zoom) - 1 - y
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (zoom, x, tms_y),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def close(self) -> None:  # noqa: D102
+        self._connection.close()
+
+
+class TilePackDownloader(staticmaps.TileDownloader):
+    """Tile downloader which serves tiles from a tile pack instead of the network."""
+
+    def __init__(self, pack: TilePack) -> None:
+        super().__init__()
+        self._pack = pack
+
+    def get(self, provider: staticmaps.TileProvider, cache_dir: str, zoom: int, x: int, y: int) -> bytes | None:
+        """Return a tile from the pack. Tiles missing in the pack are left blank."""
+        return self._pack.tile(zoom, x, y)
+
+
+class TilePackProvider(staticmaps.TileProvider):
+    """Tile provider backed by a local MBTiles file. Maps using it need no network access."""
+
+    def __init__(self, path: Path) -> None:
+        self._pack = TilePack(path)
+        metadata = self._pack.metadata()
+        super().__init__(
+            f"mbtiles-{path.stem}",
+            url_pattern="",
+            attribution=metadata.get("attribution"),
+            max_zoom=int(metadata.get("maxzoom", 20)),
+        )
+
+    def downloader(self) -> TilePackDownloader:  # noqa: D102
+        return TilePackDownloader(self._pack)
+
+
+def seed_tile_pack(
+    path: Path,
+    provider: staticmaps.TileProvider,
+    bounds: tuple[float, float, float, float],
+    zooms: range,
+    fetcher: TileFetcher,
+    margin_tiles: int = 2,
+    max_tiles: int = 50000,
+    retry_failed_after: timedelta = RETRY_FAILED_AFTER,
+) -> int:
+    """Download all tiles of a bounding box and zoom range into an MBTiles file.
+
+    Existing tiles in the pack are kept, so seeding can be resumed or extended. Tiles which could not be downloaded
+    are recorded in the table 'failed_tiles' of the pack and skipped by seeding again until 'retry_failed_after'.
+
+    Args:
+        path: MBTiles file to create or extend
+        provider: online tile provider to download from
+        bounds: (lat_lo, lon_lo, lat_hi, lon_hi) of the area to seed
+        zooms: zoom levels to seed
+        fetcher: fetcher used to download the tiles
+        margin_tiles: number of extra tiles around the bounding box, so maps centered near its edge are complete
+        max_tiles: refuse to seed more tiles than this, bulk downloads violate the usage policy of public servers
+        retry_failed_after: time after which tiles that failed are downloaded again
+
+    Returns:
+        int: number of tiles written into the pack
+    """
+    ranges_by_zoom: dict[int, tuple[range, range]] = {}
+    for zoom in zooms:
+        x_min, y_min, x_max, y_max = tile_range(*bounds, zoom)
+        last = (1 << zoom) - 1
+        ranges_by_zoom[zoom] = (
+            range(max(0, x_min - margin_tiles), min(last, x_max + margin_tiles) + 1),
+            range(max(0, y_min - margin_tiles), min(last, y_max + margin_tiles) + 1),
+        )
+    total = sum(len(xs) * len(ys) for xs, ys in ranges_by_zoom.values())
+    if total > max_tiles:
+        raise ValueError(f"Seeding would download {total} tiles which exceeds the limit of {max_tiles} tiles.")
+
+    connection = sqlite3.connect(path.as_posix())
+    written = 0
+    try:
+        _create_schema(connection, provider, zooms)
+        for zoom, (xs, ys) in ranges_by_zoom.items():
+            tiles = {(zoom, x, y) for x in xs for y in ys}
+            existing = {
+                (zoom, x, (1 << zoom) - 1 - tms_y)
+                for x, tms_y in connection.execute(
+                    "SELECT tile_column, tile_row FROM tiles WHERE zoom_level = ?", (zoom,)
+                )
+            }
+            failed_recently = {
+                (zoom, x, (1 << zoom) - 1 - tms_y)
+                for x, tms_y in connection.execute(
+                    "SELECT tile_column, tile_row FROM failed_tiles WHERE zoom_level = ? AND failed_at > ?",
+                    (zoom, time.time() - retry_failed_after.total_seconds()),
+                )
+            }
+            missing = tiles - existing - failed_recently
+            logger.info(
+                f"Seeding zoom {zoom}: {len(missing)} of {len(tiles)} tiles missing in '{path}', "
+                f"skipping {len(failed_recently)} which failed recently"
+            )
+            fetcher.prefetch(provider, None, missing)
+            rows = []
+            failed = []
+            for z, x, y in missing:
+                # tiles which the prefetch could not download are recorded as failed, not downloaded once more
+                data = fetcher.fetched(provider, z, x, y)
+                if data is not None:
+                    rows.append((z, x, (1 << z) - 1 - y, data))
+                else:
+                    failed.append((z, x, (1 << z) - 1 - y, time.time()))
+            connection.executemany("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)", rows)
+            connection.executemany(
+                "DELETE FROM failed_tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                [row[:3] for row in rows],
+            )
+            connection.executemany("INSERT OR REPLACE INTO failed_tiles VALUES (?, ?, ?, ?)", failed)
+            connection.commit()
+            fetcher.evict(provider)
+            written += len(rows)
+    finally:
+        connection.close()
+    return written
+
+
+def _create_schema(connection: sqlite3.Connection, provider: staticmaps.TileProvider, zooms: range) -> None:
+    connection.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS tiles "
+        "(zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB, "
+        "PRIMARY KEY (zoom_level, tile_column, tile_row))"
+    )
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS failed_tiles "
+        "(zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, failed_at REAL, "
+        "PRIMARY KEY (zoom_level, tile_column, tile_row))"
+    )
+    metadata = dict(connection.execute("SELECT name, value FROM metadata").fetchall())
+    min_zoom = min(zooms.start, int(metadata.get("minzoom", zooms.start)))
+    max_zoom = max(zooms.stop - 1, int(metadata.get("maxzoom", zooms.stop - 1)))
+    metadata.update(
+        {
+            "name": provider.name(),
+            "format": "png" if (provider.url(0, 0, 0) or "").endswith(".png") else "jpg",
+            "type": "baselayer",
+            "minzoom": str(min_zoom),
+            "maxzoom": str(max_zoom),
+            "attribution": provider.attribution() or "",
+        }
+    )
+    connection.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)", metadata.items())
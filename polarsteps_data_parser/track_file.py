@@ -0,0 +1,102 @@
+import mmap
+import struct
+from array import array
+from pathlib import Path
+
+from loguru import logger
+
+import polarsteps_data_parser.utils as utils
+from polarsteps_data_parser.export_source import ExportPath, is_in_archive
+from polarsteps_data_parser.model import Track, load_locations_from_file
+
+# File layout, all little endian:
+#   header:  magic (8 bytes), version (uint32), reserved (uint32), point count (uint64), reserved (uint64)
+#   columns: latitude, longitude and unix time of all points, each as float64[point count]
+MAGIC = b"PSTRACK\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")
+SUFFIX = ".pstrack"
+
+
+class MappedTrack(Track):
+    """A track whose columns are views into a memory-mapped track file.
+
+    Only the name of the file is pickled, a process which unpickles the track maps the file again instead of receiving
+    a copy of all points.
+    """
+
+    def __init__(self, track_file: Path, lats: memoryview, lons: memoryview, times: memoryview) -> None:
+        super().__init__(lats, lons, times)
+        self.track_file = track_file
+
+    def __reduce__(self) -> tuple:  # noqa: D105
+        return load_track_file, (self.track_file,)
+
+
+def convert_locations_json(json_file: ExportPath, track_file: Path) -> int:
+    """Convert a 'locations.json' into a binary track file with points sorted by time.
+
+    Returns:
+        int: number of points written
+    """
+    count = write_track_file(track_file, utils.load_json_from_file(json_file)["locations"])
+    logger.debug(f"Converted {count} points of '{json_file}' into '{track_file}'")
+    return count
+
+
+def write_track_file(track_file: Path, locations: list[dict], base: Track | None = None) -> int:
+    """Write the points of 'locations.json' entries, appended to the points of 'base' if given, sorted by time.
+
+    Returns:
+        int: number of points written
+    """
+    locations = sorted(locations, key=lambda location: location["time"])
+    columns = [array("d", (float(location[key]) for location in locations)) for key in ("lat", "lon", "time")]
+    if base is not None and len(base):
+        if locations and locations[0]["time"] < base.times[-1]:
+            # new points interleave with the old ones, which is rare as tracks only grow
+            merged = sorted([*base.points(), *zip(*columns)], key=lambda point: point[2])
+            columns = [array("d", column) for column in zip(*merged)]
+        else:
+            columns = [array("d", old) + new for old, new in zip((base.lats, base.lons, base.times), columns)]
+    if columns[0].itemsize != 8 or array("H", [1]).tobytes() != b"\x01\x00":
+        raise RuntimeError("Track files can only be written on little endian hosts with 64 bit floats.")
+    temporary = track_file.with_suffix(".tmp")
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, 0, len(columns[0]), 0))
+        for column in columns:
+            column.tofile(file)
+    temporary.replace(track_file)
+    return len(columns[0])
+
+
+def load_track_file(track_file: Path) -> MappedTrack:
+    """Memory-map a binary track file read-only.
+
+    Loading takes constant time, the columns are views into the mapping without any copy. Pages are read on access
+    and shared through the page cache by all processes which map the same file.
+    """
+    with open(track_file, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapping) < HEADER.size:
+        raise ValueError(f"'{track_file}' is not a track file.")
+    magic, version, _, count, _ = HEADER.unpack_from(mapping)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"'{track_file}' is not a track file of version {VERSION}.")
+    if len(mapping) != HEADER.size + 3 * 8 * count:
+        raise ValueError(f"'{track_file}' is truncated.")
+    points = memoryview(mapping)[HEADER.size :].cast("d")
+    track = MappedTrack(track_file, points[:count], points[count : 2 * count], points[2 * count :])
+    # the views keep the mapping open as long as the track exists
+    return track
+
+
+def load_track(folder: ExportPath) -> Track:
+    """Load the track of a trip folder, from 'locations.pstrack' if it is up to date and else from 'locations.json'."""
+    track_file = folder / f"locations{SUFFIX}"
+    json_file = folder / "locations.json"
+    if not is_in_archive(folder) and track_file.exists():
+        if not json_file.exists() or track_file.stat().st_mtime_ns >= json_file.stat().st_mtime_ns:
+            return load_track_file(track_file)
+        logger.info(f"Ignoring '{track_file}' which is older than '{json_file}'")
+    return Track.from_locations(load_locations_from_file(json_file))
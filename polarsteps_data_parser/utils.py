@@ -1,21 +1,65 @@
 import json
-import os
 import re
+from collections.abc import Iterable
 from datetime import datetime
 from pathlib import Path
+from typing import Any
 
+from polarsteps_data_parser.export_source import ExportPath
 
-def load_json_from_file(path: Path) -> dict:
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# errors raised by 'parse_json' for malformed JSON
+JSON_DECODE_ERRORS = (ValueError, msgspec.DecodeError) if msgspec is not None else (ValueError,)
+
+
+def load_json_from_file(path: ExportPath, schema: Any = None) -> dict:  # noqa: ANN401
     """Load content from file and convert to JSON object.
 
+    The fastest installed JSON backend is used: msgspec, orjson or the standard library. The file may be inside a
+    ZIP file (see 'export_source').
+
     Args:
         path: path to file
+        schema: fields to decode (see 'json_schema'), all fields if None
 
     Returns:
         dict: parsed JSON
     """
-    with open(path, "r") as file:
-        return json.load(file)
+    return parse_json(path.read_bytes(), schema)
+
+
+def parse_json(content: bytes, schema: Any = None) -> Any:  # noqa: ANN401
+    """Parse JSON with the fastest installed JSON backend, see 'load_json_from_file'."""
+    if msgspec is not None:
+        if schema is not None:
+            return msgspec.to_builtins(msgspec.json.decode(content, type=schema))
+        return msgspec.json.decode(content)
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def json_schema(name: str, fields: Iterable[str], nested: dict[str, Any] | None = None) -> Any:  # noqa: ANN401
+    """Return a schema for decoding only the given fields of a JSON object, None if msgspec is not installed.
+
+    msgspec skips all other fields while decoding, so they never exist as Python objects. Fields missing in the JSON
+    are missing in the decoded dict as well. 'nested' maps fields to the schema or type of their value.
+    """
+    if msgspec is None:
+        return None
+    nested = nested or {}
+    return msgspec.defstruct(
+        name, [(field, nested.get(field, Any) | msgspec.UnsetType, msgspec.UNSET) for field in fields]
+    )
 
 
 def parse_date(date: str) -> datetime:
@@ -33,41 +77,48 @@ def parse_date(date: str) -> datetime:
     return date_time
 
 
-def find_folder_by_id(folder_id: str, input_folder: Path) -> Path | None:
-    """Finds and returns the path of a folder within the base_directory that matches the given folder_id."""
-    if input_folder.exists() is False:
-        return None
+def index_step_folders(input_folder: ExportPath) -> dict[str, ExportPath]:
+    """Map step ids to their media folders '<name_of_step>_<step_id>' with a single scan of the trip folder."""
+    if input_folder.is_dir() is False:
+        return {}
 
+    index = {}
     for folder in input_folder.iterdir():
-        if folder.is_dir() and folder.name.endswith(f"_{folder_id}"):
-            return folder
+        if folder.is_dir():
+            index[folder.name.rpartition("_")[2]] = folder
+    return index
 
-    return None
 
+def find_media_files_of_step(
+    step_id: str, input_folder: ExportPath, step_folders: dict[str, ExportPath] | None = None
+) -> tuple[list[ExportPath], list[ExportPath]]:
+    """Load photos and videos for a given step.
 
-def find_media_files_of_step(step_id: str, input_folder: Path) -> None:
-    """Load photos and videos for a given step."""
+    'step_folders' is the index of 'input_folder' returned by 'index_step_folders', the folder is scanned without it.
+    """
     found_photos = []
     found_videos = []
-    media_dir = find_folder_by_id(step_id, input_folder)
+    if step_folders is None:
+        step_folders = index_step_folders(input_folder)
+    media_dir = step_folders.get(str(step_id))
     if media_dir is not None:
-        found_photos = list_files_in_folder(os.path.join(media_dir, "photos"), dir_has_to_exist=False)
-        found_videos = list_files_in_folder(os.path.join(media_dir, "videos"), dir_has_to_exist=False)
+        found_photos = list_files_in_folder(media_dir / "photos", dir_has_to_exist=False)
+        found_videos = list_files_in_folder(media_dir / "videos", dir_has_to_exist=False)
     return found_photos, found_videos
 
 
-def list_files_in_folder(folder_path: Path, dir_has_to_exist: bool = True) -> list[Path]:
+def list_files_in_folder(folder_path: ExportPath | str, dir_has_to_exist: bool = True) -> list[ExportPath]:
     """List all files in the given folder.
 
     Args:
-        folder_path (str or Path): The path of the folder to list files from.
+        folder_path (str, Path or zipfile.Path): The path of the folder to list files from.
         dir_has_to_exist (bool): raise exception if path does not exist.
 
     Returns:
         List[Path]: A list of Path objects representing the files in the folder.
 
     """
-    folder = Path(folder_path)
+    folder = Path(folder_path) if isinstance(folder_path, str) else folder_path
 
     if not folder.is_dir():
         if dir_has_to_exist:
@@ -117,3 +168,17 @@ def decode_image_size(image_size: str) -> tuple[int, int]: # noqa: D103
     if width <= 0 or height <= 0:
         raise ValueError("Width and height must be positive integers.")
     return width, height
+
+
+def decode_zoom_range(zoom_range: str) -> range:
+    """Decode zoom range from string in format 'MIN-MAX' or a single zoom level 'N'."""
+    if re.search(r"^\d+(-\d+)?$", zoom_range.strip()) is None:
+        raise ValueError("Zoom range must be in format 'MIN-MAX' or 'N'.")
+    zoom_min, _, zoom_max = zoom_range.strip().partition("-")
+    start = int(zoom_min)
+    end = int(zoom_max) if zoom_max else start
+    if start > end:
+        raise ValueError(f"Invalid zoom range ({zoom_range}). Start must be less than or equal to end.")
+    if end > 20:
+        raise ValueError(f"Invalid zoom range ({zoom_range}). Zoom level must be <= 20.")
+    return range(start, end + 1)
@@ -0,0 +1,182 @@
+import hashlib
+import os
+import shutil
+import struct
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+import appdirs
+from loguru import logger
+
+from polarsteps_data_parser.export_source import file_size, is_in_archive, open_binary
+from polarsteps_data_parser.metadata_cache import MetadataCache, shared_cache
+
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+POSTER_DIR = Path(appdirs.user_cache_dir("polarsteps-data-parser")) / "posters"
+POSTER_WIDTH = 640
+FFMPEG_TIMEOUT_SECONDS = 60
+
+# ISO base media boxes which contain the boxes we are looking for
+CONTAINER_BOXES = (b"moov", b"trak")
+
+
+@dataclass(frozen=True)
+class VideoInfo:
+    """Metadata of a video as read from its container header."""
+
+    duration_seconds: float | None = None
+    width: int | None = None
+    height: int | None = None
+    poster: Path | None = None
+
+    @property
+    def duration_text(self) -> str:
+        """Duration as 'm:ss' or '?' if unknown."""
+        if self.duration_seconds is None:
+            return "?"
+        minutes, seconds = divmod(round(self.duration_seconds), 60)
+        return f"{minutes}:{seconds:02d}"
+
+
+def read_video_header(path: Path) -> VideoInfo:
+    """Return duration and resolution of an MP4/MOV video from its 'moov' box.
+
+    The media data is skipped by seeking over it, so only a few kilobytes are read regardless of the file size.
+    """
+    try:
+        with open_binary(path) as file:
+            return _read_boxes(file, file_size(path), VideoInfo())
+    except (OSError, struct.error, ValueError) as e:
+        logger.debug(f"Cannot read video header of {path}: {e}")
+        return VideoInfo()
+
+
+def extract_poster_frame(path: Path, output: Path, width: int = POSTER_WIDTH) -> bool:
+    """Write the first keyframe after 1s of a video as JPEG with ffmpeg, if it is installed.
+
+    ffmpeg seeks to the keyframe before opening the decoder, so a single frame is decoded.
+
+    Returns:
+        bool: whether the poster frame was written
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return False
+    output.parent.mkdir(parents=True, exist_ok=True)
+    command = [
+        ffmpeg, "-v", "error", "-y", "-ss", "1", "-i", str(path),
+        "-frames:v", "1", "-vf", f"scale={width}:-2", "-q:v", "4", str(output),
+    ]  # fmt: skip
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=FFMPEG_TIMEOUT_SECONDS)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"Cannot extract poster frame of {path}: {e}")
+        return False
+    return output.exists()
+
+
+def video_infos(paths: list[Path], with_posters: bool = False, max_workers: int = MAX_WORKERS) -> list[VideoInfo]:
+    """Return metadata of all videos, optionally with poster frames.
+
+    Videos missing in the metadata cache are inspected in a bounded process pool, results are cached by file
+    fingerprint. Videos inside an export ZIP are inspected in this process and get no poster frame, extracting them
+    for ffmpeg would read the whole file.
+    """
+    cache = shared_cache()
+    infos: list[VideoInfo | None] = [_cached_info(cache, path, with_posters) for path in paths]
+    missing = [i for i, info in enumerate(infos) if info is None]
+    if missing:
+        logger.debug(f"Inspecting {len(missing)} videos with {max_workers} processes")
+        jobs = [
+            (paths[i], _poster_path(paths[i]) if with_posters and not is_in_archive(paths[i]) else None)
+            for i in missing
+        ]
+        if len(jobs) == 1 or max_workers <= 1 or any(is_in_archive(path) for path, _ in jobs):
+            results = [_inspect_video(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_inspect_video, *zip(*jobs)))
+        for i, (header, poster) in zip(missing, results):
+            cache.put(paths[i], "video_header", header)
+            if with_posters:
+                cache.put(paths[i], "video_poster", poster)
+            infos[i] = VideoInfo(**header, poster=Path(poster) if poster else None)
+    return infos
+
+
+def _cached_info(cache: MetadataCache, path: Path, with_poster: bool) -> VideoInfo | None:
+    header = cache.get(path, "video_header")
+    if header is None:
+        return None
+    if not with_poster:
+        return VideoInfo(**header)
+    missing = object()
+    poster = cache.get(path, "video_poster", missing)
+    if poster is missing or (poster is not None and not Path(poster).exists()):
+        return None
+    return VideoInfo(**header, poster=Path(poster) if poster else None)
+
+
+def _poster_path(path: Path) -> Path:
+    name = hashlib.blake2b(MetadataCache.fingerprint(path).encode(), digest_size=16).hexdigest()
+    return POSTER_DIR / f"{name}.jpg"
+
+
+def _inspect_video(path: Path, poster_path: Path | None) -> tuple[dict, str | None]:
+    header = asdict(read_video_header(path))
+    del header["poster"]
+    poster = None
+    if poster_path is not None and extract_poster_frame(path, poster_path):
+        poster = str(poster_path)
+    return header, poster
+
+
+def _read_boxes(file: BinaryIO, end: int, info: VideoInfo) -> VideoInfo:
+    while file.tell() + 8 <= end:
+        start = file.tell()
+        size, box_type = struct.unpack(">I4s", file.read(8))
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", file.read(8))
+            header_size = 16
+        elif size == 0:
+            size = end - start
+        if size < header_size:
+            raise ValueError(f"invalid size of box '{box_type!r}'")
+        if box_type in CONTAINER_BOXES:
+            info = _read_boxes(file, start + size, info)
+        elif box_type == b"mvhd":
+            info = _read_mvhd(file.read(size - header_size), info)
+        elif box_type == b"tkhd" and info.width is None:
+            info = _read_tkhd(file.read(size - header_size), info)
+        file.seek(start + size)
+        if box_type == b"moov":
+            break
+    return info
+
+
+def _read_mvhd(data: bytes, info: VideoInfo) -> VideoInfo:
+    if data[0] == 1:
+        timescale, duration = struct.unpack(">IQ", data[20:32])
+    else:
+        timescale, duration = struct.unpack(">II", data[12:20])
+    if timescale == 0:
+        return info
+    return VideoInfo(duration / timescale, info.width, info.height)
+
+
+def _read_tkhd(data: bytes, info: VideoInfo) -> VideoInfo:
+    offset = 4 + (32 if data[0] == 1 else 20) + 16
+    a, b = struct.unpack(">ii", data[offset : offset + 8])
+    width, height = struct.unpack(">II", data[offset + 36 : offset + 44])
+    width, height = width >> 16, height >> 16
+    if width == 0 or height == 0:
+        # audio track
+        return info
+    if a == 0 and abs(b) == 0x10000:
+        # rotated by 90 degrees as recorded by phones held upright
+        width, height = height, width
+    return VideoInfo(info.duration_seconds, width, height)